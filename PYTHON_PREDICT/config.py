@@ -28,9 +28,18 @@ dbt_profiles_path = "../DBT_PREDICT/profiles.yml"
 dbt_sources_folder = "../DBT_PREDICT/models/sources/"
 TMPF = '../TMP_FOLDER'
 TMPD = '../TMP_DATABASE'
+dropbox_cache_folder = os.path.expanduser('~/.cache/predict_project/dropbox')
+dropbox_cache_manifest = os.path.join(dropbox_cache_folder,'manifest.json')
+dbt_parse_cache_folder = os.path.join(dropbox_cache_folder,'dbt')
+game_cache_folder = os.path.join(dropbox_cache_folder,'games')
+dbt_state_folder = os.path.join(dropbox_cache_folder,'dbt_state')
 next_run_time_file_path = os.path.join(dropbox_folder,"current/outputs/python/next_run_time_utc.txt")
 trophy_file_path = os.path.join(dropbox_folder_root,'docs/Trophy.JPG')
 playoffs_table_code = os.path.join(dropbox_folder_root,'docs/playoffs_table.txt')
+imgbb_cache_file_path = "current/inputs/calculated/imgbb_cache.csv"
+# Following are the files of the paths file calculated by a previous run, which can be missing on DropBox (first run):
+# they are then left out of the downloaded data, as if they were empty
+optional_download_files = ['topic_cursor', 'imgbb_cache']
 
 # Following is csv file encapsulation parameters
 task_done_encapsulated = 0
@@ -39,12 +48,51 @@ message_encapsulated = 1
 runtype_encapsulated = 0
 game_encapsulated = 0
 need_encapsulated = 0
+topic_cursor_encapsulated = 0
+imgbb_cache_encapsulated = 0
 
 # Following is time to wait (sec) for external dependencies
 dropbox_wait_time = 30
 time_message_wait = 90
 game_extraction_wait_time = 30
 snowflake_login_wait_time = 30
+snowflake_pool_wait_time = 300
+forum_page_wait_time = 30
+imgbb_wait_time = 60
+
+# Following is the Snowflake connection pool parameters:
+# maximum number of connections (sessions) opened per account and database, usually the number of worker threads
+# and idle time (sec) after which a pooled connection is checked with a light query before being reused
+snowflake_pool_size = 5
+snowflake_pool_healthcheck_idle_time = 600
+
+# Following is the number of competitions extracted in parallel from game websites
+# and the margin (days) around the known dates of a gameday when requesting its games
+game_max_workers = 4
+game_extraction_margin_days = 30
+
+# Following is the cache of raw responses of game websites (in game_cache_folder, persisted between runs with the DropBox files cache): time to live (sec) of a cached response before it is revalidated,
+# and replay mode (env GAME_CACHE_REPLAY=1): games are rebuilt from cached responses only, without network
+game_cache_ttl = 600
+game_cache_replay = os.getenv("GAME_CACHE_REPLAY") == '1'
+
+# Following is the number of files transferred in parallel by one rclone call
+dropbox_transfers = 8
+
+# Following is the lookback (hours) before the extraction range when crawling a topic backward from its cursor:
+# messages created before it are considered too old to be edited in the extraction range
+message_edition_lookback_hours = 72
+
+# Following is the politeness parameters when crawling forums:
+# max simultaneous requests per forum, min delay (sec) between two requests on the same forum,
+# number of pages of a topic fetched at once, and number of topics crawled at once
+forum_max_connections = 4
+forum_politeness_delay = 0.2
+topic_prefetch_pages = 3
+topic_max_workers = 8
+
+# Following is the number of processes rendering jpg captures in parallel
+capture_max_workers = 4
 
 # Following is python maps:
 DOWNLOAD_INITIAL_MAP_PER_CALLER = {
@@ -109,6 +157,18 @@ DROPBOX_FOLDER_MAP = {
 
 # Following is string parameters used along the program
 landing_database_schema = "LANDING"
+# tables updated by dbt are exported either server-side ("unload": COPY INTO the stage then GET) or streamed by the client ("stream")
+dbt_tables_export_mode = "unload"
+# tables files of TMP_DATABASE are saved as "csv" (human-readable) or "parquet" (columnar and compressed, faster to transfer and to load back)
+database_snapshot_format = "csv"
+parquet_compression = "zstd"
+# landing tables are loaded from the dataframes in memory ("write_pandas") when they exist, or from their csv file ("csv")
+landing_upload_mode = "write_pandas"
+# dbt also rebuilds the tables modified since the manifest of the last successful run (state:modified) when set to True
+# the manifest is kept in dbt_state_folder, under the DropBox files cache persisted between runs
+dbt_state_modified = False
+snowflake_export_stage = "@~/export"
+snowflake_get_parallel = 8
 role_database = "ACCOUNTADMIN"
 game_filtering_category = "GAME"
 message_filtering_category = "MESSAGE"
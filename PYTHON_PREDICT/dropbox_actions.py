@@ -6,6 +6,11 @@ import logging
 logging.basicConfig(level=logging.INFO)
 import os
 import subprocess
+import shutil
+import tempfile
+import json
+import hashlib
+import threading
 from pathlib import Path
 from typing import Literal
 import pandas as pd
@@ -13,6 +18,139 @@ import pandas as pd
 import config
 import file_actions as fileA
 
+# Lock to read and write the manifest of the local cache of DropBox files
+dropbox_cache_lock = threading.Lock()
+
+def get_dropbox_content_hash(local_file_path: str) -> str:
+
+    """
+        Calculates the DropBox content hash of a local file, to compare it with the one of the remote file:
+        the sha256 of the concatenated sha256 of each 4MB block of the file
+        Args:
+            local_file_path (str): The path of the file locally
+        Returns:
+            the content hash (hexadecimal)
+    """
+
+    block_hashes = b''
+    with open(local_file_path, 'rb') as file:
+        while True:
+            block = file.read(4 * 1024 * 1024)
+            if not block:
+                break
+            block_hashes += hashlib.sha256(block).digest()
+    return hashlib.sha256(block_hashes).hexdigest()
+
+def get_remote_files_metadata(lst_remote_files: list[str]) -> dict:
+
+    """
+        Gets the hash, size and modtime of files on DropBox, with one rclone call.
+        It is only used to skip transfers: if the listing fails, no metadata is returned and all files are transferred
+        Args:
+            lst_remote_files (list): The paths of the files on DropBox, relative to the dropbox folder
+        Returns:
+            a dictionary with, for each path found, its metadata (hash, size, modtime)
+    """
+
+    if len(lst_remote_files) == 0:
+        return {}
+
+    with tempfile.TemporaryDirectory() as staging_folder:
+        files_from_path = os.path.join(staging_folder, 'files_from.txt')
+        with open(files_from_path, 'w', encoding='utf-8') as files_from:
+            files_from.write('\n'.join(lst_remote_files) + '\n')
+
+        command = [
+            'rclone', 'lsjson', config.dropbox_folder.rstrip('/'),
+            '--files-from', files_from_path, '--files-only', '--recursive',
+            '--hash', '--hash-type', 'dropbox',
+            '--config', os.path.expanduser(config.rclone_config_path)]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=config.dropbox_wait_time)
+
+    if result.returncode != 0:
+        logging.warning(f"DROPBOX -> Error listing files metadata, no transfer skipped: {result.stderr}")
+        return {}
+
+    return {
+        item['Path']: {
+            'hash': item.get('Hashes', {}).get('dropbox'),
+            'size': item.get('Size'),
+            'modtime': item.get('ModTime')
+        }
+        for item in json.loads(result.stdout or '[]')
+    }
+
+def read_dropbox_cache_manifest() -> dict:
+
+    """
+        Reads the manifest of the local cache of DropBox files: for each remote file, its hash, size and modtime when cached
+        Returns:
+            the manifest dictionary, empty if there is no cache yet
+    """
+
+    if not os.path.exists(config.dropbox_cache_manifest):
+        return {}
+    try:
+        with open(config.dropbox_cache_manifest, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        logging.warning(f"DROPBOX -> Cache manifest unreadable, cache ignored")
+        return {}
+
+def get_dropbox_cache_file_path(remote_file_path_abs: str) -> str:
+
+    """
+        Gets the path of a remote file in the local cache
+        Args:
+            remote_file_path_abs (str): The absolute path of the file on DropBox
+        Returns:
+            the path of the file in the local cache
+    """
+
+    cache_file_name = hashlib.sha1(remote_file_path_abs.encode('utf-8')).hexdigest() + Path(remote_file_path_abs).suffix
+    return os.path.join(config.dropbox_cache_folder, 'files', cache_file_name)
+
+def is_dropbox_cache_valid(cache_entry: dict | None, remote_metadata: dict | None) -> bool:
+
+    """
+        Checks if a file cached is the same as the remote one:
+        same content hash if DropBox gives it, else same size and modtime
+        Args:
+            cache_entry (dict): The manifest entry of the file cached, if any
+            remote_metadata (dict): The metadata of the remote file, if any
+        Returns:
+            True if the file cached can be used
+    """
+
+    if cache_entry is None or remote_metadata is None:
+        return False
+    if remote_metadata['hash']:
+        return cache_entry.get('hash') == remote_metadata['hash']
+    return (cache_entry.get('modtime') is not None
+            and cache_entry.get('modtime') == remote_metadata['modtime']
+            and cache_entry.get('size') == remote_metadata['size'])
+
+def update_dropbox_cache(lst_cached_files: list[tuple[str, str, dict]]):
+
+    """
+        Copies files into the local cache of DropBox files and records them in its manifest
+        Args:
+            lst_cached_files (list): The files to cache, as tuples (path of the file locally, absolute path of the file on DropBox, metadata of the file)
+    """
+
+    if len(lst_cached_files) == 0:
+        return
+
+    with dropbox_cache_lock:
+        manifest = read_dropbox_cache_manifest()
+        for local_file_path, remote_file_path_abs, metadata in lst_cached_files:
+            cache_file_path = get_dropbox_cache_file_path(remote_file_path_abs)
+            os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+            shutil.copy2(local_file_path, cache_file_path)
+            manifest[remote_file_path_abs] = metadata
+        with open(config.dropbox_cache_manifest, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=1)
+
 @config.exit_program(log_filter=lambda args: dict(args))
 @config.retry_function(log_filter=lambda args: dict(args))
 def copy_folder(remote_source_folder: str, remote_target_folder: str, sourcepath_from_root: Literal[0, 1] = 0, targetpath_from_root: Literal[0, 1] = 0, sync_folder: Literal[0, 1] = 1):
@@ -122,18 +260,123 @@ def download_file(dropbox_file_path: str, local_folder: str, is_encapsulated: Li
     else:
         logging.info(f"DROPBOX {dropbox_file_path} -> DOWNLOADING [ALREADY DONE]")
         
+    files_data_dict = read_downloaded_file(local_file_path_abs,is_encapsulated)
+    
+    logging.info(f"DROPBOX {dropbox_file_path} -> DOWNLOADING [DONE]")
+    return files_data_dict
+
+@config.exit_program(log_filter=lambda args: dict(args))
+def read_downloaded_file(local_file_path: str, is_encapsulated: Literal[0, 1] = 0) -> dict:
+
+    """
+        Returns the python object associated with a downloaded file (dataframe or string)
+        Args:
+            local_file_path (str): The local path of the file downloaded
+            is_encapsulated (0/1): Has the file been encapsulated (with ")? 1= yes, 0=no - default = no
+        Returns:
+            a data dictionary containing the python object created (dataframe for csv files or string for txt file)
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+
     #we get the type of file and return the python object type (df for csv, string for txt or yml file)
-    extension = Path(file_name).suffix.lower()
-    filename_short = Path(file_name).stem
+    extension = Path(local_file_path).suffix.lower()
+    filename_short = Path(local_file_path).stem
     files_data_dict = {}
     if extension == ".csv":
-        files_data_dict['df_'+filename_short] = fileA.read_and_check_csv(local_file_path_abs,is_encapsulated)        
+        files_data_dict['df_'+filename_short] = fileA.read_and_check_csv(local_file_path,is_encapsulated)        
     elif extension in [".yml", ".yaml"]:
-        files_data_dict['str_'+filename_short] = fileA.read_yml(local_file_path_abs)
+        files_data_dict['str_'+filename_short] = fileA.read_yml(local_file_path)
     elif extension == ".txt":
-        files_data_dict['str_'+filename_short] = fileA.read_txt(local_file_path_abs)
-    
-    logging.info(f"DROPBOX {dropbox_file_path} -> DOWNLOADING [DONE]")
+        files_data_dict['str_'+filename_short] = fileA.read_txt(local_file_path)
+    return files_data_dict
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('local_folder',)})
+@config.retry_function(log_filter=lambda args: {k: args[k] for k in ('local_folder',)})
+def download_files(lst_dropbox_files: list[tuple[str, int]], local_folder: str, lst_optional_files: list[str] | None = None) -> dict:
+
+    """
+        Technically download several files from dropbox to the local environment with one rclone call,
+        then returns the python objects associated (dataframe or string)
+        Args:
+            lst_dropbox_files (list): The files to download, as tuples (path of the file on DropBox, is_encapsulated 0/1)
+            local_folder (str): The local folder where to download
+            lst_optional_files (list): The paths on DropBox of the files which can be missing, if any
+        Returns:
+            a data dictionary containing the python objects created (dataframe for csv files or string for txt file).
+            Optional files missing on DropBox are not in it
+        Raises:
+            Retry 3 times and exits the program if error with rclone (using decorators)
+    """
+
+    logging.info(f"DROPBOX {len(lst_dropbox_files)} FILES -> DOWNLOADING [START]")
+
+    lst_optional_files = lst_optional_files or []
+    dropbox_folder = config.dropbox_folder.rstrip('/')
+    #we download only files not already downloaded
+    files_to_download = [dropbox_file_path for dropbox_file_path, _ in lst_dropbox_files
+                         if not os.path.exists(os.path.join(local_folder, os.path.basename(dropbox_file_path)))]
+
+    # files unchanged on DropBox since they were cached are copied from the local cache
+    remote_files_metadata = get_remote_files_metadata(files_to_download)
+    with dropbox_cache_lock:
+        manifest = read_dropbox_cache_manifest()
+    files_from_cache = [
+        dropbox_file_path for dropbox_file_path in files_to_download
+        if is_dropbox_cache_valid(manifest.get(os.path.join(dropbox_folder, dropbox_file_path)), remote_files_metadata.get(dropbox_file_path))
+        and os.path.exists(get_dropbox_cache_file_path(os.path.join(dropbox_folder, dropbox_file_path)))
+    ]
+    for dropbox_file_path in files_from_cache:
+        shutil.copy2(get_dropbox_cache_file_path(os.path.join(dropbox_folder, dropbox_file_path)),
+                     os.path.join(local_folder, os.path.basename(dropbox_file_path)))
+    if len(files_from_cache) > 0:
+        logging.info(f"DROPBOX {len(files_from_cache)} FILES -> UNCHANGED, COPIED FROM CACHE")
+    files_to_download = [dropbox_file_path for dropbox_file_path in files_to_download if dropbox_file_path not in files_from_cache]
+
+    if len(files_to_download) > 0:
+        # rclone keeps the tree of files relative to the dropbox folder: we download them in a staging folder first
+        with tempfile.TemporaryDirectory() as staging_folder:
+            files_from_path = os.path.join(staging_folder, 'files_from.txt')
+            staging_download_folder = os.path.join(staging_folder, 'files')
+            with open(files_from_path, 'w', encoding='utf-8') as files_from:
+                files_from.write('\n'.join(files_to_download) + '\n')
+
+            command = [
+                'rclone', 'copy', dropbox_folder, staging_download_folder,
+                '--files-from', files_from_path, '--no-traverse',
+                '--transfers', str(config.dropbox_transfers),
+                '--config', os.path.expanduser(config.rclone_config_path)]
+
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=2*config.dropbox_wait_time)
+
+            #If there is an error downloading files, we raise an error for the retry decorator
+            if result.returncode != 0:
+                raise ValueError(f"DROPBOX -> Error downloading files: {result.stderr}")
+
+            #we move the files downloaded to the local folder, raising an error for the retry decorator if one is missing - unless it is optional
+            for dropbox_file_path in files_to_download:
+                staging_file_path = os.path.join(staging_download_folder, dropbox_file_path)
+                if not os.path.exists(staging_file_path) and dropbox_file_path in lst_optional_files:
+                    logging.warning(f"DROPBOX {dropbox_file_path} -> NOT FOUND, OPTIONAL FILE SKIPPED")
+                    continue
+                if not os.path.exists(staging_file_path):
+                    raise ValueError(f"DROPBOX {dropbox_file_path} -> Error downloading file: not found")
+                shutil.move(staging_file_path, os.path.join(local_folder, os.path.basename(dropbox_file_path)))
+
+        #we cache the files downloaded for next runs
+        update_dropbox_cache([(os.path.join(local_folder, os.path.basename(dropbox_file_path)),
+                               os.path.join(dropbox_folder, dropbox_file_path),
+                               remote_files_metadata[dropbox_file_path])
+                              for dropbox_file_path in files_to_download if dropbox_file_path in remote_files_metadata])
+
+    # We parallelize the reading of those files - optional files not found are not read
+    read_args = [(os.path.join(local_folder, os.path.basename(dropbox_file_path)), is_encapsulated)
+                 for dropbox_file_path, is_encapsulated in lst_dropbox_files
+                 if os.path.exists(os.path.join(local_folder, os.path.basename(dropbox_file_path)))]
+    results = config.multithreading_run(read_downloaded_file, read_args)
+    files_data_dict = {k: v for r in results for k, v in r.items()}
+
+    logging.info(f"DROPBOX {len(lst_dropbox_files)} FILES -> DOWNLOADING [DONE]")
     return files_data_dict
 
 @config.exit_program(log_filter=lambda args: dict(args))
@@ -174,6 +417,75 @@ def upload_file(local_file_path: str, remote_file_path: str):
 
     logging.info(f"DROPBOX {local_file_path} -> UPLOADING [DONE]")
 
+@config.exit_program(log_filter=lambda args: {})
+@config.retry_function(log_filter=lambda args: {})
+def upload_files(lst_files: list[tuple[str, str]]):
+
+    """
+        The purpose of this function is to upload several local files to dropbox with one rclone call
+        Args:
+            lst_files (list): The files to upload, as tuples (path of the file locally, path of the file on DropBox)
+        Raises:
+            Retry 3 times and exits the program if error with rclone (using decorators)
+    """
+
+    if len(lst_files) == 0:
+        return
+
+    logging.info(f"DROPBOX {len(lst_files)} FILES -> UPLOADING [START]")
+
+    # we get the path of each file relative to the dropbox folder
+    files_to_upload = []
+    for local_file_path, remote_file_path in lst_files:
+        # we extract the remote folder from the remote path - it can already look like a folder ending with /
+        if remote_file_path.endswith('/'):
+            remote_folder = remote_file_path
+        else:
+            remote_folder = os.path.dirname(remote_file_path) + '/'
+        files_to_upload.append((local_file_path, os.path.join(remote_folder, os.path.basename(local_file_path))))
+
+    # files with the same content as the remote ones are not uploaded again
+    remote_files_metadata = get_remote_files_metadata([remote_file_path_rel for _, remote_file_path_rel in files_to_upload])
+    lst_cached_files = []
+    files_changed = []
+    for local_file_path, remote_file_path_rel in files_to_upload:
+        metadata = {'hash': get_dropbox_content_hash(local_file_path), 'size': os.path.getsize(local_file_path), 'modtime': None}
+        lst_cached_files.append((local_file_path, os.path.join(config.dropbox_folder.rstrip('/'), remote_file_path_rel), metadata))
+        if remote_files_metadata.get(remote_file_path_rel, {}).get('hash') != metadata['hash']:
+            files_changed.append((local_file_path, remote_file_path_rel))
+    if len(files_changed) < len(files_to_upload):
+        logging.info(f"DROPBOX {len(files_to_upload) - len(files_changed)} FILES -> UNCHANGED, NOT UPLOADED")
+
+    if len(files_changed) > 0:
+        # rclone copies a tree of files relative to one folder: we stage the files with the tree of their dropbox folder
+        with tempfile.TemporaryDirectory() as staging_folder:
+            staging_upload_folder = os.path.join(staging_folder, 'files')
+            for local_file_path, remote_file_path_rel in files_changed:
+                os.makedirs(os.path.dirname(os.path.join(staging_upload_folder, remote_file_path_rel)), exist_ok=True)
+                shutil.copy2(local_file_path, os.path.join(staging_upload_folder, remote_file_path_rel))
+
+            files_from_path = os.path.join(staging_folder, 'files_from.txt')
+            with open(files_from_path, 'w', encoding='utf-8') as files_from:
+                files_from.write('\n'.join(remote_file_path_rel for _, remote_file_path_rel in files_changed) + '\n')
+
+            command = [
+                'rclone', 'copy', staging_upload_folder, config.dropbox_folder.rstrip('/'),
+                '--files-from', files_from_path, '--no-traverse',
+                '--transfers', str(config.dropbox_transfers),
+                '--config', os.path.expanduser(config.rclone_config_path)
+            ]
+
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=2*config.dropbox_wait_time)
+
+        #If there is an error uploading files, we raise an error for the retry decorator
+        if result.returncode != 0:
+            raise ValueError(f"DROPBOX -> Error uploading files: {result.stderr}")
+
+    #we cache the files uploaded for next runs: they will be downloaded from cache while unchanged on DropBox
+    update_dropbox_cache(lst_cached_files)
+
+    logging.info(f"DROPBOX {len(lst_files)} FILES -> UPLOADING [DONE]")
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('folder_name','local_folder')})
 @config.retry_function(log_filter=lambda args: {k: args[k] for k in ('folder_name','local_folder')})
 def download_folder(folder_name: str, df_paths: pd.DataFrame, local_folder: str):
@@ -203,12 +515,18 @@ def download_folder(folder_name: str, df_paths: pd.DataFrame, local_folder: str)
     if result_list.returncode != 0:
         raise ValueError(f"Error listing files: {result_list.stderr}")
 
-    #Then we download each file using their name
-    files = [Path(file).stem for file in result_list.stdout.strip().split("\n") if file.strip()]
+    #Then we download each file using their name and extension
+    #a table listed both as csv and parquet snapshots is downloaded in the snapshot format of the config
+    files_extensions = {}
+    for file in result_list.stdout.strip().split("\n"):
+        if file.strip():
+            file_name, extension = Path(file).stem, Path(file).suffix
+            if file_name not in files_extensions or extension.lower() == '.' + config.database_snapshot_format:
+                files_extensions[file_name] = extension
+    files = list(files_extensions)
     
-    # We parallelize the downloading of those files
-    file_args = [(file_name, local_folder,df_paths) for file_name in files]
-    config.multithreading_run(fileA.get_locally_from_dropbox, file_args)
+    # We download those files with one rclone call
+    fileA.get_files_locally_from_dropbox(files, local_folder, df_paths, files_extensions)
     
     logging.info(f"DROPBOX: {folder_name} -> DOWNLOADING FOLDER [DONE]")
     
\ No newline at end of file
@@ -31,7 +31,7 @@ def process_games(context_dict: dict) -> dict:
             Exits the program if error running the function (using decorator)
     '''
 
-    context_dict['df_game'] = gameA.extract_games_from_need(context_dict['sr_output_need'],context_dict['df_competition'])
+    context_dict['df_game'] = gameA.extract_games_from_need(context_dict['sr_output_need'],context_dict['df_competition'],context_dict.get('sr_snowflake_account_connect'))
     
     # we filter game files, to get only inputs related to those games   
     context_dict.update(fileA.filter_data(files_data_dict = context_dict, df_paths=context_dict['df_paths'], filtering_category = config.game_filtering_category))
@@ -51,7 +51,7 @@ def process_messages(context_dict: dict) -> dict:
         '''
 
         # We want to extract messages from the forum and download the input files related                     
-        context_dict['df_message_check'],context_dict['extraction_time_utc'] = extract_messages(context_dict['sr_snowflake_account_connect'],context_dict['sr_output_need'])            
+        context_dict['df_message_check'],context_dict['extraction_time_utc'] = extract_messages(context_dict['sr_snowflake_account_connect'],context_dict['sr_output_need'],context_dict.get('df_topic_cursor'))            
 
         # we filter messages files, to get only inputs related to those messages   
         context_dict.update(fileA.filter_data(files_data_dict = context_dict, df_paths=context_dict['df_paths'], filtering_category = config.message_filtering_category))        
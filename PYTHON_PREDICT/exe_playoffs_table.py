@@ -15,8 +15,8 @@ import json
 
 import config
 from file_actions import create_jpg
-from dropbox_actions import download_file
-from imgbb_actions import push_capture_online
+from dropbox_actions import download_file, download_files, upload_file
+from imgbb_actions import push_capture_online, get_capture_hash, get_cached_capture_url, load_imgbb_cache, close_imgbb_session
 
 @config.exit_program(log_filter=lambda args: {})
 def get_matchups_strings(playoffs_matchups: list[list[str]]) -> list[str]:
@@ -134,6 +134,23 @@ def display_pass(ax: Axes, column: int, line: int, passvalue: str) -> Axes:
     ax.text(column, line, passvalue, ha='center', va='bottom', fontsize=8, fontweight="bold", style='italic',zorder=9)
     return ax
 
+@config.exit_program(log_filter=lambda args: {})
+def write_playoffs_output(image_url: str):
+
+    '''
+        Writes the url of the playoffs image in the output file read by the caller
+        Args:
+            image_url (str): the url of the playoffs image online
+        Raises:
+            Exits the program if error running the function (using decorator)
+    '''
+
+    logging.info(image_url)
+    with open("exe_output.json", "w") as f:
+        json.dump({
+            "image_url": image_url
+        }, f) 
+
 @config.exit_program(log_filter=lambda args: {})
 def draw_playoffs_image():
 
@@ -154,6 +171,20 @@ def draw_playoffs_image():
                                 local_folder = config.TMPF,
                                 is_encapsulated=0,
                                 is_path_abs=1))
+    # we download urls of captures already pushed: if the playoffs table didn't change, its image is not drawn and pushed again
+    # the file is missing until a first capture is pushed: the cache is then empty
+    context_dict.update(download_files(lst_dropbox_files = [(config.imgbb_cache_file_path, config.imgbb_cache_encapsulated)],
+                                local_folder = config.TMPF,
+                                lst_optional_files = [config.imgbb_cache_file_path]))
+    load_imgbb_cache(context_dict.get('df_imgbb_cache'))
+    capture_hash = get_capture_hash(context_dict['str_playoffs_table'], 'playoffs_table')
+    image_url = get_cached_capture_url(capture_hash)
+    if image_url is not None:
+        logging.info(f"PLAYOFFS -> TABLE UNCHANGED, CACHED URL USED")
+        write_playoffs_output(image_url)
+        config.destroy_local_folder()
+        return
+
     exec_dict = {}
     exec(context_dict['str_playoffs_table'], exec_dict)
     playoffs_matchups = exec_dict['playoffs_matchups']
@@ -367,14 +398,11 @@ def draw_playoffs_image():
     file_path = os.path.join(config.TMPF,"playoffs_table_"+datetime.now(timezone.utc).strftime("%Y_%m_%d_%H_%M_%S")+".jpg")
     create_jpg(file_path,fig)
 
-    # we push it online on ImgBB
-    image_url = push_capture_online(file_path)
-    logging.info(image_url)
-    
-    with open("exe_output.json", "w") as f:
-        json.dump({
-            "image_url": image_url
-        }, f) 
+    # we push it online on ImgBB, and upload the urls cached with it
+    image_url = push_capture_online(file_path, capture_hash)
+    close_imgbb_session()
+    upload_file(os.path.join(config.TMPF, os.path.basename(config.imgbb_cache_file_path)), config.imgbb_cache_file_path)
+    write_playoffs_output(image_url)
 
     # We finally destroy local folders
     config.destroy_local_folder()
@@ -15,9 +15,12 @@ import ast
 import networkx as nx
 from re import sub as re_sub
 import json
+import functools
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Literal, Iterable
 from matplotlib.figure import Figure
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 import dropbox_actions as dropboxA
 import config
@@ -39,44 +42,69 @@ def read_json(local_file_path: str) -> list :
         lst = json.load(file)
     return lst
 
+def compile_csv_schemas(file_check: dict) -> dict:
+
+    """
+        Compiles the schemas of the file_check json into the arguments given to the csv reader, for each file:
+        - the list of expected columns, to check the header
+        - the dtype of each expected column, so pandas doesn't infer them
+        Args:
+            file_check (dict): the content of the file_check json
+        Returns:
+            the dictionary of compiled schemas per file name
+    """
+
+    csv_schemas = {}
+    for filename, schema in file_check["schemas"].items():
+        expected_columns = schema.get("columns", {})
+        csv_schemas[filename] = {
+            "columns": list(expected_columns),
+            "dtype": {col: (object if expected_type == "object" else expected_type) for col, expected_type in expected_columns.items()}
+        }
+    return csv_schemas
+
+@functools.lru_cache(maxsize=1)
+def get_csv_schemas() -> dict:
+
+    """
+        Gets the compiled schemas of csv files, reading the file_check json only once per run
+        Returns:
+            the dictionary of compiled schemas per file name
+    """
+
+    return compile_csv_schemas(read_json("file_check.json"))
+
 @config.exit_program(log_filter=lambda args: dict(args))
 def read_and_check_csv(local_file_path: str, is_encapsulated: Literal[0, 1] = 0) -> pd.DataFrame:
     """
         Calls the read_csv function from pandas and return the dataframe
-        if all expected columns are there
+        if all expected columns are there.
+        The header is checked before reading the body, and expected columns are read with their expected type
         Args:
             local_file_path (str): Local path to the csv file
             is_encapsulated (0/1): Has the file been encapsulated (with ")? 1= yes, 0=no - default = no
         Returns:
             The dataframe of the csv
         Raises:
-            Exits the program if error running the function or if columns not found (using decorator)
+            Exits the program if error running the function, if columns not found or with a type mismatch (using decorator)
     """
-    if is_encapsulated==1:
-        df = pd.read_csv(local_file_path,header=0,quotechar='"')
-    else:
-        df = pd.read_csv(local_file_path,header=0)
-
     filename = Path(local_file_path).name
-    expected_columns = read_json("file_check.json")["schemas"].get(filename, {}).get("columns", {})
-    actual_columns = df.columns.tolist()
-    missing = [col for col in expected_columns if col not in actual_columns]
+    schema = get_csv_schemas().get(filename, {"columns": [], "dtype": {}})
+
+    # we check the header first, to fail before reading the whole file - a BOM (files saved as "CSV UTF-8" by Excel) is ignored like pandas does
+    with open(local_file_path, 'r', encoding='utf-8-sig', newline='') as file:
+        actual_columns = next(csv.reader(file, quotechar='"'), [])
+    missing = [col for col in schema["columns"] if col not in actual_columns]
     if missing:
         raise ValueError(f"Columns missing in {filename}: {missing}")
 
-    type_mismatches = []
-    for col, expected_type in expected_columns.items():
-        actual_type = str(df[col].dtype)
-
-        if df[col].isna().all() and expected_type == "object":
-            continue  
-
-        if actual_type != expected_type:
-            type_mismatches.append((col, expected_type, actual_type))
-
-    if type_mismatches:
-        mismatch_msgs = [f"{col}: expected {exp}, got {act}" for col, exp, act in type_mismatches]
-        raise ValueError(f"Type mismatches in {filename}: {mismatch_msgs}")
+    try:
+        if is_encapsulated==1:
+            df = pd.read_csv(local_file_path,header=0,quotechar='"',dtype=schema["dtype"])
+        else:
+            df = pd.read_csv(local_file_path,header=0,dtype=schema["dtype"])
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Type mismatches in {filename}: {e}")
     
     return df
     
@@ -129,6 +157,59 @@ def create_csv(local_file_path: str ,df: pd.DataFrame, is_to_encapsulate: Litera
     else:
         df.to_csv(local_file_path, index=False, encoding='utf-8',header=True)
 
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('local_file_path',) })
+def create_csv_from_batches(local_file_path: str, batches: Iterable[pd.DataFrame], columns: list[str], is_to_encapsulate: Literal[0, 1] = 0):
+
+    """
+        The purpose of this function is to create a csv file batch after batch, without gathering all batches in memory
+        The file is the same as the one created by create_csv with all batches concatenated
+        Args:
+            local_file_path (str): Path where the CSV file will be saved
+            batches (iterable of dataframes): DataFrames to write to CSV, one after another
+            columns (list): The columns of the file, to write the header even if there are no batches
+            is_to_encapsulate (0/1): If 1, encapsulate fields with "". Default is 0 (no encapsulation)
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+    if is_to_encapsulate == 1:
+        csv_options = {'quotechar': '"', 'quoting': csv.QUOTE_ALL}
+    else:
+        csv_options = {}
+
+    with open(local_file_path, 'w', encoding='utf-8', newline='') as file:
+        pd.DataFrame(columns=columns).to_csv(file, index=False, header=True, **csv_options)
+        for df in batches:
+            df.to_csv(file, index=False, header=False, **csv_options)
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('local_file_path',) })
+def create_parquet_from_batches(local_file_path: str, batches: Iterable[pa.Table], columns: list[str]):
+
+    """
+        The purpose of this function is to create a parquet file batch after batch, without gathering all batches in memory
+        String columns are dictionary-encoded and the file is compressed with config.parquet_compression
+        Args:
+            local_file_path (str): Path where the parquet file will be saved
+            batches (iterable of arrow tables): Tables to write to parquet, one after another
+            columns (list): The columns of the file, to write them as strings even if there are no batches
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+    writer = None
+    try:
+        for table in batches:
+            if writer is None:
+                # integer columns are widened so that all batches share the schema of the first one
+                schema = pa.schema([field.with_type(pa.int64()) if pa.types.is_integer(field.type) else field for field in table.schema])
+                string_columns = [field.name for field in schema if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)]
+                writer = pq.ParquetWriter(local_file_path, schema, compression=config.parquet_compression, use_dictionary=string_columns)
+            writer.write_table(table.cast(writer.schema))
+        if writer is None:
+            pq.write_table(pa.table({column: pa.array([], type=pa.string()) for column in columns}),
+                           local_file_path, compression=config.parquet_compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('local_file_path',) })
 def create_yml(local_file_path: str, text: str):
 
@@ -324,6 +405,40 @@ def get_locally_from_dropbox(file_name: str, local_folder: str, df_paths: pd.Dat
                                             is_encapsulated = is_encapsulated)
     return files_data_dict
 
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('files_names', 'local_folder')})
+def get_files_locally_from_dropbox(files_names: list[str], local_folder: str, df_paths: pd.DataFrame, files_extensions: dict[str, str] | None = None) -> dict:
+
+    """
+        Downloads several files from DropBox at once, given their file names
+        Args:
+            files_names (list) : The names of the files (without extension) on the paths file
+            local_folder (str): The local folder where to download 
+            df_paths (dataframe): The dataframe of the paths file
+            files_extensions (dict): The extension of the files on DropBox per file name, when it differs from the one of the paths file (parquet snapshots)
+        Returns:
+            data dictionary containing the python objects created (dataframe, string)
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+
+    #We first get the info related with each file_name
+    lst_dropbox_files = []
+    lst_optional_files = []
+    for file_name in files_names:
+        file_infos = df_paths[df_paths["NAME"] == file_name].iloc[0]
+        dropbox_file_path = file_infos["PATH"].strip().strip('"')
+        if files_extensions is not None and file_name in files_extensions:
+            dropbox_file_path = os.path.splitext(dropbox_file_path)[0] + files_extensions[file_name]
+        lst_dropbox_files.append((dropbox_file_path, file_infos["IS_ENCAPSULATED"]))
+        if file_name in config.optional_download_files:
+            lst_optional_files.append(dropbox_file_path)
+
+    #We then download them and get the data dictionary returned - optional files missing on DropBox are not in it
+    files_data_dict = dropboxA.download_files(lst_dropbox_files = lst_dropbox_files,
+                                              local_folder = local_folder,
+                                              lst_optional_files = lst_optional_files)
+    return files_data_dict
+
 @config.exit_program(log_filter=lambda args: dict(args))
 def modify_run_file(df_RUN_TYPE: pd.DataFrame, called_by: str, event: str, planned_run_time_utc: str | None = None) -> pd.DataFrame:
 
@@ -426,10 +541,8 @@ def initiate_local_environment(called_by: str) -> dict:
     logging.info(f"LIST OF FILES TO BE DOWNLOADED: {files_to_download}")
     logging.info("__________________________________________________________________")
 
-    # We parallelize the downloading of those files
-    download_args = [(file_name, config.TMPF, df_paths) for file_name in files_to_download]
-    results = config.multithreading_run(get_locally_from_dropbox, download_args)
-    context_dict.update({k: v for r in results for k, v in r.items()})
+    # We download those files with one rclone call
+    context_dict.update(get_files_locally_from_dropbox(files_to_download, config.TMPF, df_paths))
     context_dict['sr_snowflake_account_connect'] = context_dict['df_snowflake_account_connect'].iloc[0]
     
     # we copy next_run time to current_run time if called by main 
@@ -467,6 +580,7 @@ def terminate_local_environment(called_by: str, context_dict: dict):
         - parametrize the dbt files
         - modify local "RUN_TYPE" file and upload it back to dropbox, to log the ending run info
         - upload files from the local environment which need to be uploaded
+        - close the pooled snowflake connections
         - destroy local environment to terminate the program
         Args:
             called_by (str): the name of the function calling this function, 
@@ -504,13 +618,19 @@ def terminate_local_environment(called_by: str, context_dict: dict):
             path_details = df_paths[df_paths["NAME"] == file_name].iloc[0]
             is_for_upload = path_details['IS_FOR_UPLOAD']
             remote_file_path = path_details['PATH']
+            # database tables snapshots can be parquet files: they are uploaded next to the csv path of the paths file
+            if (extension.lower() == ".parquet"):
+                remote_file_path = os.path.splitext(remote_file_path)[0] + extension
 
             if is_for_upload:
                 local_files_to_upload.extend([(local_file_path,remote_file_path)])
     
-    # we parallelize files upload to dropbox
-    upload_args = [(local_file_path,remote_file_path) for local_file_path,remote_file_path in local_files_to_upload]
-    config.multithreading_run(dropboxA.upload_file, upload_args)
+    # we upload the files to dropbox with one rclone call
+    dropboxA.upload_files(local_files_to_upload)
+
+    #we close the pooled snowflake connections (imported here as snowflake_actions imports this module)
+    from snowflake_actions import close_snowflake_connections
+    close_snowflake_connections()
     
     #we finally destroy the local environment
     config.destroy_local_folder()
@@ -556,10 +676,8 @@ def download_needed_files(df_paths: pd.DataFrame, sr_output_need: pd.Series) ->
     logging.info(f"LIST OF FILES TO BE DOWNLOADED: {files_to_download}")
     logging.info("__________________________________________________________________")
 
-    # We parallelize the downloading of those files
-    download_args = [(file_name, config.TMPF, df_paths) for file_name in files_to_download]
-    results = config.multithreading_run(get_locally_from_dropbox, download_args)
-    files_data_dict.update({k: v for r in results for k, v in r.items()})
+    # We download those files with one rclone call
+    files_data_dict.update(get_files_locally_from_dropbox(files_to_download, config.TMPF, df_paths))
 
     logging.info(f"FILES -> DOWNLOADING NEEDED FILES [END]")
     return files_data_dict
\ No newline at end of file
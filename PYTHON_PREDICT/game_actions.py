@@ -8,15 +8,77 @@ import logging
 logging.basicConfig(level=logging.INFO)
 import pandas as pd
 import os
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
 
 import config
 from file_actions import create_csv
-from get_game_details_lnb import get_game_details_lnb
+import snowflake_actions as snowflakeA
+import sql_queries as sqlQ
+from get_game_details_lnb import get_game_details_lnb, close_lnb_session
 
 game_info_functions = {
     "LNB": get_game_details_lnb
 }
 
+# functions closing the pooled session of each game source, once extraction is done
+game_session_close_functions = {
+    "LNB": close_lnb_session
+}
+
+def close_game_sessions():
+
+    """
+        Closes the pooled sessions used to extract games from every source
+    """
+
+    for close_session in game_session_close_functions.values():
+        close_session()
+
+def extract_games_from_competition_row(compet_row: tuple) -> pd.DataFrame:
+
+    """
+        Gets all games of one competition, run in parallel for each competition by extract_games_from_competition
+        Args:
+            compet_row (tuple): the competition from input files
+        Returns:
+            dataframe: contains all games of the competition
+    """
+
+    get_game_details = game_info_functions.get(compet_row.COMPETITION_SOURCE)
+    df_game_details = get_game_details(compet_row)
+    logging.info(f"GAME -> COMPETITION {compet_row.COMPETITION_SOURCE} - {compet_row.COMPETITION_SOURCE_ID} extracted")
+    return df_game_details
+
+def get_gameday_date_range(sr_snowflake_account: pd.Series, sr_output_need: pd.Series) -> Tuple[Tuple[str, str], int] | None:
+
+    """
+        Gets the range of dates where games of the need gameday are, from the gameday already in the database,
+        with the number of games already extracted for it, to check all of them are extracted again.
+        A margin is added on both side as games can be rescheduled.
+        The lookup is best-effort: if the query fails, the whole calendar is requested
+        Args:
+            sr_snowflake_account (series - one row): Contains the snowflake account parameters to run a query
+            sr_output_need (series - one row): the output_need we process
+        Returns:
+            ((start date, end date) 'YYYY-MM-DD', number of games of the gameday), or None if the gameday dates are not known
+    """
+
+    df_gameday_dates = snowflakeA.snowflake_execute_best_effort(sr_snowflake_account,sqlQ.game_actions_qGameDayDates,(sr_output_need['SEASON_ID'],sr_output_need['GAMEDAY']))
+    if df_gameday_dates is None:
+        logging.warning(f"GAME -> GAMEDAY DATES NOT AVAILABLE - WHOLE CALENDAR REQUESTED")
+        return None
+    df_gameday_dates = df_gameday_dates.dropna()
+    if df_gameday_dates.empty:
+        return None
+
+    margin = timedelta(days=config.game_extraction_margin_days)
+    begin_date = pd.to_datetime(df_gameday_dates['BEGIN_DATE_LOCAL']).min() - margin
+    end_date = pd.to_datetime(df_gameday_dates['END_DATE_UTC']).max() + margin
+    nb_game = int(df_gameday_dates['NB_GAME'].max())
+    return ((begin_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')), nb_game)
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('df_competition',)})
 def extract_games_from_competition(df_competition: pd.DataFrame) -> pd.DataFrame:
     
@@ -36,25 +98,29 @@ def extract_games_from_competition(df_competition: pd.DataFrame) -> pd.DataFrame
                                     'TIME_GAME_LOCAL','TEAM_HOME','SCORE_HOME',
                                     'TEAM_AWAY','SCORE_AWAY','GAME_SOURCE_ID'])
     
-    for compet_row in df_competition.itertuples(index=False):
-        source = compet_row.COMPETITION_SOURCE
-        get_game_details = game_info_functions.get(source)
-        df_game_details = get_game_details(compet_row)
-        df_game = pd.concat([df_game, df_game_details], ignore_index=True)
-        logging.info(f"GAME -> COMPETITION {compet_row.COMPETITION_SOURCE} - {compet_row.COMPETITION_SOURCE_ID} extracted")
+    # we extract competitions in parallel, keeping their order, and concatenate them once
+    try:
+        with ThreadPoolExecutor(config.game_max_workers) as executor:
+            games_extracted = list(executor.map(extract_games_from_competition_row, df_competition.itertuples(index=False)))
+    finally:
+        close_game_sessions()
+    if len(games_extracted) > 0:
+        df_game = pd.concat([df_game, *games_extracted], ignore_index=True)
         
     create_csv(os.path.join(config.TMPF,'game.csv'),df_game,config.game_encapsulated) 
     logging.info(f"GAME -> GETTING GAMES [END]")
     return df_game
 
 @config.exit_program(log_filter=lambda args: {})
-def extract_games_from_need(sr_output_need: pd.Series,df_competition: pd.DataFrame) -> pd.DataFrame:
+def extract_games_from_need(sr_output_need: pd.Series,df_competition: pd.DataFrame, sr_snowflake_account: pd.Series | None = None) -> pd.DataFrame:
     
     """
         Gets games while called by exe_main based on needs competition and gameday
         Args:
             sr_output_need (series - one row): the output_need we process - we extract only games from its gameday
             df_competition (DataFrame): the list of competition from input files, to get the filter competition
+            sr_snowflake_account (series - one row): if provided, used to get the known dates of the gameday, to request only games around them.
+                The whole calendar is requested if fewer games than known in the database are found around them
         Returns:
             dataframe: contains all games related with need competition and gameday   
         Raises:
@@ -67,9 +133,22 @@ def extract_games_from_need(sr_output_need: pd.Series,df_competition: pd.DataFra
         (df_competition['COMPETITION_ID'] == sr_output_need['COMPETITION_ID'])
     ].itertuples(index=False))
     
+    date_range, nb_game_known = None, 0
+    if sr_snowflake_account is not None:
+        gameday_scope = get_gameday_date_range(sr_snowflake_account, sr_output_need)
+        if gameday_scope is not None:
+            date_range, nb_game_known = gameday_scope
+
     source = compet_row.COMPETITION_SOURCE
     get_game_details = game_info_functions.get(source)
-    df_game = get_game_details(compet_row,sr_output_need['GAMEDAY'])
+    try:
+        df_game = get_game_details(compet_row,sr_output_need['GAMEDAY'],date_range)
+        # a game rescheduled outside the date range would be missing: if games known in the database are not all extracted, we request the whole calendar
+        if date_range is not None and len(df_game) < nb_game_known:
+            logging.warning(f"GAME -> {len(df_game)} GAMES EXTRACTED BETWEEN {date_range[0]} AND {date_range[1]} FOR {nb_game_known} KNOWN - WHOLE CALENDAR REQUESTED")
+            df_game = get_game_details(compet_row,sr_output_need['GAMEDAY'])
+    finally:
+        close_game_sessions()
 
     create_csv(os.path.join(config.TMPF,'game.csv'),df_game,config.game_encapsulated) 
     logging.info(f"GAME -> GETTING GAMES [END]")
@@ -2,21 +2,222 @@
     The purpose of this module is to extract game details coming from the LNB website 
 ''' 
 
+import logging
+logging.basicConfig(level=logging.INFO)
+import threading
+import os
+import json
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-from zoneinfo import ZoneInfo
+import numpy as np
+from typing import Tuple
 
 import config
 
+# Global variables to store the pooled session used to call the LNB API, shared by all competitions extracted in parallel
+lnb_session = None
+lnb_session_lock = threading.Lock()
+
+def get_lnb_session() -> requests.Session:
+
+    """
+        Gets the session used to call the LNB API, creating it at first call.
+        The session keeps its connections alive and is shared by all competitions
+        Returns:
+            the session of the LNB API
+    """
+
+    global lnb_session
+    with lnb_session_lock:
+        if lnb_session is None:
+            lnb_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.game_max_workers)
+            lnb_session.mount('https://', adapter)
+            lnb_session.headers.update({"Content-Type": "application/json"})
+        return lnb_session
+
+def close_lnb_session():
+
+    """
+        Closes the session used to call the LNB API
+    """
+
+    global lnb_session
+    with lnb_session_lock:
+        if lnb_session is not None:
+            lnb_session.close()
+            lnb_session = None
+
+def get_lnb_cache_file_path(payload: dict) -> str:
+
+    """
+        Gets the path of the cached response of a calendar request, keyed by competition and date window
+        Args:
+            payload (dict): the payload of the calendar request
+        Returns:
+            the path of the cached response
+    """
+
+    cache_file_name = f"{payload['competition_external_id']}_{payload['start_date']}_{payload['end_date']}.json"
+    return os.path.join(config.game_cache_folder, 'lnb', cache_file_name)
+
+def read_lnb_cache_entry(cache_file_path: str) -> dict | None:
+
+    """
+        Reads a cached response of a calendar request
+        Args:
+            cache_file_path (str): the path of the cached response
+        Returns:
+            the cache entry (raw response, ETag, Last-Modified, fetch time), None if there is none or if it is unreadable
+    """
+
+    if not os.path.exists(cache_file_path):
+        return None
+    try:
+        with open(cache_file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        logging.warning(f"GAME -> LNB cached response {cache_file_path} unreadable, ignored")
+        return None
+
+def write_lnb_cache_entry(cache_file_path: str, cache_entry: dict):
+
+    """
+        Writes a cached response of a calendar request, replacing the previous one at once
+        Args:
+            cache_file_path (str): the path of the cached response
+            cache_entry (dict): the cache entry (raw response, ETag, Last-Modified, fetch time)
+    """
+
+    os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+    temp_file_path = f"{cache_file_path}.{threading.get_ident()}.tmp"
+    with open(temp_file_path, 'w', encoding='utf-8') as file:
+        json.dump(cache_entry, file)
+    os.replace(temp_file_path, cache_file_path)
+
+def expire_lnb_cache_entry(cache_file_path: str):
+
+    """
+        Marks a cached response as expired, so that it is revalidated at next request instead of being reused as is
+        Args:
+            cache_file_path (str): the path of the cached response
+    """
+
+    cache_entry = read_lnb_cache_entry(cache_file_path)
+    if cache_entry is not None:
+        cache_entry['fetched_at'] = 0
+        write_lnb_cache_entry(cache_file_path, cache_entry)
+
+def fetch_lnb_calendar(url: str, payload: dict) -> dict:
+
+    """
+        Gets the raw response of a calendar request to the LNB API, through the cache of responses:
+        - in replay mode, the cached response is used without network
+        - a cached response younger than its time to live is used as is
+        - else the request is sent, conditional on the ETag / Last-Modified of the cached response if any:
+          if the calendar didn't change (304), the cached response is used
+        Args:
+            url (str): the url of the calendar API
+            payload (dict): the payload of the calendar request
+        Returns:
+            the raw JSON response
+        Raises:
+            FileNotFoundError if replay mode is on and the response is not cached
+    """
+
+    cache_file_path = get_lnb_cache_file_path(payload)
+    cache_entry = read_lnb_cache_entry(cache_file_path)
+
+    if config.game_cache_replay:
+        if cache_entry is None:
+            raise FileNotFoundError(f"No cached LNB response for {payload} to replay")
+        return cache_entry['response']
+
+    if cache_entry is not None and time.time() - cache_entry['fetched_at'] < config.game_cache_ttl:
+        return cache_entry['response']
+
+    headers = {}
+    if cache_entry is not None and cache_entry.get('etag'):
+        headers['If-None-Match'] = cache_entry['etag']
+    if cache_entry is not None and cache_entry.get('last_modified'):
+        headers['If-Modified-Since'] = cache_entry['last_modified']
+    response = get_lnb_session().post(url, json=payload, headers=headers, timeout=config.game_extraction_wait_time)
+
+    if response.status_code == 304 and cache_entry is not None:
+        logging.info(f"GAME -> LNB calendar {payload['competition_external_id']} unchanged, cached response used")
+        cache_entry['fetched_at'] = time.time()
+    else:
+        response.raise_for_status()
+        cache_entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'response': response.json()
+        }
+    write_lnb_cache_entry(cache_file_path, cache_entry)
+    return cache_entry['response']
+
+def split_date_time(sr_datetime: pd.Series) -> Tuple[pd.Series, pd.Series]:
+
+    """
+        Formats datetimes as date strings 'YYYY-MM-DD' and time strings 'HH:MM:SS' with one numpy call
+        Args:
+            sr_datetime (series): the datetimes, timezone naive
+        Returns:
+            the series of dates and the series of times, 'NaT' if the datetime is unknown
+    """
+
+    datetime_string = pd.Series(np.datetime_as_string(sr_datetime.to_numpy().astype("datetime64[s]")), index=sr_datetime.index)
+    is_unknown = sr_datetime.isna()
+    return datetime_string.str[:10].mask(is_unknown, "NaT"), datetime_string.str[11:19].mask(is_unknown, "NaT")
+
+def normalize_game_details_lnb(df_game: pd.DataFrame) -> pd.DataFrame:
+
+    """
+        Normalizes the games details coming from LNB website, with column-wise operations only:
+        - dates and times of games, in UTC and converted once per timezone in local
+        - home and away teams names and scores, exploding the teams of all games once
+        Args:
+            df_game (dataframe): the games details as extracted from the LNB website JSON
+        Returns:
+            the dataframe with DATE_GAME_UTC, TIME_GAME_UTC, DATE_GAME_LOCAL, TIME_GAME_LOCAL, TEAM_HOME, SCORE_HOME, TEAM_AWAY, SCORE_AWAY columns
+        Raises:
+            ValueError if a game doesn't have two teams
+    """
+
+    df_game = df_game.copy()
+
+    # we get datetime of game, converted to local once per timezone
+    datetime_utc = pd.to_datetime(df_game["match_time_utc"], utc=True, errors="coerce")
+    datetime_local = pd.Series(pd.NaT, index=df_game.index, dtype="datetime64[ns]")
+    for timezone, index in df_game.groupby("timezone").groups.items():
+        datetime_local.loc[index] = datetime_utc.loc[index].dt.tz_convert(timezone).dt.tz_localize(None)
+    df_game["DATE_GAME_UTC"], df_game["TIME_GAME_UTC"] = split_date_time(datetime_utc.dt.tz_localize(None))
+    df_game["DATE_GAME_LOCAL"], df_game["TIME_GAME_LOCAL"] = split_date_time(datetime_local)
+
+    #we extract values from team: teams of all games are exploded once, home then away for each game
+    teams = df_game["teams"]
+    if not (teams.map(type).eq(list) & teams.str.len().eq(2)).all():
+        raise ValueError("There is no two teams for each games ")
+    df_teams = pd.DataFrame(teams.explode().tolist(), columns=["team_name", "score_string"])
+    df_game["TEAM_HOME"] = df_teams["team_name"].iloc[0::2].to_numpy()
+    df_game["TEAM_AWAY"] = df_teams["team_name"].iloc[1::2].to_numpy()
+    df_game["SCORE_HOME"] = df_teams["score_string"].iloc[0::2].to_numpy()
+    df_game["SCORE_AWAY"] = df_teams["score_string"].iloc[1::2].to_numpy()
+    return df_game
+
 @config.exit_program(log_filter=lambda args: dict(args))
 @config.retry_function(log_filter=lambda args: dict(args))
-def get_game_details_lnb(competition_row: tuple, gameday: str | None = None) -> pd.DataFrame:
+def get_game_details_lnb(competition_row: tuple, gameday: str | None = None, date_range: Tuple[str, str] | None = None) -> pd.DataFrame:
 
     """
         Gets all games details from a competition coming from LNB website, managed in JSON, possibly filtered by gameday
         Args:
             competition_row (tuple) : Basic details about the competition we want to extract from LNB website
             gameday (str): Gameday to filter on if exists
+            date_range (tuple): (start date, end date) 'YYYY-MM-DD' the calendar is requested on, if known. Else the whole calendar is requested
         Returns:
             the dataframe corresponding to all games details extracted from this competition and possibly gameday
         Raises:
@@ -24,16 +225,13 @@ def get_game_details_lnb(competition_row: tuple, gameday: str | None = None) ->
     """
 
     url = "https://api-prod.lnb.fr/match/getCalendar"
+    start_date, end_date = date_range if date_range is not None else ("2000-01-01", "2999-12-31")
     payload = {
         "competition_external_id": int(competition_row.COMPETITION_SOURCE_ID),
-        "start_date": "2000-01-01",
-        "end_date": "2999-12-31"
+        "start_date": start_date,
+        "end_date": end_date
     }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    data = response.json().get("data", [])
+    data = fetch_lnb_calendar(url, payload).get("data", [])
     df_game = pd.json_normalize(data, record_path="data", errors="ignore")
 
     if gameday is not None:
@@ -41,6 +239,8 @@ def get_game_details_lnb(competition_row: tuple, gameday: str | None = None) ->
 
     game_status = df_game["match_status"]
     if not game_status.isin(['SCHEDULED','COMPLETE']).all():
+        # the cached response is expired so that the retry revalidates it
+        expire_lnb_cache_entry(get_lnb_cache_file_path(payload))
         raise ValueError("At least one game is in progress or unknow status- retry extraction later")
     
     df_game["COMPETITION_SOURCE"] = competition_row.COMPETITION_SOURCE
@@ -48,28 +248,7 @@ def get_game_details_lnb(competition_row: tuple, gameday: str | None = None) ->
     df_game["SEASON_ID"] = competition_row.SEASON_ID
     df_game["GAMEDAY"] = df_game["round_description"]
 
-    # we get datetime of game
-    df_game["DATETIME_UTC"] = pd.to_datetime(df_game["match_time_utc"], utc=True, errors="coerce")
-    df_game["DATETIME_LOCAL"] = df_game.apply(
-        lambda r: r["DATETIME_UTC"].astimezone(ZoneInfo(r["timezone"])) if pd.notna(r["DATETIME_UTC"]) else None,
-        axis=1
-    )
-    df_game["DATE_GAME_UTC"] = df_game["DATETIME_UTC"].dt.date.astype(str)
-    df_game["TIME_GAME_UTC"] = df_game["DATETIME_UTC"].dt.time.astype(str)
-    df_game["DATE_GAME_LOCAL"] = df_game["DATETIME_LOCAL"].dt.date.astype(str)
-    df_game["TIME_GAME_LOCAL"] = df_game["DATETIME_LOCAL"].dt.time.astype(str)
-
-    #we extract values from team
-    def extract_team(teams, index, field):
-        if not isinstance(teams, list) or len(teams) != 2:
-            raise ValueError("There is no two teams for each games ")
-        return teams[index].get(field)
-
-    df_game["TEAM_HOME"] = df_game["teams"].apply(lambda t: extract_team(t, 0, "team_name"))
-    df_game["TEAM_AWAY"] = df_game["teams"].apply(lambda t: extract_team(t, 1, "team_name"))
-    df_game["SCORE_HOME"] = df_game["teams"].apply(lambda t: extract_team(t, 0, "score_string"))
-    df_game["SCORE_AWAY"] = df_game["teams"].apply(lambda t: extract_team(t, 1, "score_string"))
-
+    df_game = normalize_game_details_lnb(df_game)
     df_game["GAME_SOURCE_ID"] = df_game["match_id"]
 
     # Final selection
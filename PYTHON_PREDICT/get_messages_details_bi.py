@@ -4,9 +4,17 @@
 from datetime import datetime
 import pandas as pd
 from bs4 import BeautifulSoup as bs
+from bs4.element import Tag
 
 import config
 
+# We use the faster lxml tree builder when it is installed, else the python built-in one
+try:
+    import lxml
+    html_parser = "lxml"
+except ImportError:
+    html_parser = "html.parser"
+
 @config.raise_issue_to_caller(log_filter=lambda args: {})
 def translate_french_special_date_to_english(date_string: str) -> str:
 
@@ -61,7 +69,7 @@ def get_users_bi(messagetext: str) -> list[str]:
     """
 
     #We parse using BeautifulSoup
-    soup = bs(messagetext, "html.parser")
+    soup = bs(messagetext, html_parser)
     users = [
         a_tag.text.strip()
         for span in soup.find_all('span', class_='responsive-hide')
@@ -83,7 +91,7 @@ def get_ids_bi(messagetext: str) -> list[str]:
     """    
 
     #We parse using BeautifulSoup
-    soup = bs(messagetext, "html.parser")
+    soup = bs(messagetext, html_parser)
     ids = [
         int(id_tag.get('id').replace('profile', ''))
         for id_tag in soup.find_all('dl', class_='postprofile') 
@@ -105,7 +113,7 @@ def get_creationtimes_bi(messagetext: str) -> list[datetime]:
     """    
     #We parse using BeautifulSoup and transform the french forum special date to timestamp
     #French forum date: Lun. 01 Fev 2025 9:08:00 -> Return date: 2025-02-01 09:08:00
-    soup = bs(messagetext, "html.parser")
+    soup = bs(messagetext, html_parser)
     creationtimes = [
             transform_forum_time_to_datetime(
                 translate_french_special_date_to_english(
@@ -117,53 +125,94 @@ def get_creationtimes_bi(messagetext: str) -> list[datetime]:
     return creationtimes
 
 @config.raise_issue_to_caller(log_filter=lambda args: {})
-def get_contents_outerblockquote_bi(messagetext: str) -> list[str]:
+def get_content_outerblockquote(content_tag: Tag) -> str:
 
     """
-        Gets the content of all messages, with their outer blockquote if any
+        Gets the content of one message, with its outer blockquote if any
         Args:
-            messagetext (string) : The HTML list of messages
+            content_tag (tag) : The parsed "content" div of the message - it is modified in place
         Returns:
-            list of string with the content of messages shorten on one line, possibly with outer blockquotes
+            string with the content of the message shorten on one line, possibly with outer blockquotes
         Raises:
             Raise the issue to the caller if exception
-    """  
+    """
 
-    #we remove tags except outer blockquote ones
-    def keep_only_outer_blockquote_tags(html):
-        soup = bs(html, 'html.parser')
+    # Find all blockquotes nested inside other blockquotes and unwrap them
+    for nested in content_tag.select('blockquote blockquote'):
+        nested.unwrap()  # Remove only the tag, keep content
 
-        # Find all blockquotes nested inside other blockquotes and unwrap them
-        for nested in soup.select('blockquote blockquote'):
-            nested.unwrap()  # Remove only the tag, keep content
+    # Now replace the remaining blockquotes with placeholders
+    for bq in content_tag.find_all('blockquote'):
+        bq.insert_before('___BLOCKQUOTE_START___')
+        bq.insert_after('___BLOCKQUOTE_END___')
+        bq.unwrap()
 
-        # Now replace the remaining blockquotes with placeholders
-        for bq in soup.find_all('blockquote'):
-            bq.insert_before('___BLOCKQUOTE_START___')
-            bq.insert_after('___BLOCKQUOTE_END___')
-            bq.unwrap()
+    text = content_tag.get_text()
 
-        text = soup.get_text()
+    # Restore blockquote tags only for the outer ones
+    text = text.replace('___BLOCKQUOTE_START___', '<blockquote>')
+    text = text.replace('___BLOCKQUOTE_END___', '</blockquote>')
 
-        # Restore blockquote tags only for the outer ones
-        text = text.replace('___BLOCKQUOTE_START___', '<blockquote>')
-        text = text.replace('___BLOCKQUOTE_END___', '</blockquote>')
+    #For a better messages readibility on the database we replace all "new line" to have the message content in one line
+    return text.replace('\n', ' ;;;;; ')
 
-        return text
+@config.raise_issue_to_caller(log_filter=lambda args: {})
+def get_contents_outerblockquote_bi(messagetext: str) -> list[str]:
 
-    # First, parse the main HTML
-    soup = bs(messagetext, "html.parser")
+    """
+        Gets the content of all messages, with their outer blockquote if any
+        Args:
+            messagetext (string) : The HTML list of messages
+        Returns:
+            list of string with the content of messages shorten on one line, possibly with outer blockquotes
+        Raises:
+            Raise the issue to the caller if exception
+    """  
 
-    # Now apply the transformation
+    #We parse using BeautifulSoup then we remove tags except outer blockquote ones
+    soup = bs(messagetext, html_parser)
     contents = [
-        keep_only_outer_blockquote_tags(str(div))
+        get_content_outerblockquote(div)
         for div in soup.find_all('div', class_='content')
     ]
-    #For a better messages readibility on the database we replace all "new line" to have the message content in one line
-    contents = [c.replace('\n', ' ;;;;; ') for c in contents]
-
     return contents
 
+@config.raise_issue_to_caller(log_filter=lambda args: {})
+def get_editiontime_from_postbody(postbody: Tag) -> datetime | None:
+
+    """
+        Gets the edition time of one message if it exists (message edited)
+        Args:
+            postbody (tag) : The parsed "postbody" div of the message
+        Returns:
+            None (if not edited) or timestamp corresponding to the edition time
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    # Search for the notice containing "Modifié en dernier par"
+    notice = postbody.find("div", class_="notice")
+    if not notice:
+        return None
+    # Extract the edition string text
+    text = notice.get_text(strip=True)
+    # Find the part of the text starting with "Modifié en dernier par"
+    if "Modifié en dernier par" not in text:
+        return None
+    raw_date = text.split("Modifié en dernier par")[1].strip()
+    # Clean the string to remove the username and extra details
+    parts = raw_date.split("le ")
+    if len(parts) <= 1:
+        return None
+
+    #We transform special type french forum dates into a timestamp
+    #French forum date: Lun. 01 Fev 2025 9:08:00 -> Return date: 2025-02-01 09:08:00
+    return transform_forum_time_to_datetime(
+        translate_french_special_date_to_english(
+            parts[1].split(",")[0].strip()
+        )
+    )
+
 @config.raise_issue_to_caller(log_filter=lambda args: {})
 def get_editiontimes_bi(messagetext: str) -> list[datetime | None]:
 
@@ -177,40 +226,63 @@ def get_editiontimes_bi(messagetext: str) -> list[datetime | None]:
             Raise the issue to the caller if exception
     """
     
-    #We parse using BeautifulSoup
-    # Find all messages
-    soup = bs(messagetext, "html.parser")
-    messages = soup.find_all("div", class_="postbody")
-    
-    result = []
-
-    # Iterate over all messages and extract the cleaned edition string
-    for message in messages:
-        # Search for the notice containing "Modifié en dernier par"
-        notice = message.find("div", class_="notice")
-        if notice:
-            # Extract the edition string text
-            text = notice.get_text(strip=True)
-            # Find the part of the text starting with "Modifié en dernier par"
-            if "Modifié en dernier par" in text:
-                raw_date = text.split("Modifié en dernier par")[1].strip()
-                # Clean the string to remove the username and extra details
-                parts = raw_date.split("le ")
-                if len(parts) > 1:
-                    result.append(parts[1].split(",")[0].strip())
-                else:
-                    result.append(None)
-            else:
-                result.append(None)
-        else:
-            result.append(None)
-            
-    #We transform special type french forum dates into a timestamp
-    #French forum date: Lun. 01 Fev 2025 9:08:00 -> Return date: 2025-02-01 09:08:00
-    result_en = [translate_french_special_date_to_english(res) if res is not None else None for res in result]
-    result_date = [transform_forum_time_to_datetime(res) if res is not None else None for res in result_en]
-    
-    return result_date
+    #We parse using BeautifulSoup and extract the edition time of each message
+    soup = bs(messagetext, html_parser)
+    edition_times = [
+        get_editiontime_from_postbody(message)
+        for message in soup.find_all("div", class_="postbody")
+    ]
+    return edition_times
+
+@config.raise_issue_to_caller(log_filter=lambda args: {})
+def get_messages_columns_bi(messagetext: str) -> dict[str, list]:
+
+    """
+        Gets all details of messages parsing the HTML page only once:
+        each message "postbody" is walked a single time to extract every column
+        Args:
+            messagetext (string) : The HTML list of messages
+        Returns:
+            data dictionary with one list per column (users, ids, creation times, edition times, contents)
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    soup = bs(messagetext, html_parser)
+    columns = {
+        'USER': [],
+        'MESSAGE_FORUM_ID': [],
+        'CREATION_TIME_LOCAL': [],
+        'EDITION_TIME_LOCAL': [],
+        'MESSAGE_CONTENT': []
+    }
+
+    for postbody in soup.find_all("div", class_="postbody"):
+        # the profile of the message, holding its id, is just before its body
+        profile = postbody.find_previous_sibling('dl', class_='postprofile')
+        if profile and isinstance(profile.get('id'), str):
+            columns['MESSAGE_FORUM_ID'].append(int(profile.get('id').replace('profile', '')))
+
+        # the author line holds the user and the creation time
+        for span in postbody.find_all('span', class_='responsive-hide'):
+            if (a_tag := span.find('a', class_='username')):
+                columns['USER'].append(a_tag.text.strip())
+        for time_tag in postbody.find_all("time"):
+            columns['CREATION_TIME_LOCAL'].append(
+                transform_forum_time_to_datetime(
+                    translate_french_special_date_to_english(
+                        time_tag.get_text(strip=True)
+                    )
+                )
+            )
+
+        columns['EDITION_TIME_LOCAL'].append(get_editiontime_from_postbody(postbody))
+
+        # the content is modified in place, so we extract it last
+        for div in postbody.find_all('div', class_='content'):
+            columns['MESSAGE_CONTENT'].append(get_content_outerblockquote(div))
+
+    return columns
 
 @config.raise_issue_to_caller(log_filter=lambda args: {})
 def get_messages_details_bi(messagetext: str, topic_row: pd.Series, start: int) -> pd.DataFrame:
@@ -230,25 +302,17 @@ def get_messages_details_bi(messagetext: str, topic_row: pd.Series, start: int)
     #we calculate for logging purpose
     log_print = f"{topic_row['FORUM_SOURCE']} / {topic_row['TOPIC_NUMBER']} / {start}"
 
-    #We get the details
-    users = get_users_bi(messagetext)
-    ids = get_ids_bi(messagetext)
-    creation_times_local = get_creationtimes_bi(messagetext)
-    contents = get_contents_outerblockquote_bi(messagetext)
-    edition_times_local = get_editiontimes_bi(messagetext)
+    #We get the details, parsing the page once
+    columns = get_messages_columns_bi(messagetext)
 
     #if not all list are same size we raise an error to the exit_program decorator
-    if len(set([len(users), len(ids), len(creation_times_local), len(contents), len(edition_times_local)])) != 1:
+    if len(set(len(values) for values in columns.values())) != 1:
         raise ValueError(f"A problem was noticed extracting messages. {log_print}")
 
     df_messages_infos = pd.DataFrame({
         'FORUM_SOURCE': topic_row['FORUM_SOURCE'],
         'TOPIC_NUMBER': topic_row['TOPIC_NUMBER'],
-        'USER': users,
-        'MESSAGE_FORUM_ID': ids,
-        'CREATION_TIME_LOCAL': creation_times_local,
-        'EDITION_TIME_LOCAL': edition_times_local,
-        'MESSAGE_CONTENT': contents
+        **columns
     })
 
     return df_messages_infos
\ No newline at end of file
@@ -1,26 +1,123 @@
 '''
     The purpose of this module is to process imgbb image storage website actions.
-    It pushes capture on the website, and get the url
+    It pushes capture on the website, and get the url.
+    Urls of captures already pushed are cached per content hash, so that the same capture is never pushed twice
 '''
+import logging
+logging.basicConfig(level=logging.INFO)
 import os
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+import pandas as pd
 
 import config
+from file_actions import create_csv
+
+# Global variables to store the pooled session used to call the ImgBB API, shared by all captures pushed in parallel
+imgbb_session = None
+imgbb_session_lock = threading.Lock()
+
+# Global variables to store the urls of captures already pushed, per content hash
+imgbb_cache = {}
+imgbb_cache_lock = threading.Lock()
+
+def get_imgbb_session() -> requests.Session:
+
+    '''
+        Gets the session used to call the ImgBB API, creating it at first call.
+        The session keeps its connections alive and is shared by all captures
+        Returns:
+            the session of the ImgBB API
+    '''
+
+    global imgbb_session
+    with imgbb_session_lock:
+        if imgbb_session is None:
+            imgbb_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.capture_max_workers)
+            imgbb_session.mount('https://', adapter)
+        return imgbb_session
+
+def close_imgbb_session():
+
+    '''
+        Closes the session used to call the ImgBB API
+    '''
+
+    global imgbb_session
+    with imgbb_session_lock:
+        if imgbb_session is not None:
+            imgbb_session.close()
+            imgbb_session = None
+
+def get_capture_hash(capture_content: pd.DataFrame | str, capture_kind: str) -> str:
+
+    '''
+        Calculates the hash of the content of a capture: two captures with the same hash are the same image
+        Inputs:
+            capture_content (dataframe or str): the dataframe captured, or the text the capture is drawn from
+            capture_kind (str): the kind of capture (e.g. the capture function name), as the same content can be drawn differently
+        Returns:
+            the content hash (hexadecimal)
+    '''
+
+    content_hash = hashlib.sha256(capture_kind.encode('utf-8'))
+    if isinstance(capture_content, pd.DataFrame):
+        content_hash.update(repr(capture_content.columns.tolist()).encode('utf-8'))
+        content_hash.update(pd.util.hash_pandas_object(capture_content, index=False).to_numpy().tobytes())
+    else:
+        content_hash.update(capture_content.encode('utf-8'))
+    return content_hash.hexdigest()
+
+def load_imgbb_cache(df_imgbb_cache: pd.DataFrame | None):
+
+    '''
+        Loads the urls of captures pushed at previous runs
+        Inputs:
+            df_imgbb_cache (dataframe): the url of each capture already pushed, per content hash, if any
+    '''
+
+    if df_imgbb_cache is None:
+        return
+    with imgbb_cache_lock:
+        imgbb_cache.update(zip(df_imgbb_cache['CAPTURE_HASH'], df_imgbb_cache['IMAGE_URL']))
+
+def get_cached_capture_url(capture_hash: str) -> str | None:
+
+    '''
+        Gets the url of a capture already pushed
+        Inputs:
+            capture_hash (str): the content hash of the capture
+        Returns:
+            the url of the capture online, None if it has never been pushed
+    '''
+
+    with imgbb_cache_lock:
+        return imgbb_cache.get(capture_hash)
 
 @config.exit_program(log_filter=lambda args: dict(args))
 @config.retry_function(log_filter=lambda args: dict(args))
-def push_capture_online(image_path: str) -> str:
+def push_capture_online(image_path: str, capture_hash: str | None = None) -> str:
 
     '''
-        Sends an image of a capture on ImgBB website
+        Sends an image of a capture on ImgBB website, unless it has already been pushed
         Input:
             image_path(str): The path of the capture on the local environment
+            capture_hash(str): The content hash of the capture, if known. The url is then cached with this hash
         Returns:
-            The url of the capture online  
+            The url of the capture online
         Raises:
             Retry 3 times and exits the program if error with ImgBB (using decorators)
     '''
 
+    if capture_hash is not None:
+        image_url = get_cached_capture_url(capture_hash)
+        if image_url is not None:
+            logging.info(f"IMGBB -> {image_path} ALREADY PUSHED, CACHED URL USED")
+            return image_url
+
     # we send online using the ImgBB API
     api_key = os.getenv('IMGBB_API_KEY')
     with open(image_path, 'rb') as file:
@@ -31,7 +128,14 @@ def push_capture_online(image_path: str) -> str:
         files = {
             "image": file,
         }
-        response = requests.post(url, data=payload, files=files)
-        
+        response = get_imgbb_session().post(url, data=payload, files=files, timeout=config.imgbb_wait_time)
+
     image_url = response.json()['data']['url']
-    return image_url
\ No newline at end of file
+
+    # we cache the url and write the cache file, so that it is uploaded with outputs
+    if capture_hash is not None:
+        with imgbb_cache_lock:
+            imgbb_cache[capture_hash] = image_url
+            df_imgbb_cache = pd.DataFrame(list(imgbb_cache.items()), columns=['CAPTURE_HASH','IMAGE_URL'])
+            create_csv(os.path.join(config.TMPF, 'imgbb_cache.csv'), df_imgbb_cache, config.imgbb_cache_encapsulated)
+    return image_url
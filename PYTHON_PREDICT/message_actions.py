@@ -10,13 +10,15 @@ logging.basicConfig(level=logging.INFO)
 import warnings
 warnings.filterwarnings("ignore")
 import os
-import ssl
+import threading
 import pandas as pd
-import urllib.request as urllib
 import pytz
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup as bs
 import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
 from get_messages_details_bi import get_messages_details_bi
@@ -29,18 +31,142 @@ messages_info_functions = {
     "BI": get_messages_details_bi
 }
 
+# Global variables to store, per forum source, the pooled session used to crawl it,
+# the cap of simultaneous requests and the time reserved for the last request
+forum_crawl_sessions = {}
+forum_crawl_semaphores = {}
+forum_crawl_last_request = {}
+forum_crawl_lock = threading.Lock()
+
+def get_forum_crawl_session(forum_source: str) -> requests.Session:
+
+    """
+        Gets the session used to crawl a forum, creating it at first call.
+        The session keeps its connections alive and is shared by all topics of the forum
+        Args:
+            forum_source (str): the forum source
+        Returns:
+            the session of the forum
+    """
+
+    with forum_crawl_lock:
+        if forum_source not in forum_crawl_sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.forum_max_connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # we overwrite security for extracting from the website
+            session.verify = False
+            forum_crawl_sessions[forum_source] = session
+            forum_crawl_semaphores[forum_source] = threading.BoundedSemaphore(config.forum_max_connections)
+            forum_crawl_last_request[forum_source] = 0.0
+        return forum_crawl_sessions[forum_source]
+
+def wait_forum_politeness_delay(forum_source: str):
+
+    """
+        Waits until the politeness delay since the previous request on the forum is over.
+        The time slot is reserved under lock so that concurrent requests are spaced out
+        Args:
+            forum_source (str): the forum source
+    """
+
+    with forum_crawl_lock:
+        now = time.monotonic()
+        request_time = max(now, forum_crawl_last_request[forum_source] + config.forum_politeness_delay)
+        forum_crawl_last_request[forum_source] = request_time
+    if request_time > now:
+        time.sleep(request_time - now)
+
+def close_forum_crawl_sessions():
+
+    """
+        Closes the sessions used to crawl forums
+    """
+
+    with forum_crawl_lock:
+        for session in forum_crawl_sessions.values():
+            session.close()
+        forum_crawl_sessions.clear()
+        forum_crawl_semaphores.clear()
+        forum_crawl_last_request.clear()
+
+@config.raise_issue_to_caller(log_filter=lambda args: {k: args[k] for k in ('topic_row','start')})
+def fetch_topic_page(topic_row: pd.Series, start: int) -> str:
+
+    """
+        Gets the html of one page of a topic, within the concurrency cap and politeness delay of its forum
+        Args:
+            topic_row (serie) : Contains basic info about the topic
+            start (int): the offset of the first message of the page
+        Returns:
+            str: the html of the page
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    forum_source = topic_row['FORUM_SOURCE']
+    forum_url = os.getenv(forum_source + '_URL')
+    page_url = f"{forum_url}/viewtopic.php?t={topic_row['TOPIC_NUMBER']}&start={start}"
+    session = get_forum_crawl_session(forum_source)
+    logging.info(f"MESSAGES -> EXTRACTING FORUM {forum_source} / TOPIC {topic_row['TOPIC_NUMBER']} / MESSAGES {start+1} -> X [START] ")
+    with forum_crawl_semaphores[forum_source]:
+        wait_forum_politeness_delay(forum_source)
+        response = session.get(page_url, timeout=config.forum_page_wait_time)
+    response.raise_for_status()
+    return response.content.decode('utf-8')
+
+@config.raise_issue_to_caller(log_filter=lambda args: {k: args[k] for k in ('topic_row','start')})
+def parse_topic_page(messagetext: str, topic_row: pd.Series, start: int) -> pd.DataFrame:
+
+    """
+        Gets all messages from the html of one page of a topic
+        Args:
+            messagetext (str): the html of the page
+            topic_row (serie) : Contains basic info about the topic
+            start (int): the offset of the first message of the page
+        Returns:
+            dataframe: contains all messages of the page
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    get_messages_infos = messages_info_functions.get(topic_row['FORUM_SOURCE'])
+    return get_messages_infos(messagetext, topic_row, start)
+
+@config.raise_issue_to_caller(log_filter=lambda args: {k: args[k] for k in ('topic_row','start')})
+def read_topic_page(topic_row: pd.Series, start: int) -> pd.DataFrame:
+
+    """
+        Gets all messages from one page of a topic
+        Args:
+            topic_row (serie) : Contains basic info about the topic
+            start (int): the offset of the first message of the page
+        Returns:
+            dataframe: contains all messages of the page
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    return parse_topic_page(fetch_topic_page(topic_row, start), topic_row, start)
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('topic_row',)})
 @config.retry_function(log_filter=lambda args: {k: args[k] for k in ('topic_row',)})
-def extract_messages_from_topic(topic_row: pd.Series,ts_message_extract_min_utc: pd.Timestamp,ts_message_extract_max_utc: pd.Timestamp) -> pd.DataFrame | None:
+def extract_messages_from_topic(topic_row: pd.Series,ts_message_extract_min_utc: pd.Timestamp,ts_message_extract_max_utc: pd.Timestamp, sr_topic_cursor: pd.Series | None = None) -> Tuple[pd.DataFrame | None, dict]:
         
     """
-        Gets all messages in the time range of a topic
+        Gets all messages in the time range of a topic.
+        Without cursor, the topic is crawled from its beginning.
+        With a cursor, the topic is crawled forward from the last page seen at the previous run,
+        then backward only as far as the time range needs
         Args:
             topic_row (serie) : Contains basic info about the topic
             ts_message_extract_min_utc (timestamp utc): the min of the range of time for messages extraction
             ts_message_extract_max_utc (timestamp utc): the max of the range of time for messages extraction
+            sr_topic_cursor (serie - one row): the cursor of the topic saved at the previous run, if any
         Returns:
-            dataframe: contains all message in the time range from this topic, or None if there are no topics
+            - dataframe: contains all message in the time range from this topic, or None if there are no topics
+            - dict: the cursor of the topic updated
         Raises:
             Retry 3 times and exits the program if error with url extraction (using retry decorator)
     """
@@ -49,53 +175,100 @@ def extract_messages_from_topic(topic_row: pd.Series,ts_message_extract_min_utc:
     local_timezone = pytz.timezone(topic_row['FORUM_TIMEZONE'])
     ts_message_extract_min_local = pytz.UTC.localize(ts_message_extract_min_utc).astimezone(local_timezone).strftime("%Y-%m-%d %H:%M:%S")
     ts_message_extract_max_local = pytz.UTC.localize(ts_message_extract_max_utc).astimezone(local_timezone).strftime("%Y-%m-%d %H:%M:%S")
-    
-    #Initial parameters
-    forum_url = os.getenv(topic_row['FORUM_SOURCE'] + '_URL')
-    start = 0
-    seen_message_ids = set()
-    topic_messages = []
-    # we overwrite security for extracting from the website
-    ssl_context = ssl._create_unverified_context()
-    
-    while True:
-        #we extract from the website page
-        page_url = f"{forum_url}/viewtopic.php?t={topic_row['TOPIC_NUMBER']}&start={start}"
-        logging.info(f"MESSAGES -> EXTRACTING FORUM {topic_row['FORUM_SOURCE']} / TOPIC {topic_row['TOPIC_NUMBER']} / MESSAGES {start+1} -> X [START] ")
-        response = urllib.urlopen(page_url, context=ssl_context)
-        messagetext = response.read()
-        messagetext = messagetext.decode('utf-8') 
-        #we get all messages from the page
-        get_messages_infos = messages_info_functions.get(topic_row['FORUM_SOURCE'])
-        df = get_messages_infos(messagetext, topic_row, start)
-        current_ids = set(df['MESSAGE_FORUM_ID'])
-        #if we already saw messages we stop here
-        if current_ids.intersection(seen_message_ids):
-            logging.info(f"MESSAGES -> BREAKING TOPIC {topic_row['TOPIC_NUMBER']}")
-            break
-        #else we add those new message of the list of seen messages
-        seen_message_ids.update(current_ids)
-        start += len(df)
+    # messages created before this limit are considered too old to be edited in the time range
+    ts_crawl_min_local = datetime.strptime(ts_message_extract_min_local, "%Y-%m-%d %H:%M:%S") - timedelta(hours=config.message_edition_lookback_hours)
 
-        # Filter on timestamp range (either creation date with none edition or edition date)
+    # Filter on timestamp range (either creation date with none edition or edition date)
+    def filter_time_range(df):
         creation_with_editionNone = df['CREATION_TIME_LOCAL'].between(ts_message_extract_min_local, ts_message_extract_max_local) & df['EDITION_TIME_LOCAL'].isna()
         edition = df['EDITION_TIME_LOCAL'].between(ts_message_extract_min_local, ts_message_extract_max_local)
-        df_filtered = df[creation_with_editionNone | edition]
+        return df[creation_with_editionNone | edition]
 
+    #Initial parameters - we start from the cursor page if the topic has already been crawled
+    if sr_topic_cursor is not None:
+        cursor_start = int(sr_topic_cursor['LAST_PAGE_START'])
+        page_size = int(sr_topic_cursor['PAGE_SIZE'])
+        last_message_forum_id = int(sr_topic_cursor['LAST_MESSAGE_FORUM_ID'])
+    else:
+        cursor_start = 0
+        page_size = 0
+        last_message_forum_id = 0
+    start = cursor_start
+    last_page_start = cursor_start
+    max_message_forum_id = last_message_forum_id
+    seen_message_ids = set()
+    topic_messages = []
+    
+    # we crawl forward until the end of the topic.
+    # Once the page size is known, the next pages are fetched in advance while the current one is parsed
+    topic_ended = False
+    with ThreadPoolExecutor(config.topic_prefetch_pages) as prefetch_executor:
+        while not topic_ended:
+            nb_pages = config.topic_prefetch_pages if page_size > 0 else 1
+            page_starts = [start + i * page_size for i in range(nb_pages)]
+            pages_fetched = [prefetch_executor.submit(fetch_topic_page, topic_row, page_start) for page_start in page_starts]
+            for page_start, page_fetched in zip(page_starts, pages_fetched):
+                #if the previous page was shorter than expected, the prefetched pages are not aligned: we fetch again from there
+                if page_start != start:
+                    break
+                df = parse_topic_page(page_fetched.result(), topic_row, page_start)
+                current_ids = set(df['MESSAGE_FORUM_ID'])
+                #if we already saw messages (or there are no more) we stop here
+                if df.empty or current_ids.intersection(seen_message_ids):
+                    logging.info(f"MESSAGES -> BREAKING TOPIC {topic_row['TOPIC_NUMBER']}")
+                    topic_ended = True
+                    break
+                #else we add those new message of the list of seen messages
+                seen_message_ids.update(current_ids)
+                last_page_start = start
+                page_size = max(page_size, len(df))
+                max_message_forum_id = max(max_message_forum_id, max(current_ids))
+                start += len(df)
+
+                df_filtered = filter_time_range(df)
+                if not df_filtered.empty:
+                    topic_messages.append(df_filtered)
+                
+                logging.info(f"MESSAGES -> EXTRACTING FORUM {topic_row['FORUM_SOURCE']} / TOPIC {topic_row['TOPIC_NUMBER']} / MESSAGES X -> {start} [DONE] ")
+            # prefetches not started yet are cancelled: the ones already running finish when the executor exits, and their pages are discarded
+            for page_fetched in pages_fetched:
+                page_fetched.cancel()
+
+    # we crawl backward from the cursor page, until a page contains only messages seen at previous runs and reaches messages too old for the time range
+    start = cursor_start
+    while start > 0 and page_size > 0:
+        start = max(start - page_size, 0)
+        df = read_topic_page(topic_row, start)
+        df_new = df[~df['MESSAGE_FORUM_ID'].isin(seen_message_ids)]
+        seen_message_ids.update(df['MESSAGE_FORUM_ID'])
+
+        df_filtered = filter_time_range(df_new)
         if not df_filtered.empty:
-            topic_messages.append(df_filtered)
-        
-        logging.info(f"MESSAGES -> EXTRACTING FORUM {topic_row['FORUM_SOURCE']} / TOPIC {topic_row['TOPIC_NUMBER']} / MESSAGES X -> {start} [DONE] ")
-    return pd.concat(topic_messages, ignore_index=True) if topic_messages else None
+            # pages are crawled backward, so we insert them first to keep the messages order
+            topic_messages.insert(0, df_filtered)
+
+        if df.empty or (df['MESSAGE_FORUM_ID'].max() <= last_message_forum_id and pd.to_datetime(df['CREATION_TIME_LOCAL']).min() < ts_crawl_min_local):
+            logging.info(f"MESSAGES -> BREAKING TOPIC {topic_row['TOPIC_NUMBER']} BACKWARD AT MESSAGE {start+1}")
+            break
+
+    topic_cursor = {
+        'FORUM_SOURCE': topic_row['FORUM_SOURCE'],
+        'TOPIC_NUMBER': topic_row['TOPIC_NUMBER'],
+        'PAGE_SIZE': page_size,
+        'LAST_PAGE_START': last_page_start,
+        'LAST_MESSAGE_FORUM_ID': max_message_forum_id
+    }
+    return (pd.concat(topic_messages, ignore_index=True) if topic_messages else None), topic_cursor
 
 @config.exit_program(log_filter=lambda args: {})
-def extract_messages(sr_snowflake_account: pd.Series, sr_output_need: pd.Series) -> Tuple[pd.DataFrame, pd.Timestamp]:
+def extract_messages(sr_snowflake_account: pd.Series, sr_output_need: pd.Series, df_topic_cursor: pd.DataFrame | None = None) -> Tuple[pd.DataFrame, pd.Timestamp]:
 
     """
         Gets all messages we need to extract from the list of topics and time range
         Args:
             sr_snowflake_account (series - one row) : Contains snowflake parameters to run the query
             sr_output_need (series - one row): the output need file to get the range minimum of extraction
+            df_topic_cursor (dataframe): the cursors of topics saved at the previous run, if any
         Returns:
             - dataframe: contains all messages needed
             - datetime of extraction of messages
@@ -117,19 +290,71 @@ def extract_messages(sr_snowflake_account: pd.Series, sr_output_need: pd.Series)
     if ts_message_extract_min_utc >= ts_message_extract_max_utc:
         logging.info(f"MESSAGES -> no need to extract messages")
     else:
-        # We parallelize the extraction of each topic    
-        messages_args = [(row,ts_message_extract_min_utc,ts_message_extract_max_utc) 
+        # We parallelize the extraction of each topic, starting from its cursor if any.
+        # The requests on each forum are capped and spaced out by its crawl session
+        messages_args = [(row,ts_message_extract_min_utc,ts_message_extract_max_utc,get_topic_cursor(df_topic_cursor,row)) 
                     for _, row in topics_scope_id.iterrows()]
-        results = config.multithreading_run(extract_messages_from_topic, messages_args)
-        messages_extracted = [r for r in results if r is not None]
+        try:
+            results = config.multithreading_run(extract_messages_from_topic, messages_args, config.topic_max_workers)
+        finally:
+            close_forum_crawl_sessions()
+        messages_extracted = [df for df, _ in results if df is not None]
 
         if len(messages_extracted) > 0:
             df_messages = pd.concat(messages_extracted, ignore_index=True)
 
+        update_topic_cursor(df_topic_cursor, [topic_cursor for _, topic_cursor in results])
+
     create_csv(os.path.join(config.TMPF, 'message_check.csv'), df_messages, config.message_encapsulated)
     logging.info(f"MESSAGES -> EXTRACTING MESSAGES [DONE]")
     return df_messages, ts_message_extract_max_utc
 
+@config.raise_issue_to_caller(log_filter=lambda args: {k: args[k] for k in ('topic_row',)})
+def get_topic_cursor(df_topic_cursor: pd.DataFrame | None, topic_row: pd.Series) -> pd.Series | None:
+
+    """
+        Gets the cursor of a topic saved at the previous run
+        Args:
+            df_topic_cursor (dataframe): the cursors of all topics, if any
+            topic_row (series - one row): basic info about the topic
+        Returns:
+            series of the topic cursor, or None if the topic has never been crawled
+        Raises:
+            Raise the issue to the caller if exception
+    """
+
+    if df_topic_cursor is None:
+        return None
+    df_cursor = df_topic_cursor[
+        (df_topic_cursor['FORUM_SOURCE'] == topic_row['FORUM_SOURCE']) &
+        (df_topic_cursor['TOPIC_NUMBER'] == topic_row['TOPIC_NUMBER'])
+    ]
+    return df_cursor.iloc[0] if not df_cursor.empty else None
+
+@config.exit_program(log_filter=lambda args: {})
+def update_topic_cursor(df_topic_cursor: pd.DataFrame | None, lst_topic_cursor: list[dict]) -> pd.DataFrame:
+
+    """
+        Updates the cursors of topics with the ones crawled during the run and creates the file related
+        Args:
+            df_topic_cursor (dataframe): the cursors of all topics saved at the previous run, if any
+            lst_topic_cursor (list): the cursors of topics crawled during the run
+        Returns:
+            dataframe of all topics cursors updated
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+
+    df_new_cursor = pd.DataFrame(lst_topic_cursor, columns=['FORUM_SOURCE','TOPIC_NUMBER','PAGE_SIZE',
+                                                            'LAST_PAGE_START','LAST_MESSAGE_FORUM_ID'])
+    #we keep cursors of topics not crawled during the run
+    if df_topic_cursor is not None and not df_topic_cursor.empty:
+        df_new_cursor = pd.concat([df_topic_cursor, df_new_cursor], ignore_index=True)
+        df_new_cursor = df_new_cursor.drop_duplicates(subset=['FORUM_SOURCE','TOPIC_NUMBER'], keep='last').reset_index(drop=True)
+
+    create_csv(os.path.join(config.TMPF, 'topic_cursor.csv'), df_new_cursor, config.topic_cursor_encapsulated)
+    return df_new_cursor
+
 @config.exit_program(log_filter=lambda args: {})
 def get_list_topics_from_need(sr_snowflake_account: pd.Series,sr_output_need: pd.Series) -> pd.DataFrame:
 
@@ -184,12 +409,93 @@ def get_extraction_time_range(sr_snowflake_account: pd.Series, sr_output_need: p
 
     return ts_message_extract_min_utc,ts_message_extract_max_utc
 
+@config.raise_issue_to_caller(log_filter=lambda args: {k: args[k] for k in ('forum_source',)})
+def login_forum_bi(session: requests.Session, forum_source: str) -> str | None:
+
+    '''
+        Logs in on the "BI" forum with the session
+        Inputs:
+            session (session): the session to log in with, keeping the cookies of the login
+            forum_source (str): the forum source, to get its url and credentials
+        Returns:
+            the sid of the login, or None if the login didn't work
+        Raises:
+            Raise the issue to the caller if exception
+    '''
+
+    login_url = os.getenv(forum_source + '_URL') +'/ucp.php?mode=login'
+    connect_dict = {
+        "username": os.getenv(forum_source+'_USERNAME'),
+        "password": os.getenv(forum_source+'_PASSWORD'),
+        "autologin": "on", 
+        "login": "Connexion" 
+    }
+
+    #We get the login page
+    connect_get = session.get(login_url, verify=False)
+    soup = bs(connect_get.text, "html.parser")
+    connect_dict['sid'] = soup.find("input", {"name": "sid"})["value"]
+    connect_dict['form_token'] = soup.find("input", {"name": "form_token"})["value"]
+    connect_dict['creation_time'] = soup.find("input", {"name": "creation_time"})["value"]        
+
+    # We post the dictionary to login
+    connect_post = session.post(login_url, data=connect_dict, verify=False)
+    connect_post_worked = ('Déconnexion' in connect_post.text)
+    if connect_post_worked:
+        logging.info(f"MESSAGES -> LOGGED IN ON {forum_source}")
+        return connect_dict['sid']
+    return None
+
+forum_login_functions = {
+    "BI": login_forum_bi
+}
+
+# Global variables to store, per forum source, the logged-in session used to post and the sid of its login
+forum_post_sessions = {}
+forum_post_sids = {}
+forum_post_lock = threading.Lock()
+
+def get_forum_post_session(forum_source: str, expired_sid: str | None = None) -> Tuple[requests.Session | None, str | None]:
+
+    '''
+        Gets the logged-in session used to post on a forum.
+        The login is done once per run and shared by all topics of the forum:
+        it is done again only if the session used by the caller has expired (and no other topic has already logged in again)
+        Inputs:
+            forum_source (str): the forum source
+            expired_sid (str): the sid of the session the caller found expired, if any
+        Returns:
+            the session and the sid of its login, or None, None if the login didn't work
+    '''
+
+    with forum_post_lock:
+        if forum_post_sids.get(forum_source) is None or forum_post_sids.get(forum_source) == expired_sid:
+            if forum_source not in forum_post_sessions:
+                forum_post_sessions[forum_source] = requests.Session()
+            login_function = forum_login_functions.get(forum_source)
+            forum_post_sids[forum_source] = login_function(forum_post_sessions[forum_source], forum_source)
+        if forum_post_sids[forum_source] is None:
+            return None, None
+        return forum_post_sessions[forum_source], forum_post_sids[forum_source]
+
+def close_forum_post_sessions():
+
+    '''
+        Closes the sessions used to post on forums
+    '''
+
+    with forum_post_lock:
+        for session in forum_post_sessions.values():
+            session.close()
+        forum_post_sessions.clear()
+        forum_post_sids.clear()
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('topic_row',)})
 @config.retry_function(log_filter=lambda args: {k: args[k] for k in ('topic_row',)})
 def post_message_bi(topic_row: pd.Series, message_content: str):
 
     '''
-        Posts a message on the "BI" forum
+        Posts a message on the "BI" forum, with the session logged in for the forum
         Inputs:
             topic_row (series - one row) details about the topic to know where to post
             message_content (str): message to post
@@ -205,14 +511,6 @@ def post_message_bi(topic_row: pd.Series, message_content: str):
     
     forum_url = os.getenv(topic_row['FORUM_SOURCE'] + '_URL')
     post_url = forum_url +"/posting.php?mode=reply&t="+ str(topic_row['TOPIC_NUMBER'])
-    login_url = forum_url +'/ucp.php?mode=login'
-
-    connect_dict = {
-        "username": os.getenv(topic_row['FORUM_SOURCE']+'_USERNAME'),
-        "password": os.getenv(topic_row['FORUM_SOURCE']+'_PASSWORD'),
-        "autologin": "on", 
-        "login": "Connexion" 
-    }
 
     messagepost_dict = {
         'subject': 'Re:',
@@ -220,34 +518,33 @@ def post_message_bi(topic_row: pd.Series, message_content: str):
         'post': 'Envoyer'
     }
     message_post_worked = False
+    expired_sid = None
 
     while (message_post_worked == False and time.time() - begin_time <= time_max):
-        with requests.Session() as session:
-            #We get the login page
-            connect_get = session.get(login_url, verify=False)
-            soup = bs(connect_get.text, "html.parser")
-            connect_dict['sid'] = soup.find("input", {"name": "sid"})["value"]
-            connect_dict['form_token'] = soup.find("input", {"name": "form_token"})["value"]
-            connect_dict['creation_time'] = soup.find("input", {"name": "creation_time"})["value"]        
-
-            # We post the dictionary to login
-            connect_post = session.post(login_url, data=connect_dict, verify=False)
-            connect_post_worked = ('Déconnexion' in connect_post.text)
-            if connect_post_worked:
-                reply_get = session.get(post_url, verify=False)
-                reply_get_worked = ('Déconnexion' in reply_get.text)
-                if reply_get_worked:
-                    # if it worked we post the dictionary to post the message
-                    soup = bs(reply_get.text, "html.parser")
-                    messagepost_dict['sid'] = connect_dict['sid']
-                    messagepost_dict['form_token'] = soup.find("input", {"name": "form_token"})["value"]
-                    messagepost_dict['creation_time'] = soup.find("input", {"name": "creation_time"})["value"]
-                    messagepost_dict['topic_cur_post_id'] = soup.find("input", {"name": "topic_cur_post_id"})["value"]
-                    message_post  = session.post(post_url, data=messagepost_dict, verify=False)   
-                    message_post_worked = not('formulaire' in message_post.text)
-                else:
-                    #otherwise we wait one second and retry
-                    time.sleep(1)
+        session, sid = get_forum_post_session(topic_row['FORUM_SOURCE'], expired_sid)
+        if session is None:
+            #if the login didn't work we wait one second and retry
+            time.sleep(1)
+            continue
+        reply_get = session.get(post_url, verify=False)
+        reply_get_worked = ('Déconnexion' in reply_get.text)
+        if reply_get_worked:
+            # if it worked we refresh the form tokens and post the dictionary to post the message
+            soup = bs(reply_get.text, "html.parser")
+            messagepost_dict['sid'] = sid
+            messagepost_dict['form_token'] = soup.find("input", {"name": "form_token"})["value"]
+            messagepost_dict['creation_time'] = soup.find("input", {"name": "creation_time"})["value"]
+            messagepost_dict['topic_cur_post_id'] = soup.find("input", {"name": "topic_cur_post_id"})["value"]
+            message_post  = session.post(post_url, data=messagepost_dict, verify=False)   
+            message_post_worked = not('formulaire' in message_post.text)
+            if not message_post_worked:
+                #the form or the session is stale: we wait one second and retry logging in again
+                expired_sid = sid
+                time.sleep(1)
+        else:
+            #otherwise the session has expired: we wait one second and retry logging in again
+            expired_sid = sid
+            time.sleep(1)
 
     if (message_post_worked == False):
         raise ValueError(f"{topic_row['FORUM_SOURCE']} / TOPIC {topic_row['TOPIC_NUMBER']} NOT POSTED -> Time expiration")
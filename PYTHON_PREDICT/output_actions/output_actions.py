@@ -9,8 +9,15 @@ logging.basicConfig(level=logging.INFO)
 import os
 import unicodedata
 import re
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib import font_manager
 
 import config
 import file_actions as fileA
@@ -19,6 +26,37 @@ from output_actions import output_actions_calculated as outputAC
 from output_actions import output_actions_inited as outputAI
 from snowflake_actions import snowflake_execute
 
+# Types of the nodes of a compiled message template
+TEMPLATE_LITERAL = 'LITERAL'
+TEMPLATE_PLACEHOLDER = 'PLACEHOLDER'
+TEMPLATE_BLOCK = 'BLOCK'
+
+# Global variables to store the process pool rendering captures, shared by all countries derived in parallel
+capture_pool = None
+capture_pool_lock = threading.Lock()
+
+@config.exit_program(log_filter=lambda args: {})
+def compile_translations(translations: dict) -> dict:
+
+    '''
+        Compiles the translations of each country once when loaded, so that a text is translated in one scan:
+        - strings to translate are matched by one regex, longest first so that a string wins over the ones it contains (PERC_WIN over WIN)
+        - texts already translated are memoized
+        Inputs:
+            translations (dict): strings to translate for each country, as read from the translations file
+        Returns:
+            For each country, a dict with the strings to translate (MAPPING), the regex matching them (PATTERN) and the texts already translated (TRANSLATED)
+        Raises:
+            Exits the program if error running the function (using decorator)
+    '''
+
+    compiled_translations = {}
+    for country, mapping in translations.items():
+        keys = sorted((key for key in mapping if key), key=lambda key: (-len(key), key))
+        pattern = re.compile('|'.join(re.escape(key) for key in keys)) if keys else None
+        compiled_translations[country] = {'MAPPING': mapping, 'PATTERN': pattern, 'TRANSLATED': {}}
+    return compiled_translations
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('param_to_translate','country')})
 def translate_param_for_country(param_to_translate: str | pd.DataFrame, country: str, translations: dict) -> str | pd.DataFrame:
 
@@ -27,20 +65,25 @@ def translate_param_for_country(param_to_translate: str | pd.DataFrame, country:
         Inputs:
             param_to_translate (str or df): the parameter to translate
             country (str): The country for which we translate
-            translations (dict): translations strings to translate
+            translations (dict): translations compiled by compile_translations
         Returns:
             The parameter translated (str or df)
         Raises:
             Exits the program if error running the function (using decorator)
     '''
 
+    country_translations = translations[country]
     if isinstance(param_to_translate, pd.DataFrame):
-        param_translated = param_to_translate.rename(columns=translations[country])
+        param_translated = param_to_translate.rename(columns=country_translations['MAPPING'])
 
     elif isinstance(param_to_translate, str):
-        param_translated = param_to_translate
-        for key, val in translations[country].items():
-            param_translated = param_translated.replace(key, val)
+        # we translate the text in one scan, unless it has already been translated
+        param_translated = country_translations['TRANSLATED'].get(param_to_translate)
+        if param_translated is None:
+            mapping = country_translations['MAPPING']
+            pattern = country_translations['PATTERN']
+            param_translated = pattern.sub(lambda match: mapping[match.group(0)], param_to_translate) if pattern is not None else param_to_translate
+            country_translations['TRANSLATED'][param_to_translate] = param_translated
 
     return param_translated
 
@@ -95,6 +138,98 @@ def replace_conditionally_message(output_text: str, begin_tag: str, end_tag: str
         output_text = re.sub(pattern, '', output_text, flags=re.DOTALL)
     return output_text
 
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('placeholders','blocks')})
+@functools.lru_cache(maxsize=None)
+def compile_message_template(template: str, placeholders: tuple[str, ...], blocks: tuple[str, ...]) -> list[tuple]:
+
+    '''
+        Compiles a formatted message template once into a tree of nodes, rendered in one pass by render_message_template:
+        - (TEMPLATE_LITERAL, text) for text kept as is
+        - (TEMPLATE_PLACEHOLDER, name) for #NAME#, replaced by the value of the parameter
+        - (TEMPLATE_BLOCK, name, nodes) for the text between #NAME_BEGIN# and #NAME_END#, kept or removed according to a condition
+        Only given placeholders and blocks are tags, any other text is kept as is.
+        Tags looking like placeholders but unknown are logged as missing placeholders.
+        The compiled template is cached, so that a template is compiled once per run
+        Inputs:
+            template (str): the message template, formatted
+            placeholders (tuple): the names of the placeholders the template can contain
+            blocks (tuple): the names of the conditional blocks the template can contain
+        Returns:
+            The list of nodes of the template
+        Raises:
+            Exits the program if a block is not closed, or closed without being opened (using decorator)
+    '''
+
+    #we map each tag to its kind and name
+    tags = {placeholder: (TEMPLATE_PLACEHOLDER, placeholder) for placeholder in placeholders}
+    for block in blocks:
+        tags[block+'_BEGIN'] = ('BEGIN', block)
+        tags[block+'_END'] = ('END', block)
+
+    missing_placeholders = sorted(set(re.findall(r'#([A-Z][A-Z0-9_]*)#', template)) - tags.keys())
+    if missing_placeholders:
+        logging.warning(f"OUTPUT -> TEMPLATE PLACEHOLDERS WITHOUT PARAMETER, KEPT AS IS: {missing_placeholders}")
+
+    #we scan tags once, nesting nodes of each block opened
+    tag_pattern = re.compile('#(' + '|'.join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True)) + ')#')
+    nodes = []
+    opened_blocks = [(None, nodes)]
+    position = 0
+    for match in tag_pattern.finditer(template):
+        current_nodes = opened_blocks[-1][1]
+        if match.start() > position:
+            current_nodes.append((TEMPLATE_LITERAL, template[position:match.start()]))
+        position = match.end()
+        kind, name = tags[match.group(1)]
+        if kind == TEMPLATE_PLACEHOLDER:
+            current_nodes.append((TEMPLATE_PLACEHOLDER, name))
+        elif kind == 'BEGIN':
+            block_nodes = []
+            current_nodes.append((TEMPLATE_BLOCK, name, block_nodes))
+            opened_blocks.append((name, block_nodes))
+        elif opened_blocks[-1][0] is None:
+            raise ValueError(f"Block {name} closed without being opened")
+        elif opened_blocks[-1][0] != name:
+            raise ValueError(f"Block {name} closed inside block {opened_blocks[-1][0]}")
+        else:
+            opened_blocks.pop()
+
+    if len(opened_blocks) > 1:
+        raise ValueError(f"Block {opened_blocks[-1][0]} not closed")
+    if position < len(template):
+        nodes.append((TEMPLATE_LITERAL, template[position:]))
+    return nodes
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('conditions',)})
+def render_message_template(nodes: list[tuple], values: dict, conditions: dict) -> str:
+
+    '''
+        Renders a compiled message template in one pass
+        Inputs:
+            nodes (list): the nodes of the template, compiled by compile_message_template
+            values (dict): the value of each placeholder. A placeholder without value is kept as is
+            conditions (dict): the condition of each block, to keep it or not
+        Returns:
+            The message
+        Raises:
+            Exits the program if error running the function (using decorator)
+    '''
+
+    parts = []
+
+    #subfunction to render nodes, recursively for nodes of blocks kept
+    def render_nodes(nodes):
+        for node in nodes:
+            if node[0] == TEMPLATE_LITERAL:
+                parts.append(node[1])
+            elif node[0] == TEMPLATE_PLACEHOLDER:
+                parts.append(values.get(node[1], '#'+node[1]+'#'))
+            elif conditions[node[1]]:
+                render_nodes(node[2])
+
+    render_nodes(nodes)
+    return ''.join(parts)
+
 @config.exit_program(log_filter=lambda args: dict(args))
 def define_filename(input_type: str, sr_gameday_output_init: pd.Series, extension: str, country: str | None = None):
 
@@ -181,13 +316,15 @@ def calculate_and_display_rank(df: pd.DataFrame, columns: list[str]) -> pd.DataF
     return df
 
 @config.exit_program(log_filter=lambda args: {'columns_df': args['df'].columns.tolist(), 'capture_name': args['capture_name'] })
-def capture_df_oneheader(df: pd.DataFrame, capture_name: str):
+def capture_df_oneheader(df: pd.DataFrame, capture_name: str) -> str:
 
     '''
         Captures a styled jpg using matplotlib from a dataframe with one header level
         Inputs:
             df (dataframe): the dataframe we capture
             capture_name (str): the name of the capture
+        Returns:
+            the local path of the jpg
         Style of the figure:
             applies alternating row colors for readability.
             highlights  headers in bold.
@@ -220,7 +357,65 @@ def capture_df_oneheader(df: pd.DataFrame, capture_name: str):
     table.auto_set_column_width(range(len(df.columns)))
 
     # we create the jpg from the figure
-    fileA.create_jpg(os.path.join(config.TMPF,capture_name),fig)
+    local_file_path = os.path.join(config.TMPF,capture_name)
+    fileA.create_jpg(local_file_path,fig)
+    plt.close(fig)
+    return local_file_path
+
+def init_capture_process():
+
+    '''
+        Initializes a process of the capture pool:
+        - the non interactive Agg backend is used
+        - the fonts of the captures are loaded once, instead of at the first capture of each process
+    '''
+
+    matplotlib.use('Agg')
+    for weight in ('normal', 'bold'):
+        font_manager.get_font(font_manager.findfont(font_manager.FontProperties(weight=weight)))
+
+def get_capture_pool() -> ProcessPoolExecutor:
+
+    '''
+        Gets the process pool rendering captures, creating it at first call.
+        Processes are spawned rather than forked, as the pool is created from threads
+        Returns:
+            the process pool rendering captures
+    '''
+
+    global capture_pool
+    with capture_pool_lock:
+        if capture_pool is None:
+            capture_pool = ProcessPoolExecutor(max_workers=config.capture_max_workers,
+                                               mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=init_capture_process)
+        return capture_pool
+
+def close_capture_pool():
+
+    '''
+        Closes the process pool rendering captures
+    '''
+
+    global capture_pool
+    with capture_pool_lock:
+        if capture_pool is not None:
+            capture_pool.shutdown()
+            capture_pool = None
+
+def submit_capture(capture_func: Callable[[pd.DataFrame, str], str], df: pd.DataFrame, capture_name: str) -> Future:
+
+    '''
+        Submits a capture to the process pool, so that captures are rendered in parallel without sharing pyplot between threads
+        Inputs:
+            capture_func (function): the capture function, defined at module level so that the process can import it
+            df (dataframe): the dataframe we capture
+            capture_name (str): the name of the capture
+        Returns:
+            the future of the capture, whose result is the local path of the jpg
+    '''
+
+    return get_capture_pool().submit(capture_func, df, capture_name)
 
 @config.exit_program(log_filter=lambda args: {})
 def generate_output_message(context_dict: dict):
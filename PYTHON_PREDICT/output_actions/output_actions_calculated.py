@@ -6,28 +6,33 @@
 import logging
 logging.basicConfig(level=logging.INFO)
 import os
+import functools
 import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib.table import Table
+from matplotlib.table import Table, Cell
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextToPath
 import numpy as np
 from typing import Tuple
 
 from output_actions import output_actions as outputA
 from output_actions import output_actions_sql_queries as sqlQ
-from snowflake_actions import snowflake_execute
-from imgbb_actions import push_capture_online
+from snowflake_actions import snowflake_execute, snowflake_execute_async
+from imgbb_actions import push_capture_online, get_capture_hash, get_cached_capture_url, load_imgbb_cache, close_imgbb_session
 import config
-from message_actions import post_message
+from message_actions import post_message, close_forum_post_sessions
 import file_actions as fileA
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_calculated_games_result(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[str,int]:
+# Text measurer of the captures, measuring texts from the font files without any drawing
+text_to_path = TextToPath()
+
+@config.exit_program(log_filter=lambda args: {'columns_df_games': args['df_games'].columns.tolist(),})
+def get_calculated_games_result(df_games: pd.DataFrame) -> Tuple[str,int]:
 
     '''
         Gets the list of games to display on the output calculated message
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql game query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_games (dataframe) containing the games of the gameday
         Returns:
             A multiple row string displaying the list of games
             The number of games
@@ -35,9 +40,7 @@ def get_calculated_games_result(sr_snowflake_account: pd.Series, sr_gameday_outp
             Exits the program if error running the function (using decorator)
     '''
 
-    #We call the games query by first personalizing it
-    df_games = snowflake_execute(sr_snowflake_account,sqlQ.qGame,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
-    
+    df_games = df_games.copy()
     #we add a + before the result if it is positive
     df_games['RESULT'] = df_games['RESULT'].map(lambda x: f"+{x}" if x > 0 else str(x))
 
@@ -53,16 +56,45 @@ def get_calculated_games_result(sr_snowflake_account: pd.Series, sr_gameday_outp
     
     return RESULT_GAMES, len(df_games)
 
+# Style of the detailed scores capture, shared by all captures: font size, horizontal margin in cells and row heights (pt), and rows background colors
+SCORES_DETAILED_FONT_SIZE = 30
+SCORES_DETAILED_CELL_MARGIN = SCORES_DETAILED_FONT_SIZE
+SCORES_DETAILED_HEADER_HEIGHT = 2.7 * SCORES_DETAILED_FONT_SIZE
+SCORES_DETAILED_ROW_HEIGHT = 1.8 * SCORES_DETAILED_FONT_SIZE
+SCORES_DETAILED_COLORS = ('#fff2cc', '#ccfff5')
+SCORES_DETAILED_FONTS = {
+    False: FontProperties(size=SCORES_DETAILED_FONT_SIZE),
+    True: FontProperties(size=SCORES_DETAILED_FONT_SIZE, weight='bold')
+}
+
+@functools.lru_cache(maxsize=4096)
+def get_text_width(text: str, is_bold: bool) -> float:
+
+    '''
+        Measures the width of a text of the detailed scores capture, without drawing it
+        Inputs:
+            text (str): the text to measure
+            is_bold (bool): if the text is in bold
+        Returns:
+            the width of the text, in points
+    '''
+
+    width, _, _ = text_to_path.get_text_width_height_descent(text, SCORES_DETAILED_FONTS[is_bold], ismath=False)
+    return width
+
 @config.exit_program(log_filter=lambda args: {'columns_df': args['df'].columns.tolist(), 'capture_name': args['capture_name'] })
-def capture_scores_detailed(df: pd.DataFrame, capture_name: str):
+def capture_scores_detailed(df: pd.DataFrame, capture_name: str) -> str:
 
     '''
         Captures a styled jpg using matplotlib from
         the dataframe presenting the detailed scores per user and prediction. 
-        It is a two-level header dataframe, so it needs a specific style
+        It is a two-level header dataframe, so it needs a specific style.
+        The geometry of cells is computed once from the texts, so that the figure is sized to the content
         Inputs:
             df (dataframe): the dataframe we capture
             capture_name (str): the name of the capture
+        Returns:
+            the local path of the jpg
         Style of the figure:
             applies alternating row colors for readability
             highlights specific columns and headers in bold
@@ -73,72 +105,58 @@ def capture_scores_detailed(df: pd.DataFrame, capture_name: str):
     # Create table data
     header_1 = list(df.columns.get_level_values(0))
     header_2 = list(df.columns.get_level_values(1))
-    table_data = [header_2]  # Start with second-level headers
-    table_data.insert(0,header_1)  # Add first-level headers
-    for row in df.values:
-        table_data.append(list(row))
-
-    # Create the figure
-    fig, ax = plt.subplots(figsize=(80, 30))  # Adjust figure size
-    ax.axis('tight')
-    ax.axis('off')
-
-    # colors for row background color switch
-    color1 ='#fff2cc'
-    color2 ='#ccfff5'
-
-    # Create the table
-    tbl = Table(ax, bbox=[0, 0, 1, 1])
-
+    table_data = [header_1, header_2] + df.astype(str).values.tolist()
     ncols = len(table_data[0])  # Total number of columns
+    if ncols == 0:
+        raise ValueError("There is no column to capture")
 
-    # Add cells
+    # we keep the cells to draw: the first-level header is displayed once per group of columns (merged effect)
+    cells = {}
     for row_idx, row in enumerate(table_data):
-        for col_idx, cell in enumerate(row):
-            if row_idx == 0 and col_idx > 0:  # Handle merged effect for the first-level header
-                if col_idx == 1 or table_data[row_idx][col_idx] != table_data[row_idx][col_idx - 1]:
-                    tbl.add_cell(row_idx, col_idx, 1 / ncols, 0.15, text=cell, loc='center', facecolor='white')
-                else:
-                    # Skip duplicate cells
-                    continue
-            else:
-                height = 0.1 if row_idx > 1 else 0.15  # Adjust height for headers
-                tbl.add_cell(row_idx, col_idx, 1 / ncols, height, text=cell, loc='center', facecolor='white')
-
-    # Style the table
-    for (row, col), cell in tbl.get_celld().items():
-        if row in (0,1):  # Header row
-            cell.set_text_props(weight='bold')  # Bold text for column headers
-        elif row > 1:  # Data rows (skip the header row)
-            # Alternate row colors for readability
-            if row % 2 == 0:  # Even row index (data rows)
-                cell.set_facecolor(color1) 
-            else:  # Odd row index (data rows)
-                cell.set_facecolor(color2) 
-        #if col == 0:
-        #    cell.set_width(0.05)
-        if col%6 in (0,1,5):
-            cell.set_text_props(weight='bold')
-    
-    # Add column and row lines to emphasize merged cells
+        for col_idx, text in enumerate(row):
+            if row_idx == 0 and col_idx > 1 and text == table_data[0][col_idx - 1]:
+                continue
+            # headers and specific columns are in bold
+            cells[(row_idx, col_idx)] = (str(text), row_idx in (0,1) or col_idx%6 in (0,1,5))
+
+    # we compute the width of each column from its widest text, and the height of each row, in points
+    col_widths = [0.0] * ncols
+    for (row_idx, col_idx), (text, is_bold) in cells.items():
+        col_widths[col_idx] = max(col_widths[col_idx], get_text_width(text, is_bold) / (1 - 2 * Cell.PAD) + SCORES_DETAILED_CELL_MARGIN)
+    row_heights = [SCORES_DETAILED_HEADER_HEIGHT] * 2 + [SCORES_DETAILED_ROW_HEIGHT] * (len(table_data) - 2)
+    total_width = sum(col_widths)
+    total_height = sum(row_heights)
+
+    # Create the figure, sized to the table
+    fig, ax = plt.subplots(figsize=(total_width / 72, total_height / 72))
+    ax.axis('off')
+
+    # Create the table, each cell with its computed geometry relative to the figure
+    tbl = Table(ax, bbox=[0, 0, 1, 1])
+    for (row_idx, col_idx), (text, is_bold) in cells.items():
+        # Alternate row colors for readability on data rows
+        facecolor = 'white' if row_idx < 2 else SCORES_DETAILED_COLORS[row_idx % 2]
+        cell = tbl.add_cell(row_idx, col_idx, col_widths[col_idx] / total_width, row_heights[row_idx] / total_height,
+                            text=text, loc='center', facecolor=facecolor)
+        cell.set_text_props(fontproperties=SCORES_DETAILED_FONTS[is_bold])
     tbl.auto_set_font_size(False)
-    tbl.set_fontsize(30)
-    tbl.auto_set_column_width(range(len(df.columns))) # Adjust scale for better visibility
 
     # Add the table to the plot
     ax.add_table(tbl)
 
     # we finally create the jpg file
-    fileA.create_jpg(os.path.join(config.TMPF,capture_name),fig)
+    local_file_path = os.path.join(config.TMPF,capture_name)
+    fileA.create_jpg(local_file_path,fig)
+    plt.close(fig)
+    return local_file_path
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_calculated_scores_detailed(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[pd.DataFrame,int]:
+@config.exit_program(log_filter=lambda args: {'columns_df_predict_games': args['df_predict_games'].columns.tolist(),})
+def get_calculated_scores_detailed(df_predict_games: pd.DataFrame) -> Tuple[pd.DataFrame,int]:
 
     '''
         Gets scores per users at predictions detail level
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql predict game query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_predict_games (dataframe) containing the predictions games scores per user
         Returns:
             The dataframe of scores per user on a two header level for display
             The number of users concerned
@@ -146,8 +164,6 @@ def get_calculated_scores_detailed(sr_snowflake_account: pd.Series, sr_gameday_o
             Exits the program if error running the function (using decorator)
     '''
 
-    # We call the predictions games scores query 
-    df_predict_games = snowflake_execute(sr_snowflake_account,sqlQ.qPredictGame,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
     # we remove useless column in this run context - we couldn't remove at the sources: see the related Snowflake view spec for more details
     df_predict_games = df_predict_games.dropna(axis=1, how='all')
     #if there are no columns remaining or no rows (no users) we just return like it
@@ -192,16 +208,15 @@ def get_calculated_scores_global(df_userscores_global: pd.DataFrame) -> Tuple[pd
     df_userscores_modified = df_userscores_modified[['RANK','USER_NAME', 'TOTAL_POINTS', 'NB_GAMEDAY_PREDICT', 'NB_GAMEDAY_FIRST', 'NB_TOTAL_PREDICT']]
     return df_userscores_modified, len(df_userscores_modified)
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_calculated_scores_gameday(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[str,int]:
+@config.exit_program(log_filter=lambda args: {'columns_df_userscores_gameday': args['df_userscores_gameday'].columns.tolist(),})
+def get_calculated_scores_gameday(df_userscores_gameday: pd.DataFrame) -> Tuple[str,int]:
 
     '''
         The purpose of this function is to:
         - get scores per user for a specified gameday
         - rank user by scores descending
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql predict game query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_userscores_gameday (dataframe) containing scores per user for the gameday
         Returns:
             The string with user ranked by scores 
             The number of users
@@ -209,7 +224,6 @@ def get_calculated_scores_gameday(sr_snowflake_account: pd.Series, sr_gameday_ou
             Exits the program if error running the function (using decorator)
     '''
 
-    df_userscores_gameday = snowflake_execute(sr_snowflake_account,sqlQ.qUserScores_Gameday,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
     df_userscores_gameday = outputA.display_rank(df_userscores_gameday,'RANK')
     
     df_userscores_gameday['STRING'] = (df_userscores_gameday['RANK'].astype(str) + ". " +
@@ -250,15 +264,14 @@ def get_calculated_scores_average(nb_prediction: int, df_userscores_global: pd.D
     SCORES_AVERAGE = "\n".join(df_userscores_modified['STRING'])
     return SCORES_AVERAGE, len(df_userscores_modified),NB_MIN_PREDICTION
 
-@config.exit_program(log_filter=lambda args: {'columns_df_gamepredictchamp': args['df_gamepredictchamp'].columns.tolist(), 'sr_gameday_output_calculate': args['sr_gameday_output_calculate'] })
-def get_calculated_predictchamp_result(df_gamepredictchamp: pd.DataFrame, sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> str:
+@config.exit_program(log_filter=lambda args: {'columns_df_gamepredictchamp': args['df_gamepredictchamp'].columns.tolist(), 'columns_df_gamepredictchamp_detail': args['df_gamepredictchamp_detail'].columns.tolist() })
+def get_calculated_predictchamp_result(df_gamepredictchamp: pd.DataFrame, df_gamepredictchamp_detail: pd.DataFrame) -> str:
 
     '''
         Gets scores for prediction championship gamedays - per teams and per user of each teams
         Inputs:
             df_gamepredictchamp (df) scores per games and teams, with winner features
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql predictchamp game query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_gamepredictchamp_detail (df) scores per user, containing team related key
         Returns:
             The string displaying games result, per teams then detailed by user related
         Raises:
@@ -278,8 +291,7 @@ def get_calculated_predictchamp_result(df_gamepredictchamp: pd.DataFrame, sr_sno
                                               df_gamepredictchamp_modified['POINTS_HOME'].astype(str) + " - " +
                                               df_gamepredictchamp_modified['POINTS_AWAY'].astype(str))
 
-    # We call the predictions championship scores per user query, containing team related key
-    df_gamepredictchamp_detail = snowflake_execute(sr_snowflake_account,sqlQ.qGamePredictchampDetail,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
+    df_gamepredictchamp_detail = df_gamepredictchamp_detail.copy()
     # we create the string of score for each user, depending on their rank within the team
 
     df_gamepredictchamp_detail['STRING'] = np.where(
@@ -332,36 +344,31 @@ def get_calculated_predictchamp_result(df_gamepredictchamp: pd.DataFrame, sr_sno
     RESULTS_PREDICTCHAMP = "\n".join(df_final["RESULT_STRING"].tolist())
     return RESULTS_PREDICTCHAMP
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_calculated_predictchamp_ranking(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> pd.DataFrame:
+@config.exit_program(log_filter=lambda args: {'columns_df_teamscores': args['df_teamscores'].columns.tolist(),})
+def get_calculated_predictchamp_ranking(df_teamscores: pd.DataFrame) -> pd.DataFrame:
 
     '''
         Gets the ranking of the prediction championship
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql teams query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_teamscores (dataframe) containing scores per team
         Returns:
             The dataframe displaying the ranking
         Raises:
             Exits the program if error running the function (using decorator)
     '''
 
-    # We call the teams query
-    df_teamscores = snowflake_execute(sr_snowflake_account,sqlQ.qTeamScores,(sr_gameday_output_calculate['SEASON_ID'],))
-
     #we add a rank per team - first by percentage of win, then by points difference
     df_teamscores = outputA.display_rank(df_teamscores,'RANK')
     
     return df_teamscores
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_calculated_correction(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[str,int]:
+@config.exit_program(log_filter=lambda args: {'columns_df_correction': args['df_correction'].columns.tolist(),})
+def get_calculated_correction(df_correction: pd.DataFrame) -> Tuple[str,int]:
 
     '''
         Gets correction per user for a specific gameday
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql corrections query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_correction (dataframe) containing corrections per user
         Returns:
             The string of the corrections -one user per line -  
             The number of user concerned
@@ -369,9 +376,6 @@ def get_calculated_correction(sr_snowflake_account: pd.Series, sr_gameday_output
             Exits the program if error running the function (using decorator)
     '''
 
-    # We call the correction query
-    df_correction = snowflake_execute(sr_snowflake_account,sqlQ.qCorrection,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
-
     # we create the string of corrections group by user - one per line
     grouped = df_correction.groupby('USER_NAME')['PREDICT_ID'].apply(lambda x: f"{x.name} : {' / '.join(map(str, x))}")
     LIST_CORRECTION = "\n".join(grouped.tolist())
@@ -397,14 +401,14 @@ def get_calculated_list_gameday(df_gameday_calculated: pd.DataFrame) -> str:
 
     return LIST_GAMEDAY_CALCULATED
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_mvp_month_race_figure(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[str, str, int]:
+@config.exit_program(log_filter=lambda args: {'columns_df_month_mvp': args['df_month_mvp'].columns.tolist(), 'sr_gameday_output_calculate': args['sr_gameday_output_calculate'] })
+def get_mvp_month_race_figure(df_month_mvp: pd.DataFrame, sr_gameday_output_calculate: pd.Series) -> Tuple[str, str, int]:
 
     '''
         Gets figures for monthly MVP election
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql mvp query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_month_mvp (dataframe) containing the MVP race figures of the month
+            sr_gameday_output_calculate (series - one row) containing the month of the gameday
         Returns:
             The month of the gameday
             The string of the corrections -one user per line -  
@@ -414,22 +418,20 @@ def get_mvp_month_race_figure(sr_snowflake_account: pd.Series, sr_gameday_output
     '''
 
     GAMEDAY_MONTH = sr_gameday_output_calculate['END_MONTH_LOCAL']
-    # We call the MVPRace Month query
-    df_month_mvp = snowflake_execute(sr_snowflake_account,sqlQ.qMVPRace_month_figures,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['END_YEARMONTH_LOCAL']))
-
+    df_month_mvp = df_month_mvp.copy()
     #we create the output string
     df_month_mvp['STRING'] = df_month_mvp['USER_NAME'] + " - " + df_month_mvp['POINTS'].astype(str) + " pts / " + df_month_mvp['WIN'].astype(str) + "__W__-" + df_month_mvp['LOSS'].astype(str) + "__L__ [__with__ " + df_month_mvp['LIST_TEAMS'].astype(str) + "]"
     LIST_USER_MONTH = "\n".join(df_month_mvp['STRING'].tolist())
     return GAMEDAY_MONTH, LIST_USER_MONTH, len(df_month_mvp)
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate',)})
-def get_mvp_compet_race_figure(sr_snowflake_account: pd.Series, sr_gameday_output_calculate: pd.Series) -> Tuple[str, str, int]:
+@config.exit_program(log_filter=lambda args: {'columns_df_compet_mvp': args['df_compet_mvp'].columns.tolist(), 'sr_gameday_output_calculate': args['sr_gameday_output_calculate'] })
+def get_mvp_compet_race_figure(df_compet_mvp: pd.DataFrame, sr_gameday_output_calculate: pd.Series) -> Tuple[str, str, int]:
 
     '''
         Gets figures for competition MVP election
         Inputs:
-            sr_snowflake_account (series - one row) containing snowflake credentials to run the sql mvp query
-            sr_gameday_output_calculate (series - one row) containing the query filters
+            df_compet_mvp (dataframe) containing the MVP race figures of the competition
+            sr_gameday_output_calculate (series - one row) containing the competition of the gameday
         Returns:
             The competition
             The string of the corrections -one user per line -  
@@ -439,9 +441,7 @@ def get_mvp_compet_race_figure(sr_snowflake_account: pd.Series, sr_gameday_outpu
     '''
 
     GAMEDAY_COMPETITION = sr_gameday_output_calculate['COMPETITION_LABEL']
-    # We call the MVPRace competition query
-    df_compet_mvp = snowflake_execute(sr_snowflake_account,sqlQ.qMVPRace_Compet_figures,(sr_gameday_output_calculate['SEASON_ID'],GAMEDAY_COMPETITION))
-
+    df_compet_mvp = df_compet_mvp.copy()
     #we create the output string
     df_compet_mvp['STRING'] = df_compet_mvp['USER_NAME'] + " - " + df_compet_mvp['POINTS'].astype(str) + " pts / " + df_compet_mvp['WIN'].astype(str) + "__W__-" + df_compet_mvp['LOSS'].astype(str) + "__L__ [__with__ " + df_compet_mvp['LIST_TEAMS'].astype(str) + "]"
     LIST_USER_COMPETITION = "\n".join(df_compet_mvp['STRING'].tolist())
@@ -461,27 +461,48 @@ def get_calculated_parameters(sr_snowflake_account: pd.Series, sr_gameday_output
             Exits the program if error running the function (using decorator)
     '''
 
+    # we submit all queries at once so that snowflake runs them in parallel - the mvp ones only if we need to display them
+    # the prediction championship detail and ranking ones are independent of the games found, so they are submitted too and possibly unused
+    SEASON_ID = sr_gameday_output_calculate['SEASON_ID']
+    GAMEDAY = sr_gameday_output_calculate['GAMEDAY']
+    dict_queries = {
+        'GAMES': (sqlQ.qGame, (SEASON_ID, GAMEDAY)),
+        'PREDICT_GAMES': (sqlQ.qPredictGame, (SEASON_ID, GAMEDAY)),
+        'USERSCORES_GLOBAL': (sqlQ.qUserScores_Global, (SEASON_ID,)),
+        'GAMEDAY_CALCULATED': (sqlQ.qList_Gameday_Calculated, (SEASON_ID,)),
+        'USERSCORES_GAMEDAY': (sqlQ.qUserScores_Gameday, (SEASON_ID, GAMEDAY)),
+        'GAMEPREDICTCHAMP': (sqlQ.qGamePredictchamp, (SEASON_ID, GAMEDAY)),
+        'GAMEPREDICTCHAMP_DETAIL': (sqlQ.qGamePredictchampDetail, (SEASON_ID, GAMEDAY)),
+        'TEAMSCORES': (sqlQ.qTeamScores, (SEASON_ID,)),
+        'CORRECTION': (sqlQ.qCorrection, (SEASON_ID, GAMEDAY))
+    }
+    if sr_gameday_output_calculate['DISPLAY_MONTH_MVP_RANKING']  == 1:
+        dict_queries['MONTH_MVP'] = (sqlQ.qMVPRace_month_figures, (SEASON_ID, sr_gameday_output_calculate['END_YEARMONTH_LOCAL']))
+    if sr_gameday_output_calculate['DISPLAY_COMPET_MVP_RANKING']  == 1:
+        dict_queries['COMPET_MVP'] = (sqlQ.qMVPRace_Compet_figures, (SEASON_ID, sr_gameday_output_calculate['COMPETITION_LABEL']))
+    dict_df = snowflake_execute_async(sr_snowflake_account, dict_queries)
+
     param_dict= {}
-    param_dict['GAMEDAY'] = sr_gameday_output_calculate['GAMEDAY']
+    param_dict['GAMEDAY'] = GAMEDAY
     param_dict['SEASON_DIVISION'] = sr_gameday_output_calculate['SEASON_DIVISION']
-    param_dict['RESULT_GAMES'],param_dict['NB_GAMES'] = get_calculated_games_result(sr_snowflake_account,sr_gameday_output_calculate)
-    param_dict['SCORES_DETAILED_DF'], param_dict['NB_USER_DETAIL'] = get_calculated_scores_detailed(sr_snowflake_account,sr_gameday_output_calculate) 
+    param_dict['RESULT_GAMES'],param_dict['NB_GAMES'] = get_calculated_games_result(dict_df['GAMES'])
+    param_dict['SCORES_DETAILED_DF'], param_dict['NB_USER_DETAIL'] = get_calculated_scores_detailed(dict_df['PREDICT_GAMES']) 
 
-    # we get the scores per users query 
-    df_userscores_global = snowflake_execute(sr_snowflake_account,sqlQ.qUserScores_Global,(sr_gameday_output_calculate['SEASON_ID'],))
+    # we get the scores per users
+    df_userscores_global = dict_df['USERSCORES_GLOBAL']
     param_dict['SCORES_GLOBAL_DF'],param_dict['NB_USER_GLOBAL'] = get_calculated_scores_global(df_userscores_global)
 
-    # we get the gamedays calculated query 
-    df_gameday_calculated = snowflake_execute(sr_snowflake_account,sqlQ.qList_Gameday_Calculated,(sr_gameday_output_calculate['SEASON_ID'],))
+    # we get the gamedays calculated
+    df_gameday_calculated = dict_df['GAMEDAY_CALCULATED']
     param_dict['NB_GAMEDAY_CALCULATED'] = len(df_gameday_calculated)
     param_dict['NB_TOTAL_PREDICT'] = df_gameday_calculated['NB_PREDICTION'].sum()
     param_dict['SCORES_AVERAGE'] ,param_dict['NB_USER_AVERAGE'], param_dict['NB_MIN_PREDICTION'] = get_calculated_scores_average(param_dict['NB_TOTAL_PREDICT'],df_userscores_global)
 
-    param_dict['SCORES_GAMEDAY'],param_dict['NB_USER_GAMEDAY'] = get_calculated_scores_gameday(sr_snowflake_account,sr_gameday_output_calculate)
+    param_dict['SCORES_GAMEDAY'],param_dict['NB_USER_GAMEDAY'] = get_calculated_scores_gameday(dict_df['USERSCORES_GAMEDAY'])
     param_dict['LIST_GAMEDAY_CALCULATED'] =  get_calculated_list_gameday(df_gameday_calculated)
 
-    # we get the prediction championship results query
-    df_gamepredictchamp = snowflake_execute(sr_snowflake_account,sqlQ.qGamePredictchamp,(sr_gameday_output_calculate['SEASON_ID'],sr_gameday_output_calculate['GAMEDAY']))
+    # we get the prediction championship results
+    df_gamepredictchamp = dict_df['GAMEPREDICTCHAMP']
     param_dict['NB_GAME_PREDICTCHAMP'] = len(df_gamepredictchamp)
 
     #if there is no prediction championship games, we don't display the results
@@ -491,20 +512,20 @@ def get_calculated_parameters(sr_snowflake_account: pd.Series, sr_gameday_output
         param_dict['HAS_HOME_ADV'] = 0
     else:
         param_dict['IS_FOR_RANK'] = df_gamepredictchamp.at[0,'IS_FOR_RANK']
-        param_dict['RESULTS_PREDICTCHAMP'] = get_calculated_predictchamp_result(df_gamepredictchamp,sr_snowflake_account,sr_gameday_output_calculate)
+        param_dict['RESULTS_PREDICTCHAMP'] = get_calculated_predictchamp_result(df_gamepredictchamp,dict_df['GAMEPREDICTCHAMP_DETAIL'])
         param_dict['HAS_HOME_ADV'] = df_gamepredictchamp.at[0,'HAS_HOME_ADV']
 
     # if the predictions games are not for rank, we don't display the predictions championship ranking
     if param_dict['IS_FOR_RANK'] == 0:
         param_dict['RANK_PREDICTCHAMP_DF'] = None
     else:
-        param_dict['RANK_PREDICTCHAMP_DF'] = get_calculated_predictchamp_ranking(sr_snowflake_account,sr_gameday_output_calculate)
+        param_dict['RANK_PREDICTCHAMP_DF'] = get_calculated_predictchamp_ranking(dict_df['TEAMSCORES'])
 
-    param_dict['LIST_CORRECTION'],param_dict['NB_CORRECTION'] = get_calculated_correction(sr_snowflake_account,sr_gameday_output_calculate)
+    param_dict['LIST_CORRECTION'],param_dict['NB_CORRECTION'] = get_calculated_correction(dict_df['CORRECTION'])
 
     # we process MVP race figures, only if need to display them
     if sr_gameday_output_calculate['DISPLAY_MONTH_MVP_RANKING']  == 1:
-        GAMEDAY_MONTH, LIST_USER_MONTH, NB_USER_MONTH = get_mvp_month_race_figure(sr_snowflake_account,sr_gameday_output_calculate)
+        GAMEDAY_MONTH, LIST_USER_MONTH, NB_USER_MONTH = get_mvp_month_race_figure(dict_df['MONTH_MVP'],sr_gameday_output_calculate)
         param_dict['GAMEDAY_MONTH'] = GAMEDAY_MONTH
         param_dict['LIST_USER_MONTH'] = LIST_USER_MONTH
         param_dict['NB_USER_MONTH'] = NB_USER_MONTH
@@ -514,7 +535,7 @@ def get_calculated_parameters(sr_snowflake_account: pd.Series, sr_gameday_output
         param_dict['NB_USER_MONTH'] = 0
 
     if sr_gameday_output_calculate['DISPLAY_COMPET_MVP_RANKING']  == 1:
-        GAMEDAY_COMPETITION, LIST_USER_COMPETITION, NB_USER_COMPETITION = get_mvp_compet_race_figure(sr_snowflake_account,sr_gameday_output_calculate)
+        GAMEDAY_COMPETITION, LIST_USER_COMPETITION, NB_USER_COMPETITION = get_mvp_compet_race_figure(dict_df['COMPET_MVP'],sr_gameday_output_calculate)
         param_dict['GAMEDAY_COMPETITION'] = GAMEDAY_COMPETITION
         param_dict['LIST_USER_COMPETITION'] = LIST_USER_COMPETITION
         param_dict['NB_USER_COMPETITION'] = NB_USER_COMPETITION
@@ -532,12 +553,12 @@ def derive_calculated_parameters_for_country(param_dict: dict, sr_gameday_output
         Calculates derived parameters from a part of the the one retrieved by:
         - translating parameters for the given country
         - capturing specific translated dataframe parameters in jpg parameter
-        - push captures on imgbb online provider and get the url parameter
+        - push captures on imgbb online provider and get the url parameter, unless they have already been pushed
         Inputs:
             param_dict (data dictionary) contains calculated parameters we want to derive for the given country
             sr_gameday_output_calculate (serie - one row): used to calculate derived parameters
             country (str): we translate parameters for this country
-            translations (list): contains all strings to translate
+            translations (dict): contains all strings to translate, compiled
         Returns:
             translated, captured, and url parameters into a dictionary
         Raises:
@@ -567,19 +588,30 @@ def derive_calculated_parameters_for_country(param_dict: dict, sr_gameday_output
         }
     }
 
+    # we submit all captures first, so that they are rendered in parallel by the capture processes
+    # captures already pushed with the same content are neither rendered nor pushed again: their cached url is used
+    capture_futures = {}
     for key, captconfig in capture_configs.items():
         translated_key = key+'_'+country
         if translated_key in translated_dict:
             filename = outputA.define_filename(captconfig["filename_prefix"], sr_gameday_output_calculate, 'jpg', country)
-            local_path = os.path.join(config.TMPF, filename)
+            capture_hash = get_capture_hash(translated_dict[translated_key], captconfig["capture_func"].__qualname__)
+            if get_cached_capture_url(capture_hash) is not None:
+                capture_futures[key] = (filename, capture_hash, None)
+            else:
+                capture_futures[key] = (filename, capture_hash, outputA.submit_capture(captconfig["capture_func"], translated_dict[translated_key], filename))
 
-            # Capture and push image
-            captconfig["capture_func"](translated_dict[translated_key], filename)
-            url = push_capture_online(local_path)
+    for key, (filename, capture_hash, capture_future) in capture_futures.items():
+        # we push each image once captured
+        if capture_future is None:
+            url = get_cached_capture_url(capture_hash)
+        else:
+            local_path = capture_future.result()
+            url = push_capture_online(local_path, capture_hash)
 
-            # Store metadata
-            captured_dict[f"{key}_CAPTURE_{country}"] = filename
-            captured_dict[f"{key}_URL_{country}"] = url
+        # Store metadata
+        captured_dict[f"{key}_CAPTURE_{country}"] = filename
+        captured_dict[f"{key}_URL_{country}"] = url
 
     return translated_dict | captured_dict
 
@@ -598,8 +630,8 @@ def derive_calculated_parameters(param_dict: dict, sr_gameday_output_calculate:
             Exits the program if error running the function (using decorator)
     '''
 
-    # we get the json file of translation
-    translations = fileA.read_json("output_actions/output_actions_translations.json")
+    # we get the json file of translation, compiled once for all parameters and countries
+    translations = outputA.compile_translations(fileA.read_json("output_actions/output_actions_translations.json"))
 
     # we filter only the relevant non-None entries and non empty dataframe from param_dict
     keys_to_check = ['SCORES_DETAILED_DF', 'SCORES_GLOBAL_DF', 'RANK_PREDICTCHAMP_DF','RESULTS_PREDICTCHAMP','GAMEDAY_MONTH','LIST_USER_MONTH','GAMEDAY_COMPETITION','LIST_USER_COMPETITION']
@@ -619,6 +651,19 @@ def derive_calculated_parameters(param_dict: dict, sr_gameday_output_calculate:
     param_dict_derived.update({k: v for r in results for k, v in r.items()})
     return param_dict_derived
 
+# Placeholders (#NAME#) and conditional blocks (#NAME_BEGIN# ... #NAME_END#) of the calculated gameday message templates
+CALCULATED_MESSAGE_PLACEHOLDERS = (
+    "MESSAGE_PREFIX_PROGRAM_STRING", "GAMEDAY", "SEASON_DIVISION", "RESULT_GAMES", "NB_GAMEDAY_CALCULATED", "NB_TOTAL_PREDICT", "LIST_GAMEDAY_CALCULATED",
+    "SCORES_GAMEDAY", "IMGDETAIL", "NB_GAMES", "LIST_USER_SCOREAUTO0", "IMGSEASON", "NB_MIN_PREDICTION", "SCORES_AVERAGE",
+    "RESULTS_PREDICTCHAMP", "RANK_PREDICTCHAMP_IMG", "GAMEDAY_MONTH", "LIST_USER_MONTH", "NB_USER_MONTH",
+    "GAMEDAY_COMPETITION", "LIST_USER_COMPETITION", "NB_USER_COMPETITION"
+)
+CALCULATED_MESSAGE_BLOCKS = (
+    "WITH_PREDICTORS_GAMEDAY", "WITHOUT_PREDICTORS_GAMEDAY", "SCOREAUTO0", "WITH_PREDICTORS_GLOBAL", "WITHOUT_PREDICTORS_GLOBAL",
+    "WITH_PREDICTORS_AVERAGE", "WITHOUT_PREDICTORS_AVERAGE", "WITH_PREDICTCHAMP", "WITHOUT_PREDICTCHAMP",
+    "WITH_HOME_ADV", "WITHOUT_HOME_ADV", "WITH_PREDICTCHAMPRANKING", "WITH_MONTH_MVP", "WITH_COMPETITION_MVP"
+)
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('sr_gameday_output_calculate','country')})
 def create_calculated_messages_for_country(param_dict: dict, country: str, template:str, sr_gameday_output_calculate: pd.Series) -> Tuple[str,str]:
 
@@ -626,6 +671,7 @@ def create_calculated_messages_for_country(param_dict: dict, country: str, templ
         Defines calculated message for each given country:
         - by replacing text with calculated parameters
         - removing blocks of text according to the value of some of the calculated parameters
+        both in one pass on the compiled template
         - create the text file containing the message
         Inputs:
             param_dict (data dictionary) containing parameters
@@ -638,91 +684,88 @@ def create_calculated_messages_for_country(param_dict: dict, country: str, templ
             Exits the program if error running the function (using decorator)
     '''
 
-    # we replace |N| in the text with N*newlines
-    content = outputA.format_message(template)
+    # we replace |N| in the text with N*newlines, and compile the template once for all messages
+    template_nodes = outputA.compile_message_template(outputA.format_message(template), CALCULATED_MESSAGE_PLACEHOLDERS, CALCULATED_MESSAGE_BLOCKS)
 
-    # we replace parameters...
-    # list is (replacement_field, replacement_value)
-    replacement_substr = [
-        ("#MESSAGE_PREFIX_PROGRAM_STRING#", config.message_prefix_program_string),
-        ("#GAMEDAY#",param_dict['GAMEDAY']),
-        ("#SEASON_DIVISION#",param_dict['SEASON_DIVISION']),
-        ("#RESULT_GAMES#",param_dict['RESULT_GAMES']),
-        ("#NB_GAMEDAY_CALCULATED#",str(param_dict['NB_GAMEDAY_CALCULATED'])),
-        ("#NB_TOTAL_PREDICT#",str(param_dict['NB_TOTAL_PREDICT'])),
-        ("#LIST_GAMEDAY_CALCULATED#",param_dict['LIST_GAMEDAY_CALCULATED']) 
-    ]
+    # we get parameters...
+    # dict is {placeholder: value}
+    replacement_values = {
+        "MESSAGE_PREFIX_PROGRAM_STRING": config.message_prefix_program_string,
+        "GAMEDAY": param_dict['GAMEDAY'],
+        "SEASON_DIVISION": param_dict['SEASON_DIVISION'],
+        "RESULT_GAMES": param_dict['RESULT_GAMES'],
+        "NB_GAMEDAY_CALCULATED": str(param_dict['NB_GAMEDAY_CALCULATED']),
+        "NB_TOTAL_PREDICT": str(param_dict['NB_TOTAL_PREDICT']),
+        "LIST_GAMEDAY_CALCULATED": param_dict['LIST_GAMEDAY_CALCULATED']
+    }
 
     if param_dict['NB_USER_DETAIL'] > 0:   
-        replacement_substr.extend([
-            ("#SCORES_GAMEDAY#",param_dict['SCORES_GAMEDAY']),
-            ("#IMGDETAIL#",param_dict['SCORES_DETAILED_DF_URL_'+country]),
-            ("#NB_GAMES#",str(param_dict['NB_GAMES']))
-        ])
+        replacement_values.update({
+            "SCORES_GAMEDAY": param_dict['SCORES_GAMEDAY'],
+            "IMGDETAIL": param_dict['SCORES_DETAILED_DF_URL_'+country],
+            "NB_GAMES": str(param_dict['NB_GAMES'])
+        })
 
     if param_dict['NB_CORRECTION'] > 0:
-        replacement_substr.extend([
-            ("#LIST_USER_SCOREAUTO0#",param_dict['LIST_CORRECTION'])
-        ])
+        replacement_values.update({
+            "LIST_USER_SCOREAUTO0": param_dict['LIST_CORRECTION']
+        })
 
     if param_dict['NB_USER_GLOBAL'] > 0:
-        replacement_substr.extend([
-            ("#IMGSEASON#",param_dict['SCORES_GLOBAL_DF_URL_'+country])
-        ])
+        replacement_values.update({
+            "IMGSEASON": param_dict['SCORES_GLOBAL_DF_URL_'+country]
+        })
 
     if param_dict['NB_USER_AVERAGE'] > 0:
-        replacement_substr.extend([
-            ("#NB_MIN_PREDICTION#",str(param_dict['NB_MIN_PREDICTION'])),
-            ("#SCORES_AVERAGE#",param_dict['SCORES_AVERAGE'])
-        ])    
+        replacement_values.update({
+            "NB_MIN_PREDICTION": str(param_dict['NB_MIN_PREDICTION']),
+            "SCORES_AVERAGE": param_dict['SCORES_AVERAGE']
+        })    
 
     if param_dict['NB_GAME_PREDICTCHAMP'] > 0:
-        replacement_substr.extend([
-            ("#RESULTS_PREDICTCHAMP#",param_dict['RESULTS_PREDICTCHAMP_'+country])
-        ])  
+        replacement_values.update({
+            "RESULTS_PREDICTCHAMP": param_dict['RESULTS_PREDICTCHAMP_'+country]
+        })  
 
     if param_dict['IS_FOR_RANK'] == 1:
-        replacement_substr.extend([
-            ("#RANK_PREDICTCHAMP_IMG#",param_dict['RANK_PREDICTCHAMP_DF_URL_'+country])
-        ])  
+        replacement_values.update({
+            "RANK_PREDICTCHAMP_IMG": param_dict['RANK_PREDICTCHAMP_DF_URL_'+country]
+        })  
 
     if param_dict['NB_USER_MONTH'] > 0:
-        replacement_substr.extend([
-            ("#GAMEDAY_MONTH#",param_dict['GAMEDAY_MONTH_'+country]),
-            ("#LIST_USER_MONTH#",param_dict['LIST_USER_MONTH_'+country]),
-            ("#NB_USER_MONTH#",str(param_dict['NB_USER_MONTH']))
-        ])  
+        replacement_values.update({
+            "GAMEDAY_MONTH": param_dict['GAMEDAY_MONTH_'+country],
+            "LIST_USER_MONTH": param_dict['LIST_USER_MONTH_'+country],
+            "NB_USER_MONTH": str(param_dict['NB_USER_MONTH'])
+        })  
 
     if param_dict['NB_USER_COMPETITION'] > 0:
-        replacement_substr.extend([
-            ("#GAMEDAY_COMPETITION#",param_dict['GAMEDAY_COMPETITION_'+country]),
-            ("#LIST_USER_COMPETITION#",param_dict['LIST_USER_COMPETITION_'+country]),
-            ("#NB_USER_COMPETITION#",str(param_dict['NB_USER_COMPETITION']))
-        ])          
-
-    for replacement_field, replacement_value in replacement_substr:
-        content = content.replace(replacement_field,replacement_value) 
-
-    # ... and possibly block if condition not True
-    conditional_blocks = [ #begin_tag , end_tag, condition
-        ("#WITH_PREDICTORS_GAMEDAY_BEGIN#", "#WITH_PREDICTORS_GAMEDAY_END#", param_dict['NB_USER_DETAIL'] > 0),
-        ("#WITHOUT_PREDICTORS_GAMEDAY_BEGIN#", "#WITHOUT_PREDICTORS_GAMEDAY_END#", param_dict['NB_USER_DETAIL'] == 0),
-        ("#SCOREAUTO0_BEGIN#", "#SCOREAUTO0_END#", param_dict['NB_CORRECTION'] > 0),
-        ("#WITH_PREDICTORS_GLOBAL_BEGIN#", "#WITH_PREDICTORS_GLOBAL_END#", param_dict['NB_USER_GLOBAL'] > 0),
-        ("#WITHOUT_PREDICTORS_GLOBAL_BEGIN#", "#WITHOUT_PREDICTORS_GLOBAL_END#", param_dict['NB_USER_GLOBAL'] == 0),
-        ("#WITH_PREDICTORS_AVERAGE_BEGIN#", "#WITH_PREDICTORS_AVERAGE_END#", param_dict['NB_USER_AVERAGE'] > 0),
-        ("#WITHOUT_PREDICTORS_AVERAGE_BEGIN#", "#WITHOUT_PREDICTORS_AVERAGE_END#", param_dict['NB_USER_AVERAGE'] == 0),
-        ("#WITH_PREDICTCHAMP_BEGIN#", "#WITH_PREDICTCHAMP_END#", param_dict['NB_GAME_PREDICTCHAMP'] > 0),
-        ("#WITHOUT_PREDICTCHAMP_BEGIN#", "#WITHOUT_PREDICTCHAMP_END#", param_dict['NB_GAME_PREDICTCHAMP'] == 0),
-        ("#WITH_HOME_ADV_BEGIN#", "#WITH_HOME_ADV_END#", param_dict['HAS_HOME_ADV'] == 1),
-        ("#WITHOUT_HOME_ADV_BEGIN#", "#WITHOUT_HOME_ADV_END#", param_dict['HAS_HOME_ADV'] == 0),
-        ("#WITH_PREDICTCHAMPRANKING_BEGIN#", "#WITH_PREDICTCHAMPRANKING_END#", param_dict['IS_FOR_RANK'] == 1),
-        ("#WITH_MONTH_MVP_BEGIN#", "#WITH_MONTH_MVP_END#", param_dict['NB_USER_MONTH'] > 0),
-        ("#WITH_COMPETITION_MVP_BEGIN#", "#WITH_COMPETITION_MVP_END#", param_dict['NB_USER_COMPETITION'] > 0)
-    ]
-
-    for begin_tag, end_tag, condition in conditional_blocks:
-        content = outputA.replace_conditionally_message(content,begin_tag, end_tag, condition)
+        replacement_values.update({
+            "GAMEDAY_COMPETITION": param_dict['GAMEDAY_COMPETITION_'+country],
+            "LIST_USER_COMPETITION": param_dict['LIST_USER_COMPETITION_'+country],
+            "NB_USER_COMPETITION": str(param_dict['NB_USER_COMPETITION'])
+        })          
+
+    # ... and conditions to keep blocks
+    block_conditions = {
+        "WITH_PREDICTORS_GAMEDAY": param_dict['NB_USER_DETAIL'] > 0,
+        "WITHOUT_PREDICTORS_GAMEDAY": param_dict['NB_USER_DETAIL'] == 0,
+        "SCOREAUTO0": param_dict['NB_CORRECTION'] > 0,
+        "WITH_PREDICTORS_GLOBAL": param_dict['NB_USER_GLOBAL'] > 0,
+        "WITHOUT_PREDICTORS_GLOBAL": param_dict['NB_USER_GLOBAL'] == 0,
+        "WITH_PREDICTORS_AVERAGE": param_dict['NB_USER_AVERAGE'] > 0,
+        "WITHOUT_PREDICTORS_AVERAGE": param_dict['NB_USER_AVERAGE'] == 0,
+        "WITH_PREDICTCHAMP": param_dict['NB_GAME_PREDICTCHAMP'] > 0,
+        "WITHOUT_PREDICTCHAMP": param_dict['NB_GAME_PREDICTCHAMP'] == 0,
+        "WITH_HOME_ADV": param_dict['HAS_HOME_ADV'] == 1,
+        "WITHOUT_HOME_ADV": param_dict['HAS_HOME_ADV'] == 0,
+        "WITH_PREDICTCHAMPRANKING": param_dict['IS_FOR_RANK'] == 1,
+        "WITH_MONTH_MVP": param_dict['NB_USER_MONTH'] > 0,
+        "WITH_COMPETITION_MVP": param_dict['NB_USER_COMPETITION'] > 0
+    }
+
+    # we render the message in one pass
+    content = outputA.render_message_template(template_nodes, replacement_values, block_conditions)
 
     file_name = outputA.define_filename("forumoutput_calculated", sr_gameday_output_calculate, 'txt', country)
     fileA.create_txt(os.path.join(config.TMPF,file_name),content)
@@ -752,7 +795,11 @@ def process_output_message_calculated(context_dict: dict, sr_gameday_output_calc
 
     param_dict_retrieve = get_calculated_parameters(sr_snowflake_account,sr_gameday_output_calculate)
     logging.info(f"OUTPUT -> PARAM RETRIEVED")
+    # we load urls of captures pushed at previous runs, so that they are not pushed again
+    load_imgbb_cache(context_dict.get('df_imgbb_cache'))
     param_dict_derived = derive_calculated_parameters(param_dict_retrieve,sr_gameday_output_calculate,list_countries)
+    outputA.close_capture_pool()
+    close_imgbb_session()
     logging.info(f"OUTPUT -> PARAM DERIVED")
     param_dict = param_dict_retrieve | param_dict_derived
 
@@ -764,4 +811,5 @@ def process_output_message_calculated(context_dict: dict, sr_gameday_output_calc
 
     posting_args = [(row,param_dict['MESSAGE_'+row['FORUM_COUNTRY']]) for _,row in df_topics.iterrows()]
     config.multithreading_run(post_message, posting_args)
+    close_forum_post_sessions()
     logging.info(f"OUTPUT -> GENERATING CALCULATED MESSAGE [DONE]")
\ No newline at end of file
@@ -11,7 +11,7 @@ from typing import Tuple
 
 from snowflake_actions import snowflake_execute
 import config
-from message_actions import post_message
+from message_actions import post_message, close_forum_post_sessions
 import file_actions as fileA
 from output_actions import output_actions as outputA
 from output_actions import output_actions_sql_queries as sqlQ
@@ -135,7 +135,7 @@ def derive_inited_parameters_for_country(param_dict: dict, country: str, transla
         Inputs:
             param_dict (data dictionary) contains inited retrieved parameters we want to derive for the given country
             country (str): we translate parameters for this country
-            translations (list): contains all strings to translate
+            translations (dict): contains all strings to translate, compiled
         Returns:
             translated parameters into a dictionary
         Raises:
@@ -164,8 +164,8 @@ def derive_inited_parameters(param_dict: dict, list_countries: list[str]) -> dic
             Exits the program if error running the function (using decorator)
     '''
 
-    # we get the json file of translation
-    translations = fileA.read_json("output_actions/output_actions_translations.json")
+    # we get the json file of translation, compiled once for all parameters and countries
+    translations = outputA.compile_translations(fileA.read_json("output_actions/output_actions_translations.json"))
 
     # we filter only the relevant entries from param_dict
     dict_to_derive = {'DATEGAME1': param_dict['DATEGAME1']}
@@ -177,12 +177,16 @@ def derive_inited_parameters(param_dict: dict, list_countries: list[str]) -> dic
     param_dict_derived.update({k: v for r in results for k, v in r.items()})
     return param_dict_derived
 
+# Placeholders (#NAME#) and conditional blocks (#NAME_BEGIN# ... #NAME_END#) of the inited gameday message templates
+INITED_MESSAGE_PLACEHOLDERS = ("MESSAGE_PREFIX_PROGRAM_STRING", "DATEGAME1", "GAMEDAY", "LIST_GAMES", "BONUS_GAME", "REMAINING_GAMEDAYS", "REMAINING_GAMES")
+INITED_MESSAGE_BLOCKS = ("USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP", "REMAINING_GAMES")
+
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('country','sr_gameday_output_init') })
 def create_inited_messages_for_country(param_dict: dict, country: str, template: str, sr_gameday_output_init: pd.Series) -> Tuple[str,str]:
 
     '''
         Defines inited gameday message:
-        - by replacing text with calculated parameters
+        - by replacing text with calculated parameters, and removing blocks of text on condition, in one pass on the compiled template
         - create the text file containing the message
         Inputs:
             param_dict (data dictionary) containing parameters
@@ -195,30 +199,32 @@ def create_inited_messages_for_country(param_dict: dict, country: str, template:
             Exits the program if error running the function (using decorator)
     '''
 
-    # we replace |N| in the text with N*newlines
-    content = outputA.format_message(template)
+    # we replace |N| in the text with N*newlines, and compile the template once for all messages
+    template_nodes = outputA.compile_message_template(outputA.format_message(template), INITED_MESSAGE_PLACEHOLDERS, INITED_MESSAGE_BLOCKS)
 
-    # we replace parameters systematically...
-    content = content.replace("#MESSAGE_PREFIX_PROGRAM_STRING#",config.message_prefix_program_string)
-    content = content.replace("#DATEGAME1#",param_dict['DATEGAME1_'+country])  
-    content = content.replace("#GAMEDAY#",param_dict['GAMEDAY'])  
-    content = content.replace("#LIST_GAMES#",param_dict['LIST_GAMES'])    
-    content = content.replace("#BONUS_GAME#",param_dict['BONUS_GAME'])
+    # we get parameters systematically...
+    replacement_values = {
+        "MESSAGE_PREFIX_PROGRAM_STRING": config.message_prefix_program_string,
+        "DATEGAME1": param_dict['DATEGAME1_'+country],
+        "GAMEDAY": param_dict['GAMEDAY'],
+        "LIST_GAMES": param_dict['LIST_GAMES'],
+        "BONUS_GAME": param_dict['BONUS_GAME']
+    }
 
     # ... and on condition
-    content = outputA.replace_conditionally_message(content, 
-                                            "#USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP_BEGIN#", 
-                                            "#USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP_END#", 
-                                            param_dict['USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP'] == 1)
-    
-    content = outputA.replace_conditionally_message(content, 
-                                                "#REMAINING_GAMES_BEGIN#", 
-                                                "#REMAINING_GAMES_END#", 
-                                                param_dict['NB_GAMES_REMAINING'] > 0)   
-    
     if param_dict['NB_GAMES_REMAINING'] > 0: 
-        content = content.replace("#REMAINING_GAMEDAYS#",param_dict['REMAINING_GAMEDAYS'])
-        content = content.replace("#REMAINING_GAMES#",param_dict['REMAINING_GAMES'])
+        replacement_values.update({
+            "REMAINING_GAMEDAYS": param_dict['REMAINING_GAMEDAYS'],
+            "REMAINING_GAMES": param_dict['REMAINING_GAMES']
+        })
+
+    block_conditions = {
+        "USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP": param_dict['USER_CAN_CHOOSE_TEAM_FOR_PREDICTCHAMP'] == 1,
+        "REMAINING_GAMES": param_dict['NB_GAMES_REMAINING'] > 0
+    }
+
+    # we render the message in one pass
+    content = outputA.render_message_template(template_nodes, replacement_values, block_conditions)
     
     file_name = outputA.define_filename("forumoutput_inited", sr_gameday_output_init, 'txt', country)
     fileA.create_txt(os.path.join(config.TMPF,file_name),content)
@@ -264,4 +270,5 @@ def process_output_message_inited(context_dict: dict, sr_gameday_output_init: pd
     # we post messages for each concerned topics
     posting_args = [(row,param_dict['MESSAGE_'+row['FORUM_COUNTRY']]) for _,row in df_topics.iterrows()]
     config.multithreading_run(post_message, posting_args)
+    close_forum_post_sessions()
     logging.info(f"OUTPUT -> GENERATING CALCULATED MESSAGE [DONE]")
\ No newline at end of file
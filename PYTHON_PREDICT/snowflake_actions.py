@@ -9,8 +9,16 @@ logging.basicConfig(level=logging.INFO)
 logging.getLogger("snowflake.connector").setLevel(logging.WARNING)
 import snowflake.connector
 from snowflake.connector.connection import SnowflakeConnection
+from snowflake.connector.constants import FIELD_ID_TO_NAME
+from snowflake.connector.pandas_tools import write_pandas
 import os
-import subprocess
+import shutil
+import uuid
+import functools
+import threading
+import queue
+import time
+from contextlib import contextmanager
 from pathlib import Path
 import pandas as pd
 from typing import Sequence, Mapping, Any, Tuple, Literal
@@ -19,18 +27,40 @@ from sqlglot import exp
 logging.getLogger("sqlglot").setLevel(logging.ERROR)
 
 import config
-from file_actions import create_csv
+from file_actions import create_csv, create_csv_from_batches, create_parquet_from_batches
 import sql_queries as sqlQ
 
-# Global variable to store the Snowflake connection
-current_snowflake_connection = None
+# Global pools of Snowflake connections, one per (account, database):
+# - idle connections are stored with the time they were released
+# - we count opened connections per pool to not open more than config.snowflake_pool_size
+snowflake_connection_pools = {}
+snowflake_connection_counts = {}
+snowflake_pool_lock = threading.Lock()
+
+# Global cache of the columns of each snowflake table, per (database, schema, table), read once per run
+snowflake_table_columns = {}
+snowflake_table_columns_lock = threading.Lock()
+
+def get_snowflake_database(sr_snowflake_account: pd.Series) -> str:
+
+    """
+        Gets the database used by the run (prod or test) for a snowflake account
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameters
+        Returns:
+            the database name
+    """
+
+    if os.getenv("IS_TESTRUN") == '0':
+        return sr_snowflake_account['DATABASE_PROD']
+    return sr_snowflake_account['DATABASE_TEST']
 
 @config.exit_program(log_filter=lambda args: {})
 @config.retry_function(log_filter=lambda args: {})
 def snowflake_connect(sr_snowflake_account: pd.Series) -> SnowflakeConnection:
 
     """
-        The purpose of this function is to connect to Snowflake using the connector (if not already connected)
+        The purpose of this function is to open a new connection (session) to Snowflake using the connector
         Args:
             sr_snowflake_account (series - one row) : Contains the snowflake account parameters to run a query
         Returns:
@@ -39,31 +69,184 @@ def snowflake_connect(sr_snowflake_account: pd.Series) -> SnowflakeConnection:
             Retry 3 times and exits the program if error connecting (with decorators)
     """
 
-    global current_snowflake_connection  # Reference the global variable
-
     #We get environment keys (GitHub secrets)
     SNOWFLAKE_USERNAME = os.getenv('SNOWFLAKE_USERNAME')
     SNOWFLAKE_PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
 
-    #if we are already connected no need to do it again
-    if not(current_snowflake_connection and not current_snowflake_connection.is_closed()):
-        if os.getenv("IS_TESTRUN") == '0':
-            database = sr_snowflake_account['DATABASE_PROD']
-        else:
-            database = sr_snowflake_account.at['DATABASE_TEST']
-
-        current_snowflake_connection = snowflake.connector.connect(
-            user = SNOWFLAKE_USERNAME,
-            password= SNOWFLAKE_PASSWORD,
-            account=sr_snowflake_account['ACCOUNT'],
-            warehouse=sr_snowflake_account['WAREHOUSE'],
-            database=database,
-            schema=config.landing_database_schema,
-            role=config.role_database,
-            login_timeout=config.snowflake_login_wait_time
-        )
-        logging.info(f"SNOWFLAKE -> CONNECTED")
-    return current_snowflake_connection
+    snowflake_connection = snowflake.connector.connect(
+        user = SNOWFLAKE_USERNAME,
+        password= SNOWFLAKE_PASSWORD,
+        account=sr_snowflake_account['ACCOUNT'],
+        warehouse=sr_snowflake_account['WAREHOUSE'],
+        database=get_snowflake_database(sr_snowflake_account),
+        schema=config.landing_database_schema,
+        role=config.role_database,
+        login_timeout=config.snowflake_login_wait_time
+    )
+    logging.info(f"SNOWFLAKE -> CONNECTED")
+    return snowflake_connection
+
+def is_snowflake_connection_healthy(snowflake_connection: SnowflakeConnection, last_used_time: float) -> bool:
+
+    """
+        Checks an idle connection of a pool can be reused:
+        - it must not be closed
+        - if it has been idle for too long, its session might have expired, so we ping it with a light query
+        Args:
+            snowflake_connection (SnowflakeConnection): the idle connection
+            last_used_time (float): the monotonic time the connection was released to the pool
+        Returns:
+            True if the connection can be reused, else False
+    """
+
+    if snowflake_connection.is_closed():
+        return False
+    if time.monotonic() - last_used_time < config.snowflake_pool_healthcheck_idle_time:
+        return True
+    try:
+        with snowflake_connection.cursor() as snowCursor:
+            snowCursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+def discard_snowflake_connection(pool_key: Tuple[str, str], snowflake_connection: SnowflakeConnection):
+
+    """
+        Closes a connection which can't be reused and frees its place in the pool
+        Args:
+            pool_key (tuple): the (account, database) of the pool
+            snowflake_connection (SnowflakeConnection): the connection to discard
+    """
+
+    try:
+        snowflake_connection.close()
+    except Exception:
+        pass
+    with snowflake_pool_lock:
+        snowflake_connection_counts[pool_key] = max(snowflake_connection_counts.get(pool_key, 0) - 1, 0)
+
+def acquire_snowflake_connection(sr_snowflake_account: pd.Series) -> SnowflakeConnection:
+
+    """
+        Gets a connection from the pool of the account and database, so each thread works with its own session:
+        - reuses a healthy idle connection if any
+        - else opens a new one if the pool is not full
+        - else waits for a connection to be released
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameters to run a query
+        Returns:
+            the snowflake connection, to give back with release_snowflake_connection
+        Raises:
+            TimeoutError if no connection is released in time
+    """
+
+    pool_key = (sr_snowflake_account['ACCOUNT'], get_snowflake_database(sr_snowflake_account))
+    with snowflake_pool_lock:
+        pool = snowflake_connection_pools.setdefault(pool_key, queue.LifoQueue())
+
+    while True:
+        try:
+            snowflake_connection, last_used_time = pool.get_nowait()
+        except queue.Empty:
+            #we reserve a place in the pool before connecting, to not exceed its size
+            with snowflake_pool_lock:
+                is_to_connect = snowflake_connection_counts.get(pool_key, 0) < config.snowflake_pool_size
+                if is_to_connect:
+                    snowflake_connection_counts[pool_key] = snowflake_connection_counts.get(pool_key, 0) + 1
+            if is_to_connect:
+                return snowflake_connect(sr_snowflake_account)
+            try:
+                snowflake_connection, last_used_time = pool.get(timeout=config.snowflake_pool_wait_time)
+            except queue.Empty:
+                raise TimeoutError(f"No snowflake connection released after {config.snowflake_pool_wait_time} seconds")
+
+        if is_snowflake_connection_healthy(snowflake_connection, last_used_time):
+            return snowflake_connection
+        discard_snowflake_connection(pool_key, snowflake_connection)
+
+def release_snowflake_connection(sr_snowflake_account: pd.Series, snowflake_connection: SnowflakeConnection):
+
+    """
+        Gives back a connection to the pool of the account and database, or discards it if it is closed
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameters to run a query
+            snowflake_connection (SnowflakeConnection): the connection acquired with acquire_snowflake_connection
+    """
+
+    pool_key = (sr_snowflake_account['ACCOUNT'], get_snowflake_database(sr_snowflake_account))
+    if snowflake_connection.is_closed():
+        discard_snowflake_connection(pool_key, snowflake_connection)
+        return
+    with snowflake_pool_lock:
+        pool = snowflake_connection_pools.setdefault(pool_key, queue.LifoQueue())
+    pool.put((snowflake_connection, time.monotonic()))
+
+@contextmanager
+def snowflake_session(sr_snowflake_account: pd.Series):
+
+    """
+        Context manager lending a pooled connection to the calling thread, and giving it back to the pool when done
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameters to run a query
+        Yields:
+            the snowflake connection with which we can run query
+    """
+
+    snowflake_connection = acquire_snowflake_connection(sr_snowflake_account)
+    try:
+        yield snowflake_connection
+    finally:
+        release_snowflake_connection(sr_snowflake_account, snowflake_connection)
+
+def close_snowflake_connections():
+
+    """
+        Closes all idle connections of all pools and empties them, called when terminating the run
+    """
+
+    with snowflake_pool_lock:
+        pools = list(snowflake_connection_pools.values())
+        snowflake_connection_pools.clear()
+        snowflake_connection_counts.clear()
+
+    nb_closed = 0
+    for pool in pools:
+        while True:
+            try:
+                snowflake_connection, _ = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                snowflake_connection.close()
+                nb_closed += 1
+            except Exception as e:
+                logging.warning(f"SNOWFLAKE -> ERROR CLOSING A CONNECTION: {e}")
+    if nb_closed:
+        logging.info(f"SNOWFLAKE -> {nb_closed} CONNECTION(S) CLOSED")
+
+@functools.lru_cache(maxsize=512)
+def get_query_kind(query: str) -> str:
+
+    """
+        Gets the kind of a query (SELECT, SHOW, ...) by parsing it with sqlglot.
+        Queries come from a few templates, so the result is memoized per query and each one is parsed only once per run
+        Args:
+            query (str): The query personalized
+        Returns:
+            the kind of the query, upper case
+        Raises:
+            ValueError if the query doesn't have a sql keyword
+    """
+
+    query_root = sqlglot.parse_one(query.replace("%s", "NULL"), read="snowflake")
+    if isinstance(query_root, exp.With):
+        query_root = query_root.this
+
+    #If it doesn't a sql keyword we raise an error
+    if not hasattr(query_root, "key"):
+        raise ValueError("The sql is not valid (doesn't have a keyword)")
+    return query_root.key.upper()
 
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('query','params') })
 @config.retry_function(log_filter=lambda args: {k: args[k] for k in ('query','params') })
@@ -86,35 +269,252 @@ def snowflake_execute(sr_snowflake_account: pd.Series, query: str, params: Seque
             Retry 3 times and exits the program if error executing or parsing the query (with decorators)
     """
     
-    #We connect to Snowflake
-    snowConnect = snowflake_connect(sr_snowflake_account)
-    
-    #We personalized #DATABASE# and run the query
-    if os.getenv("IS_TESTRUN") == '0':
-        database = sr_snowflake_account['DATABASE_PROD']
-    else:
-        database = sr_snowflake_account['DATABASE_TEST']
-    with snowConnect.cursor() as snowCursor:
+    return run_snowflake_query(sr_snowflake_account, query, params)
+
+def run_snowflake_query(sr_snowflake_account: pd.Series, query: str, params: Sequence[Any] | Mapping[str, Any] | None =None) -> pd.DataFrame | list | None:
+
+    """
+        Personalizes and runs a snowflake query, for snowflake_execute and snowflake_execute_best_effort
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            query (str): The query we want to run
+            params (list): list of parameters to personalize the query with
+        Returns:
+            the dataframe for a select query, the list for a show query, else None
+    """
+
+    #We personalized #DATABASE# and run the query with a connection of the pool
+    database = get_snowflake_database(sr_snowflake_account)
+    with snowflake_session(sr_snowflake_account) as snowConnect, snowConnect.cursor() as snowCursor:
         query_personalized = query.replace("#DATABASE#",database)
         snowCursor.execute(query_personalized,params)
 
-        #We parse the query using sqlglot to possibly return the related dataframe/list
-        query_root = sqlglot.parse_one(query_personalized.replace("%s", "NULL"), read="snowflake")
-        if isinstance(query_root, exp.With):
-            query_root = query_root.this
-
-        #If it doesn't a sql keyword we raise an error
-        if not hasattr(query_root, "key"):
-            raise ValueError("The sql is not valid (doesn't have a keyword)")
+        #We get the kind of query to possibly return the related dataframe/list
+        query_kind = get_query_kind(query_personalized)
         #If it is a select query we return the associated dataframe
-        if query_root.key.upper() == "SELECT":
+        if query_kind == "SELECT":
             df = snowCursor.fetch_pandas_all()
             return df
         #If it is a show query we return the associated list
-        if query_root.key.upper() == "SHOW":
+        if query_kind == "SHOW":
             lst = snowCursor.fetchall()
             return lst
 
+def snowflake_execute_best_effort(sr_snowflake_account: pd.Series, query: str, params: Sequence[Any] | Mapping[str, Any] | None =None) -> pd.DataFrame | list | None:
+
+    """
+        Runs a query as snowflake_execute does, without retrying nor exiting the program if it fails:
+        it is used for lookups the program can do without
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            query (str): The query we want to run
+            params (list): list of parameters to personalize the query with
+        Returns:
+            the result of the query as snowflake_execute, or None if it failed
+    """
+
+    try:
+        return run_snowflake_query(sr_snowflake_account, query, params)
+    except Exception as e:
+        logging.warning(f"SNOWFLAKE -> QUERY FAILED, IGNORED: {e}")
+        return None
+
+@config.exit_program(log_filter=lambda args: {'queries': list(args['dict_queries'])})
+@config.retry_function(log_filter=lambda args: {'queries': list(args['dict_queries'])})
+def snowflake_execute_async(sr_snowflake_account: pd.Series, dict_queries: dict[str, Tuple[str, Sequence[Any] | Mapping[str, Any] | None]]) -> dict[str, pd.DataFrame]:
+
+    """
+        The purpose of this function is to:
+        - personalize several independent snowflake select queries
+        - submit them all at once without waiting for their results (snowflake runs them in parallel)
+        - gather the related dataframes once all queries are done
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            dict_queries (data dictionary): The select queries we want to run, with their parameters, per name
+        Returns:
+            data dictionary containing the dataframe of each query, per name
+        Raises:
+            Retry 3 times and exits the program if error executing one of the queries (with decorators)
+    """
+    
+    #We personalize #DATABASE# and submit all queries with a connection of the pool
+    database = get_snowflake_database(sr_snowflake_account)
+    with snowflake_session(sr_snowflake_account) as snowConnect:
+        query_ids = {}
+        for query_name, (query, params) in dict_queries.items():
+            with snowConnect.cursor() as snowCursor:
+                snowCursor.execute_async(query.replace("#DATABASE#",database), params)
+                query_ids[query_name] = snowCursor.sfqid
+
+        #We then wait for each query to be done and get its dataframe - an error is raised if a query failed
+        dict_df = {}
+        for query_name, query_id in query_ids.items():
+            with snowConnect.cursor() as snowCursor:
+                snowCursor.get_results_from_sfqid(query_id)
+                dict_df[query_name] = snowCursor.fetch_pandas_all()
+        return dict_df
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('query','local_file_path') })
+@config.retry_function(log_filter=lambda args: {k: args[k] for k in ('query','local_file_path') })
+def snowflake_execute_to_csv(sr_snowflake_account: pd.Series, query: str, local_file_path: str, is_to_encapsulate: Literal[0, 1] = 0):
+
+    """
+        The purpose of this function is to:
+        - personalize a snowflake select query 
+        - run it
+        - write its result to a csv file batch after batch, without loading the whole result in memory
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            query (str): The select query we want to run
+            local_file_path (str): Path where the CSV file will be saved
+            is_to_encapsulate (0/1): If 1, encapsulate fields with "". Default is 0 (no encapsulation)
+        Raises:
+            Retry 3 times and exits the program if error executing the query (with decorators)
+    """
+    
+    #We personalized #DATABASE# and run the query with a connection of the pool
+    database = get_snowflake_database(sr_snowflake_account)
+    with snowflake_session(sr_snowflake_account) as snowConnect, snowConnect.cursor() as snowCursor:
+        snowCursor.execute(query.replace("#DATABASE#",database))
+
+        columns = [column.name for column in snowCursor.description]
+        # integer columns are kept as integers in every batch, even if a batch has null values
+        integer_columns = [column.name for column in snowCursor.description
+                           if FIELD_ID_TO_NAME[column.type_code] == 'FIXED' and not column.scale]
+        batches = (df.astype({col: 'Int64' for col in integer_columns}) for df in snowCursor.fetch_pandas_batches())
+        create_csv_from_batches(local_file_path, batches, columns, is_to_encapsulate)
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('query','local_file_path') })
+@config.retry_function(log_filter=lambda args: {k: args[k] for k in ('query','local_file_path') })
+def snowflake_execute_to_parquet(sr_snowflake_account: pd.Series, query: str, local_file_path: str):
+
+    """
+        The purpose of this function is to:
+        - personalize a snowflake select query 
+        - run it
+        - write its result to a parquet file arrow batch after arrow batch, without loading the whole result in memory
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            query (str): The select query we want to run
+            local_file_path (str): Path where the parquet file will be saved
+        Raises:
+            Retry 3 times and exits the program if error executing the query (with decorators)
+    """
+    
+    #We personalized #DATABASE# and run the query with a connection of the pool
+    database = get_snowflake_database(sr_snowflake_account)
+    with snowflake_session(sr_snowflake_account) as snowConnect, snowConnect.cursor() as snowCursor:
+        snowCursor.execute(query.replace("#DATABASE#",database))
+
+        columns = [column.name for column in snowCursor.description]
+        create_parquet_from_batches(local_file_path, snowCursor.fetch_arrow_batches(), columns)
+
+def get_snowflake_table_columns(sr_snowflake_account: pd.Series, schema: str, table_name: str) -> list[str]:
+
+    """
+        Gets the columns of a snowflake table, querying the information schema at first call only
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            schema (str): The schema of the table
+            table_name (str): The name of the table
+        Returns:
+            the column names (upper case), in the table order
+    """
+
+    table_key = (get_snowflake_database(sr_snowflake_account), schema.upper(), table_name.upper())
+    with snowflake_table_columns_lock:
+        if table_key in snowflake_table_columns:
+            return snowflake_table_columns[table_key]
+
+    df_columns = snowflake_execute(sr_snowflake_account, sqlQ.snowflake_actions_qTableColumns, (schema, table_name))
+    lst_columns = df_columns['COLUMN_NAME'].str.upper().tolist()
+    with snowflake_table_columns_lock:
+        snowflake_table_columns[table_key] = lst_columns
+    return lst_columns
+
+def is_dataframe_matching_table(sr_snowflake_account: pd.Series, df: pd.DataFrame, schema: str, table_name: str) -> bool:
+
+    """
+        Checks if the columns of a dataframe are the ones of a snowflake table.
+        write_pandas matches columns by name: a column named differently would be loaded as null,
+        while the csv file of the dataframe is loaded by position
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            df (dataframe): The dataframe to load
+            schema (str): The schema of the table
+            table_name (str): The name of the table
+        Returns:
+            True if the dataframe and the table have the same columns (case insensitive), False else
+    """
+
+    lst_table_columns = get_snowflake_table_columns(sr_snowflake_account, schema, table_name)
+    lst_df_columns = [str(column).upper() for column in df.columns]
+    if set(lst_df_columns) == set(lst_table_columns):
+        return True
+
+    logging.warning(f"SNOWFLAKE {table_name} -> DATAFRAME COLUMNS DON'T MATCH THE TABLE ONES: "
+                    f"{sorted(set(lst_df_columns) - set(lst_table_columns))} NOT IN TABLE, "
+                    f"{sorted(set(lst_table_columns) - set(lst_df_columns))} NOT IN DATAFRAME")
+    return False
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('schema','table_name','is_encapsulated') })
+@config.retry_function(log_filter=lambda args: {k: args[k] for k in ('schema','table_name','is_encapsulated') })
+def snowflake_write_pandas(sr_snowflake_account: pd.Series, df: pd.DataFrame, schema: str, table_name: str, is_encapsulated: Literal[0, 1] = 0):
+
+    """
+        The purpose of this function is to append a dataframe already in memory to a snowflake table,
+        sent as compressed parquet chunks (write_pandas) instead of going through a csv file.
+        Values are loaded as they would be from the csv file of the dataframe:
+        text values are sent as strings, and empty strings (and "NULL" if the file is encapsulated) are loaded as null
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            df (dataframe): The dataframe to load, its columns matching the table ones by name
+            schema (str): The schema of the table
+            table_name (str): The name of the table
+            is_encapsulated (0/1): If the csv file of the dataframe is encapsulated, to load the same null values
+        Raises:
+            Retry 3 times and exits the program if error loading the dataframe (with decorators)
+    """
+
+    #we format the dataframe as it would be read from its csv file
+    null_strings = ['', 'NULL'] if is_encapsulated == 1 else ['']
+    df_upload = df.copy()
+    for column in df_upload.columns[df_upload.dtypes == object]:
+        df_upload[column] = df_upload[column].map(lambda value: None if pd.isna(value) or str(value) in null_strings else str(value))
+
+    #we load it with a connection of the pool, columns are matched by name
+    with snowflake_session(sr_snowflake_account) as snowConnect:
+        success, _, nrows, _ = write_pandas(snowConnect, df_upload, table_name,
+                                            database=get_snowflake_database(sr_snowflake_account), schema=schema,
+                                            compression='snappy', quote_identifiers=False, use_logical_type=True)
+    if not success:
+        raise RuntimeError(f"Loading of {schema}.{table_name} from dataframe failed")
+    logging.info(f"SNOWFLAKE {table_name} -> {nrows} ROWS LOADED FROM DATAFRAME")
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('num_statements',) })
+@config.retry_function(log_filter=lambda args: {k: args[k] for k in ('num_statements',) })
+def snowflake_execute_multi_statement(sr_snowflake_account: pd.Series, script: str, num_statements: int):
+
+    """
+        The purpose of this function is to:
+        - personalize "#DATABASE#" in a snowflake list of queries gathered in a script
+        - send them in one call, snowflake running them one after another and stopping at the first failing one
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            script (str): A set of queries gathered in a script
+            num_statements (int): The number of queries of the script
+        Raises:
+            Retry 3 times and exits the program if error executing the script (with decorators)
+    """
+    
+    #We personalized #DATABASE# and run the queries with a connection of the pool
+    script_personalized = script.replace("#DATABASE#",get_snowflake_database(sr_snowflake_account))
+    with snowflake_session(sr_snowflake_account) as snowConnect, snowConnect.cursor() as snowCursor:
+        snowCursor.execute(script_personalized, num_statements=num_statements)
+        #we go through the results of all queries
+        while snowCursor.nextset():
+            pass
+
 @config.exit_program(log_filter=lambda args: {})
 @config.retry_function(log_filter=lambda args: {})
 def snowflake_execute_script(sr_snowflake_account: pd.Series, script: str):
@@ -130,16 +530,10 @@ def snowflake_execute_script(sr_snowflake_account: pd.Series, script: str):
             Retry 3 times and exits the program if error executing the script (with decorators)
     """
     
-    #We connect to Snowflake
-    snowConnect = snowflake_connect(sr_snowflake_account)
-    
-    #We personalized #DATABASE# and run the query
-    if os.getenv("IS_TESTRUN") == '0':
-        database = sr_snowflake_account['DATABASE_PROD']
-    else:
-        database = sr_snowflake_account['DATABASE_TEST']
-    script_personalized = script.replace("#DATABASE#",database)
-    snowConnect.execute_string(script_personalized)
+    #We personalized #DATABASE# and run the queries with a connection of the pool
+    script_personalized = script.replace("#DATABASE#",get_snowflake_database(sr_snowflake_account))
+    with snowflake_session(sr_snowflake_account) as snowConnect:
+        snowConnect.execute_string(script_personalized)
 
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('called_by','message_action','game_action','calculation_needed')})
 def get_list_tables_to_update(called_by: str, df_paths: pd.DataFrame, message_action: str | None = None, game_action: str | None = None, calculation_needed: int | None = None) -> Tuple[list[str], list[str]]:
@@ -210,59 +604,74 @@ def get_list_tables_to_update(called_by: str, df_paths: pd.DataFrame, message_ac
     logging.info(f"SNOWFLAKE -> LISTING TABLES TO UPDATE [END]")
     return [lst_python_tables,lst_dbt_tables]
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('table_metadata',)})
-def delete_table_data(sr_snowflake_account: pd.Series, schema: str, table_metadata: list):
+def get_delete_table_data_queries(schema: str, table_metadata: list) -> str:
 
     """
-        Deletes all data from a snowflake table and its stage
+        Gets the queries deleting all data from a snowflake table and its stage
         Args:
-            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
             schema (str): The name of the schema on which we delete
             table_metadata (list): the list returned by snowflake when "showing" the table
-        Raises:
-            Exits the program if error running the function (using decorator)
+        Returns:
+            the queries truncating the table and removing the files of its stage @%
     """
 
     table_name = table_metadata[1]   # Name is in the 2nd column when showing from snowflake
-        
-    #for each table, we delete data
-    qDeleteData = sqlQ.snowflake_actions_qDeleteData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
-    snowflake_execute(sr_snowflake_account,qDeleteData)
 
-    #for each table stage @%, we delete files
+    qDeleteData = sqlQ.snowflake_actions_qDeleteData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
     qRemoveFromStage = sqlQ.snowflake_actions_qRemoveFromStage.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
-    snowflake_execute(sr_snowflake_account,qRemoveFromStage)
-    logging.info(f"SNOWFLAKE {table_name.upper()} -> DATA DELETED")
+    return qDeleteData + qRemoveFromStage
 
 @config.exit_program(log_filter=lambda args: {})
-def delete_tables_data_from_python(sr_snowflake_account: pd.Series, schema: str):
+def delete_tables_data_from_python(sr_snowflake_account: pd.Series, schema: str) -> dict:
 
     """
-        Deletes all data from a snowflake schema objects (tables and stages)
+        Deletes all data from a snowflake schema objects (tables and stages),
+        sending the deletion of all tables at once as a multi-statement script
         Args:
             sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
             schema (str): The name of the schema on which we delete
+        Returns:
+            the number of rows deleted per table
         Raises:
             Exits the program if error running the function (using decorator)
     """
 
     logging.info(f"SNOWFLAKE {schema} -> DELETING DATA [START]")
     
-    #we list all tables in the schema
+    #we list all tables in the schema, with their number of rows
     qListTables = sqlQ.snowflake_actions_qListTables.replace("#SCHEMA#",schema)
     lst_tables = snowflake_execute(sr_snowflake_account,qListTables)
 
-    # We parallelize the data deletion of those tables and their stages
-    table_args = [(sr_snowflake_account,schema,table_metadata) for table_metadata in lst_tables]
-    config.multithreading_run(delete_table_data, table_args)
+    # We delete data of those tables and their stages with one multi-statement call
+    if len(lst_tables) > 0:
+        script = "".join(get_delete_table_data_queries(schema,table_metadata) for table_metadata in lst_tables)
+        snowflake_execute_multi_statement(sr_snowflake_account, script, 2*len(lst_tables))
+
+    # Rows are in the 8th column when showing from snowflake
+    rows_deleted = {table_metadata[1]: table_metadata[7] for table_metadata in lst_tables}
+    for table_name, rows in rows_deleted.items():
+        logging.info(f"SNOWFLAKE {table_name.upper()} -> {rows} ROWS DELETED")
 
     logging.info(f"SNOWFLAKE {schema} -> DELETING DATA [DONE]")
+    return rows_deleted
+
+def get_table_file_path(table_name: str) -> str:
+
+    """
+        Gets the local path of the file of a table, in the snapshot format of the config (csv or parquet)
+        Args:
+            table_name (str): The name of the table
+        Returns:
+            the path of the table file in TMP_DATABASE folder
+    """
+
+    return os.path.join(config.TMPD,table_name) + '.' + config.database_snapshot_format
 
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('table_name','is_encapsulated')})
 def create_table_file(sr_snowflake_account: pd.Series, table_name: str, is_encapsulated: Literal[0, 1]):
 
     """
-        Select data from a snowflake table and create the csv file related
+        Select data from a snowflake table and create the file related, csv or parquet according to config.database_snapshot_format
         Args:
             sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
             table_name (str): The name of the table for which we create the file
@@ -275,18 +684,78 @@ def create_table_file(sr_snowflake_account: pd.Series, table_name: str, is_encap
     schema = table_name.split('_')[0]
 
     qSelectData = sqlQ.snowflake_actions_qSelectData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
-    df = snowflake_execute(sr_snowflake_account,qSelectData)
 
-    #we create the csv file
-    create_csv(os.path.join(config.TMPD,table_name)+'.csv',df,is_encapsulated)    
+    #we create the csv or parquet file, streaming the data from snowflake
+    if config.database_snapshot_format == "parquet":
+        snowflake_execute_to_parquet(sr_snowflake_account,qSelectData,get_table_file_path(table_name))
+    else:
+        snowflake_execute_to_csv(sr_snowflake_account,qSelectData,get_table_file_path(table_name),is_encapsulated)
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('lst_tables',)})
+def unload_tables_files(sr_snowflake_account: pd.Series, lst_tables: list[str], df_paths: pd.DataFrame):
+
+    """
+        Creates the csv or parquet files of several snowflake tables server-side:
+        snowflake writes each table into a file of a stage folder specific to the run, in parallel,
+        then all files are downloaded at once and the stage folder is cleaned
+        Args:
+            sr_snowflake_account (series - one row) : Contains the snowflake account parameter to run a query
+            lst_tables (list): The names of the tables for which we create the files
+            df_paths (dataframe): the paths of files, to know if files are encapsulated
+        Raises:
+            Exits the program if error running the function (using decorator)
+    """
+
+    logging.info(f"SNOWFLAKE -> UNLOADING TABLES FILES [START]")
+    #we use a stage folder specific to the run, as several runs can share the user stage
+    stage_path = f"{config.snowflake_export_stage}/{uuid.uuid4().hex}"
+
+    unload_args = []
+    for table_name in lst_tables:
+        schema = table_name.split('_')[0]
+        is_encapsulated = df_paths.loc[df_paths['NAME'] == table_name, 'IS_ENCAPSULATED'].iloc[0]
+        if config.database_snapshot_format == "parquet":
+            qUnloadToStage = sqlQ.snowflake_actions_qUnloadToStageParquet
+        else:
+            qUnloadToStage = sqlQ.snowflake_actions_qUnloadToStage
+        qUnloadToStage = qUnloadToStage.replace("#STAGE_PATH#",stage_path).replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
+        if (is_encapsulated == 1):
+            qUnloadToStage = qUnloadToStage.replace("#ISENCLOSED#", "FIELD_OPTIONALLY_ENCLOSED_BY=\'\"\'")
+        else:
+            qUnloadToStage = qUnloadToStage.replace("#ISENCLOSED#", "FIELD_OPTIONALLY_ENCLOSED_BY=NONE")
+        unload_args.append((sr_snowflake_account, qUnloadToStage))
+
+    # We parallelize the unloading of those tables, then download all files at once
+    config.multithreading_run(snowflake_execute, unload_args)
+    folder_path_abs = Path(config.TMPD).resolve()
+    qGetFromStage = sqlQ.snowflake_actions_qGetFromStage.replace("#STAGE_PATH#",stage_path).replace("#FOLDER_PATH_ABS#",str(folder_path_abs)).replace("#PARALLEL#",str(config.snowflake_get_parallel))
+    snowflake_execute(sr_snowflake_account,qGetFromStage)
+    snowflake_execute(sr_snowflake_account,sqlQ.snowflake_actions_qRemoveFromStagePath.replace("#STAGE_PATH#",stage_path))
+
+    #snowflake doesn't unload empty tables: we create their file with the header only
+    for table_name in lst_tables:
+        local_file_path = get_table_file_path(table_name)
+        if not os.path.exists(local_file_path):
+            schema = table_name.split('_')[0]
+            qSelectNoData = sqlQ.snowflake_actions_qSelectData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name).replace(";"," LIMIT 0;")
+            is_encapsulated = df_paths.loc[df_paths['NAME'] == table_name, 'IS_ENCAPSULATED'].iloc[0]
+            df_no_data = snowflake_execute(sr_snowflake_account,qSelectNoData)
+            if config.database_snapshot_format == "parquet":
+                create_parquet_from_batches(local_file_path,[],list(df_no_data.columns))
+            else:
+                create_csv(local_file_path,df_no_data,is_encapsulated)
+
+    logging.info(f"SNOWFLAKE -> UNLOADING TABLES FILES [DONE]")
 
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('called_by','local_folder')})
-def update_snowflake_from_python(called_by: str, sr_snowflake_account: pd.Series, table_name: str, df_paths: pd.DataFrame, local_folder: str):
+def update_snowflake_from_python(called_by: str, sr_snowflake_account: pd.Series, table_name: str, df_paths: pd.DataFrame, local_folder: str, df_table: pd.DataFrame | None = None):
 
     """
         The purpose of this function is to:
         -  update a snowflake table and its stage from a python script using an input file
             * when called by main or init_compet, the input file created by python have the name of the table, minus "landing_"
+              if the dataframe of this file is still in memory and has the table columns, it is loaded directly (config.landing_upload_mode = "write_pandas")
+              and the input file is only kept for the DropBox archive
             * when called by init_snowflake, the input file has the same name, as we downloaded the table file directly from dropbox
         -  create a csv file of the updated table (only when called by main or init_compet, we already have it when called by init_snowflake)
         Args:
@@ -295,6 +764,7 @@ def update_snowflake_from_python(called_by: str, sr_snowflake_account: pd.Series
             table_name (str): The name of the table we update
             df_paths (dataframe): the paths of files, to know if files are encapsulated
             local_folder (str): The local folder containing the file used to fill the table
+            df_table (dataframe): The dataframe of the input file if it is in memory, None else
         Raises:
             Exits the program if error running the function (using decorator)
     """
@@ -309,29 +779,112 @@ def update_snowflake_from_python(called_by: str, sr_snowflake_account: pd.Series
     elif called_by == config.CALLER["SNOWFLAKE"]:
         file_name = table_name
 
-    #we get info about the file
+    #we get info about the file - the table file downloaded from dropbox can be a parquet snapshot
     file_path = os.path.join(local_folder,file_name+'.csv')
+    if called_by == config.CALLER["SNOWFLAKE"] and os.path.exists(os.path.join(local_folder,file_name+'.parquet')):
+        file_path = os.path.join(local_folder,file_name+'.parquet')
     file_path_abs = Path(file_path).resolve()
     is_encapsulated = df_paths.loc[df_paths['NAME'] == table_name, 'IS_ENCAPSULATED'].iloc[0]
 
     #we update stage and table
-    qInsertData = sqlQ.snowflake_actions_qInsertData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
+    if Path(file_path).suffix == '.parquet':
+        qInsertData = sqlQ.snowflake_actions_qInsertDataParquet.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
+    else:
+        qInsertData = sqlQ.snowflake_actions_qInsertData.replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
     if (is_encapsulated == 1):
          qInsertData = qInsertData.replace("#ISENCLOSED#", 
                                            "FIELD_OPTIONALLY_ENCLOSED_BY=\'\"\' NULL_IF = (\'\', \'NULL\')")
     else:
          qInsertData = qInsertData.replace("#ISENCLOSED#", "")
 
-    qPutToStage = sqlQ.snowflake_actions_qPutToStage.replace("#FILE_PATH_ABS#",str(file_path_abs)).replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
-    snowflake_execute(sr_snowflake_account,qPutToStage)
-    snowflake_execute(sr_snowflake_account,qInsertData)
+    #the dataframe is loaded directly, without reading its file back, if its columns are the table ones
+    #if not, we load its csv file, matching columns by position
+    if df_table is not None and config.landing_upload_mode == "write_pandas" \
+        and is_dataframe_matching_table(sr_snowflake_account, df_table, schema, table_name):
+        snowflake_write_pandas(sr_snowflake_account, df_table, schema, table_name, is_encapsulated)
+    else:
+        qPutToStage = sqlQ.snowflake_actions_qPutToStage.replace("#FILE_PATH_ABS#",str(file_path_abs)).replace("#SCHEMA#",schema).replace("#TABLE_NAME#",table_name)
+        snowflake_execute(sr_snowflake_account,qPutToStage)
+        snowflake_execute(sr_snowflake_account,qInsertData)
     #if called by main or init_compet, we need to create the file from the table
     if called_by in [config.CALLER["MAIN"],config.CALLER["COMPET"]]:
         create_table_file(sr_snowflake_account, table_name, is_encapsulated)
     logging.info(f"SNOWFLAKE {table_name} -> UPDATING FROM PYTHON [DONE]")
 
-@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('called_by','lst_dbt_tables')})
-def update_snowflake_from_dbt(called_by: str, sr_snowflake_account: pd.Series, df_paths: pd.DataFrame,  lst_dbt_tables: list[str] | None = None):
+def run_dbt(dbt_args: list[str]) -> pd.DataFrame:
+
+    """
+        Runs a dbt command in-process, on the dbt project of config.
+        The partial parsing file of the last run is restored from the cache before,
+        so that dbt only re-parses the files changed since, and the new one is cached after
+        Args:
+            dbt_args (list): The arguments of the dbt command, without "dbt"
+        Returns:
+            the execution of each dbt node (NODE, STATUS, EXECUTION_TIME in seconds, MESSAGE), the longest first
+        Raises:
+            RuntimeError if the dbt command fails, with the message of the failing nodes
+    """
+
+    #dbt is imported only when a dbt command is run, its import being long
+    from dbt.cli.main import dbtRunner
+
+    partial_parse_path = os.path.join(config.dbt_directory, "target", "partial_parse.msgpack")
+    partial_parse_cache_path = os.path.join(config.dbt_parse_cache_folder, "partial_parse.msgpack")
+    if not os.path.exists(partial_parse_path) and os.path.exists(partial_parse_cache_path):
+        os.makedirs(os.path.dirname(partial_parse_path), exist_ok=True)
+        shutil.copy2(partial_parse_cache_path, partial_parse_path)
+
+    result = dbtRunner().invoke(dbt_args + ["--project-dir", config.dbt_directory, "--profiles-dir", config.dbt_directory])
+    #the parsing is cached even if the run fails, for the next run to reuse it
+    if os.path.exists(partial_parse_path):
+        os.makedirs(config.dbt_parse_cache_folder, exist_ok=True)
+        shutil.copy2(partial_parse_path, partial_parse_cache_path)
+    if result.exception is not None:
+        raise RuntimeError(f"DBT command failed:\n{result.exception}")
+
+    node_results = result.result.results if result.result is not None else []
+    df_dbt_timing = pd.DataFrame([(node_result.node.unique_id, str(node_result.status), node_result.execution_time, node_result.message)
+                                  for node_result in node_results],
+                                 columns=["NODE", "STATUS", "EXECUTION_TIME", "MESSAGE"])
+    df_dbt_timing = df_dbt_timing.sort_values("EXECUTION_TIME", ascending=False).reset_index(drop=True)
+    if not result.success:
+        df_failures = df_dbt_timing[df_dbt_timing["STATUS"].isin(["error", "fail"])]
+        failures = "\n".join(f"{node_failure.NODE}: {node_failure.MESSAGE}" for node_failure in df_failures.itertuples())
+        raise RuntimeError(f"DBT command failed:\n{failures}")
+
+    return df_dbt_timing
+
+def get_dbt_selection(lst_python_tables: list[str], lst_dbt_tables: list[str], is_state_available: bool = False) -> str:
+
+    """
+        Gets the dbt selection of the tables to update:
+        - the landing sources loaded by python in this run, to test them
+        - among the tables to update, those descending from these sources
+          (or modified since the manifest of the last successful run, if available)
+        Args:
+            lst_python_tables (list): The landing tables loaded by python in this run, each one being a source defined in a file of the same name
+            lst_dbt_tables (list): The tables to update, from the DBT_CATEGORY of the paths file
+            is_state_available (bool): If the manifest of the last successful run is available to compare the project with
+        Returns:
+            the selection, as the union of selectors separated by spaces
+    """
+
+    #without source loaded, we can't know which tables changed: all tables to update are selected
+    if len(lst_python_tables) == 0 and not is_state_available:
+        return " ".join(sorted(lst_dbt_tables))
+
+    sources_folder = os.path.relpath(config.dbt_sources_folder, config.dbt_directory).replace(os.sep, '/')
+    lst_sources = [f"path:{sources_folder}/{table_name}.yml" for table_name in sorted(lst_python_tables)]
+    lst_upstreams = [f"{source}+" for source in lst_sources]
+    if is_state_available:
+        lst_upstreams.append("state:modified+")
+
+    #dbt intersects selectors separated by a comma
+    lst_selectors = lst_sources + [f"{upstream},{table_name}" for upstream in lst_upstreams for table_name in sorted(lst_dbt_tables)]
+    return " ".join(lst_selectors)
+
+@config.exit_program(log_filter=lambda args: {k: args[k] for k in ('called_by','lst_dbt_tables','lst_python_tables')})
+def update_snowflake_from_dbt(called_by: str, sr_snowflake_account: pd.Series, df_paths: pd.DataFrame,  lst_dbt_tables: list[str] | None = None, lst_python_tables: list[str] | None = None) -> pd.DataFrame:
     
     '''
         The purpose of this function is to:
@@ -341,6 +894,10 @@ def update_snowflake_from_dbt(called_by: str, sr_snowflake_account: pd.Series, d
             called_by (str): The "exe" function calling this one
             sr_snowflake_account (series - one row) : Contains the snowflake account parameter to download tables into csv
             df_paths (dataframe): containing details about tables to download them
+            lst_dbt_tables (list): The tables to update
+            lst_python_tables (list): The landing tables loaded by python in this run: only their descendants are rebuilt
+        Returns:
+            the execution of each dbt node (NODE, STATUS, EXECUTION_TIME in seconds, MESSAGE), the longest first
         Raises:
             If there is an error running dbt we directly exit the program with decorator
     '''
@@ -349,40 +906,43 @@ def update_snowflake_from_dbt(called_by: str, sr_snowflake_account: pd.Series, d
 
     if called_by == config.CALLER["SNOWFLAKE"]:
         # we just run seeds and views
-        dbt_command = "dbt build --select config.materialized:seed + config.materialized:view --exclude test_type:unit --fail-fast"
+        dbt_args = ["build", "--select", "config.materialized:seed", "+", "config.materialized:view", "--exclude", "test_type:unit", "--fail-fast"]
         bl_select_table = False
     else:
-        # we run all tables from the list
-        dbt_command = "dbt build --select source:* +"  + " ".join(lst_dbt_tables) + " --exclude test_type:unit --fail-fast"
+        # we run the tables from the list depending on the sources loaded in this run - or modified since the last successful run
+        state_manifest_path = os.path.join(config.dbt_state_folder, "manifest.json")
+        is_state_available = config.dbt_state_modified and os.path.exists(state_manifest_path)
+        dbt_selection = get_dbt_selection(lst_python_tables or [], lst_dbt_tables, is_state_available)
+        dbt_args = ["build", "--select", *dbt_selection.split(" "), "--exclude", "test_type:unit", "--fail-fast"]
+        if is_state_available:
+            dbt_args.extend(["--state", config.dbt_state_folder])
         bl_select_table = True
     
-    # Set environment variable for DBT profiles dir
-    os.environ["DBT_PROFILES_DIR"] = config.dbt_directory
-
-    # Common parameters for subprocess.run
-    run_params = {
-        "cwd": config.dbt_directory,
-        "shell": True,
-        "text": True,
-        "capture_output": True,
-        "env": os.environ.copy(),
-    }
-    logging.info(f"SNOWFLAKE -> RUNNING: {dbt_command}")
+    logging.info(f"SNOWFLAKE -> RUNNING: dbt {' '.join(dbt_args)}")
 
     # we run dbt command
-    result = subprocess.run(dbt_command, **run_params)
-    if result.returncode != 0:
-        raise RuntimeError(f"DBT command failed:\n{result.stdout.strip()}\n{result.stderr.strip()}")
-    logging.info(f"DBT command passed:\n{result.stdout.strip()}")
+    df_dbt_timing = run_dbt(dbt_args)
+    logging.info(f"DBT command passed in {df_dbt_timing['EXECUTION_TIME'].sum():.1f}s of nodes execution")
+    for node_timing in df_dbt_timing.itertuples():
+        logging.info(f"DBT {node_timing.NODE} -> {node_timing.STATUS.upper()} IN {node_timing.EXECUTION_TIME:.2f}s")
+
+    # we keep the manifest of this successful run to compare the next run with
+    if config.dbt_state_modified:
+        os.makedirs(config.dbt_state_folder, exist_ok=True)
+        shutil.copy2(os.path.join(config.dbt_directory, "target", "manifest.json"), os.path.join(config.dbt_state_folder, "manifest.json"))
 
     if bl_select_table:
         # except for call_by init_snowflake, we create csv files locally related to table
         # for init_snowlake we already have the files as we inserted data from them
-        for table_name in lst_dbt_tables:
-            is_encapsulated = df_paths.loc[df_paths['NAME'] == table_name, 'IS_ENCAPSULATED'].iloc[0]
-            create_table_file(sr_snowflake_account, table_name, is_encapsulated)
+        if config.dbt_tables_export_mode == "unload":
+            unload_tables_files(sr_snowflake_account, lst_dbt_tables, df_paths)
+        else:
+            for table_name in lst_dbt_tables:
+                is_encapsulated = df_paths.loc[df_paths['NAME'] == table_name, 'IS_ENCAPSULATED'].iloc[0]
+                create_table_file(sr_snowflake_account, table_name, is_encapsulated)
 
     logging.info("SNOWFLAKE -> UPDATING TABLES FROM DBT [DONE]")
+    return df_dbt_timing
 
 @config.exit_program(log_filter=lambda args: {k: args[k] for k in ('called_by','local_folder')})
 def update_snowflake(called_by: str, context_dict: dict, local_folder: str):
@@ -418,15 +978,17 @@ def update_snowflake(called_by: str, context_dict: dict, local_folder: str):
         
         if len(lst_python_tables) != 0:
             
+            # the dataframes of input files still in memory are given to be loaded directly
             table_args = [(called_by, 
                         sr_snowflake_account,
                         table_name,
                         df_paths,
-                        local_folder) for table_name in lst_python_tables]
+                        local_folder,
+                        context_dict.get('df_' + '_'.join(table_name.split('_')[1:]))) for table_name in lst_python_tables]
             config.multithreading_run(update_snowflake_from_python, table_args)
         
         if len(lst_dbt_tables) != 0:
-            update_snowflake_from_dbt(called_by, sr_snowflake_account, df_paths, lst_dbt_tables) 
+            update_snowflake_from_dbt(called_by, sr_snowflake_account, df_paths, lst_dbt_tables, lst_python_tables) 
         
     # in this case we do it from python with the list of downloaded table files
     elif called_by == config.CALLER["SNOWFLAKE"]:
@@ -434,7 +996,7 @@ def update_snowflake(called_by: str, context_dict: dict, local_folder: str):
                 sr_snowflake_account,
                 Path(file).stem,
                 df_paths,
-                local_folder) for file in os.listdir(local_folder)]
+                local_folder) for file in sorted({Path(file).stem for file in os.listdir(local_folder)})]
         config.multithreading_run(update_snowflake_from_python, file_args)
 
         # no direct tables to update from dbt as we just copied all data from the files into the related tables
@@ -48,6 +48,34 @@ game_actions_qGames_to_extract = f"""
             AND GAMEDAY = %s;
     """
 
+#Query to get dates and number of games already extracted of gameday to limit game extraction - used in game_actions module
+game_actions_qGameDayDates = f"""
+        WITH game AS (
+            SELECT
+                SEASON_ID,
+                GAMEDAY,
+                COUNT(*) AS NB_GAME
+            FROM
+                #DATABASE#.CONSUMPTED.VW_GAME
+            GROUP BY
+                SEASON_ID,
+                GAMEDAY
+        )
+        SELECT
+            gameday.BEGIN_DATE_LOCAL,
+            gameday.END_DATE_UTC,
+            COALESCE(game.NB_GAME, 0) AS NB_GAME
+        FROM
+            #DATABASE#.CONSUMPTED.VW_GAMEDAY gameday
+        LEFT JOIN
+            game
+            ON game.SEASON_ID = gameday.SEASON_ID
+            AND game.GAMEDAY = gameday.GAMEDAY
+        WHERE
+            gameday.SEASON_ID = %s
+            AND gameday.GAMEDAY = %s;
+    """
+
 #Query to get topics where to extract message for the database - used in message_actions module
 message_actions_qTopics_to_extract = f"""
         SELECT
@@ -87,6 +115,15 @@ snowflake_actions_qListTables = f"""
         SHOW TABLES IN #DATABASE#.#SCHEMA#;
     """
 
+#Query to list the columns of a snowflake table - used in snowflake_actions module
+snowflake_actions_qTableColumns = f"""
+        SELECT COLUMN_NAME
+        FROM #DATABASE#.INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = UPPER(%s)
+            AND TABLE_NAME = UPPER(%s)
+        ORDER BY ORDINAL_POSITION;
+    """
+
 #Query to select data from a snowflake table - used in snowflake_actions module
 snowflake_actions_qSelectData = f"""
         SELECT * FROM #DATABASE#.#SCHEMA#.#TABLE_NAME#;
@@ -102,4 +139,37 @@ snowflake_actions_qInsertData = f"""
         COPY INTO #DATABASE#.#SCHEMA#.#TABLE_NAME#
         FROM @#DATABASE#.#SCHEMA#.%#TABLE_NAME#
         FILE_FORMAT = (TYPE = 'CSV' SKIP_HEADER=1 #ISENCLOSED#);
-    """
\ No newline at end of file
+    """
+#Query to copy data from a parquet file of a snowflake stage to a table, matching columns by name - used in snowflake_actions module
+snowflake_actions_qInsertDataParquet = f"""
+        COPY INTO #DATABASE#.#SCHEMA#.#TABLE_NAME#
+        FROM @#DATABASE#.#SCHEMA#.%#TABLE_NAME#
+        FILE_FORMAT = (TYPE = 'PARQUET' USE_LOGICAL_TYPE = TRUE)
+        MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE;
+    """
+#Query to unload data from a snowflake table to a csv file in a stage - used in snowflake_actions module
+snowflake_actions_qUnloadToStage = f"""
+        COPY INTO #STAGE_PATH#/#TABLE_NAME#.csv
+        FROM (SELECT * FROM #DATABASE#.#SCHEMA#.#TABLE_NAME#)
+        FILE_FORMAT = (TYPE = 'CSV' COMPRESSION = NONE NULL_IF = ('') EMPTY_FIELD_AS_NULL = FALSE
+                       ESCAPE_UNENCLOSED_FIELD = NONE DATE_FORMAT = 'YYYY-MM-DD' TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS' #ISENCLOSED#)
+        HEADER = TRUE SINGLE = TRUE OVERWRITE = TRUE MAX_FILE_SIZE = 5368709120;
+    """
+
+#Query to unload data from a snowflake table to a parquet file in a stage - used in snowflake_actions module
+snowflake_actions_qUnloadToStageParquet = f"""
+        COPY INTO #STAGE_PATH#/#TABLE_NAME#.parquet
+        FROM (SELECT * FROM #DATABASE#.#SCHEMA#.#TABLE_NAME#)
+        FILE_FORMAT = (TYPE = 'PARQUET' COMPRESSION = SNAPPY)
+        HEADER = TRUE SINGLE = TRUE OVERWRITE = TRUE MAX_FILE_SIZE = 5368709120;
+    """
+
+#Query to download files from a snowflake stage to a local folder - used in snowflake_actions module
+snowflake_actions_qGetFromStage = f"""
+        GET #STAGE_PATH#/ file://#FOLDER_PATH_ABS#/ PARALLEL = #PARALLEL#;
+    """
+
+#Query to delete files from a snowflake stage path - used in snowflake_actions module
+snowflake_actions_qRemoveFromStagePath = f"""
+        REMOVE #STAGE_PATH#/;
+    """
@@ -7,6 +7,9 @@ import unittest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import tempfile
+import json
+import hashlib
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -75,7 +78,7 @@ def test_download_folder():
     # this test the function download_folder
     df = pd.DataFrame([{"NAME": "input_folder", "PATH": "remote/input_folder"}])
     with patch("subprocess.run") as mock_run, \
-         patch("config.multithreading_run") as mock_thread:
+         patch("dropbox_actions.fileA.get_files_locally_from_dropbox") as mock_get_files:
 
         #folder1 having file1 and file2 inside listed
         mock_run.side_effect = [
@@ -83,7 +86,111 @@ def test_download_folder():
         ]
 
         dropbox_actions.download_folder(folder_name, df_paths, local_folder)
-        mock_thread.assert_called_once()
+        mock_get_files.assert_called_once_with(["file1", "file2"], local_folder, df_paths, {"file1": ".csv", "file2": ".txt"})
+
+def mock_rclone_lsjson(command, remote_hashes):
+    
+    # we simulate rclone listing the metadata of the files listed which exist remotely
+    files_from_path = command[command.index('--files-from') + 1]
+    with open(files_from_path, encoding='utf-8') as files_from:
+        remote_files = [path for path in files_from.read().split() if path in remote_hashes]
+    items = [{"Path": path, "Size": 5, "ModTime": "2025-01-01T00:00:00Z", "Hashes": {"dropbox": remote_hashes[path]}} for path in remote_files]
+    return MagicMock(returncode=0, stdout=json.dumps(items))
+
+def test_download_files():
+    
+    # this test the function download_files: all files are downloaded with one rclone call then moved to the local folder
+    # then downloaded again from the local cache while they are unchanged on DropBox
+    lst_dropbox_files = [("current/inputs/a.txt", 0), ("current/outputs/b.txt", 0)]
+    remote_hashes = {"current/inputs/a.txt": "hash_a", "current/outputs/b.txt": "hash_b"}
+    downloaded_files = []
+
+    def mock_rclone(command, **kwargs):
+        if command[1] == 'lsjson':
+            return mock_rclone_lsjson(command, remote_hashes)
+        # we simulate rclone copying the files listed, keeping their tree
+        staging_download_folder = command[3]
+        files_from_path = command[command.index('--files-from') + 1]
+        with open(files_from_path, encoding='utf-8') as files_from:
+            for dropbox_file_path in files_from.read().split():
+                downloaded_files.append(dropbox_file_path)
+                os.makedirs(os.path.join(staging_download_folder, os.path.dirname(dropbox_file_path)), exist_ok=True)
+                with open(os.path.join(staging_download_folder, dropbox_file_path), 'w', encoding='utf-8') as f:
+                    f.write(os.path.basename(dropbox_file_path))
+        return MagicMock(returncode=0)
+
+    with tempfile.TemporaryDirectory() as local_folder, \
+         tempfile.TemporaryDirectory() as cache_folder, \
+         patch("dropbox_actions.config.dropbox_cache_folder", cache_folder), \
+         patch("dropbox_actions.config.dropbox_cache_manifest", os.path.join(cache_folder, "manifest.json")), \
+         patch("dropbox_actions.subprocess.run", side_effect=mock_rclone) as mock_run:
+
+        result = dropbox_actions.download_files(lst_dropbox_files, local_folder)
+        copy_commands = [c.args[0] for c in mock_run.call_args_list if c.args[0][1] == 'copy']
+        assert len(copy_commands) == 1
+        assert "--transfers" in copy_commands[0]
+        assert result == {"str_a": "a.txt", "str_b": "b.txt"}
+
+        # files already downloaded are not downloaded again
+        mock_run.reset_mock()
+        dropbox_actions.download_files(lst_dropbox_files, local_folder)
+        mock_run.assert_not_called()
+
+        # files unchanged on DropBox are copied from the cache, changed ones are downloaded
+        for file_name in ["a.txt", "b.txt"]:
+            os.remove(os.path.join(local_folder, file_name))
+        remote_hashes["current/outputs/b.txt"] = "hash_b_changed"
+        downloaded_files.clear()
+        result = dropbox_actions.download_files(lst_dropbox_files, local_folder)
+        assert downloaded_files == ["current/outputs/b.txt"]
+        assert result == {"str_a": "a.txt", "str_b": "b.txt"}
+
+def test_upload_files():
+   
+    # this test the function upload_files: changed files are staged with the tree of their dropbox folder then uploaded with one rclone call,
+    # files with the same content as on DropBox are skipped
+    staged_files = []
+
+    with tempfile.TemporaryDirectory() as local_folder, \
+         tempfile.TemporaryDirectory() as cache_folder:
+
+        for file_name in ["game.csv", "capture.jpg", "user.csv"]:
+            with open(os.path.join(local_folder, file_name), 'w', encoding='utf-8') as f:
+                f.write("content " + file_name)
+        remote_hashes = {"current/outputs/python/user.csv": dropbox_actions.get_dropbox_content_hash(os.path.join(local_folder, "user.csv")),
+                         "current/outputs/python/game.csv": "old_hash"}
+
+        def mock_rclone(command, **kwargs):
+            if command[1] == 'lsjson':
+                return mock_rclone_lsjson(command, remote_hashes)
+            staging_upload_folder = command[2]
+            for root, _, files in os.walk(staging_upload_folder):
+                staged_files.extend(os.path.relpath(os.path.join(root, file), staging_upload_folder).replace(os.sep, '/') for file in files)
+            return MagicMock(returncode=0)
+
+        lst_files = [(os.path.join(local_folder, "game.csv"), "current/outputs/python/game.csv"),
+                     (os.path.join(local_folder, "capture.jpg"), "current/outputs/captures/"),
+                     (os.path.join(local_folder, "user.csv"), "current/outputs/python/user.csv")]
+
+        with patch("dropbox_actions.config.dropbox_cache_folder", cache_folder), \
+             patch("dropbox_actions.config.dropbox_cache_manifest", os.path.join(cache_folder, "manifest.json")), \
+             patch("dropbox_actions.subprocess.run", side_effect=mock_rclone) as mock_run:
+
+            dropbox_actions.upload_files(lst_files)
+            assert [c.args[0][1] for c in mock_run.call_args_list] == ['lsjson', 'copy']
+            assert sorted(staged_files) == ["current/outputs/captures/capture.jpg", "current/outputs/python/game.csv"]
+            # all files are cached for next runs
+            assert len(dropbox_actions.read_dropbox_cache_manifest()) == 3
+
+def test_get_dropbox_content_hash():
+
+    # this test the function get_dropbox_content_hash: it must match the DropBox hash of a small file
+    with tempfile.TemporaryDirectory() as local_folder:
+        local_file_path = os.path.join(local_folder, "file.txt")
+        with open(local_file_path, 'wb') as f:
+            f.write(b"abc")
+        expected_hash = hashlib.sha256(hashlib.sha256(b"abc").digest()).hexdigest()
+        assert dropbox_actions.get_dropbox_content_hash(local_file_path) == expected_hash
 
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
@@ -92,5 +199,8 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_download_file))
     test_suite.addTest(unittest.FunctionTestCase(test_upload_file))
     test_suite.addTest(unittest.FunctionTestCase(test_download_folder))
+    test_suite.addTest(unittest.FunctionTestCase(test_download_files))
+    test_suite.addTest(unittest.FunctionTestCase(test_upload_files))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_dropbox_content_hash))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
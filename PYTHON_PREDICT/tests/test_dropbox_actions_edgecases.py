@@ -7,6 +7,7 @@ from unittest.mock import patch, MagicMock
 import subprocess
 import pandas as pd
 import os
+import tempfile
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -97,11 +98,27 @@ def test_download_folder_empty_listing():
     local_folder = "local_folder"
 
     with patch("subprocess.run", return_value=subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")), \
-         patch("config.multithreading_run") as mock_thread:
+         patch("dropbox_actions.fileA.get_files_locally_from_dropbox") as mock_get_files:
 
         dropbox_actions.download_folder(folder_name, df_paths, local_folder)
-        mock_thread.assert_called_with(dropbox_actions.fileA.get_locally_from_dropbox, [])
+        mock_get_files.assert_called_with([], local_folder, df_paths, {})
     
+def test_download_folder_csv_and_parquet_snapshots():
+    
+    # this test the function download_folder with a table listed both as csv and parquet. Must download the snapshot format of the config only
+    folder_name = "database_folder"
+    df_paths = pd.read_csv("materials/paths.csv")
+    local_folder = "local_folder"
+
+    for snapshot_format in ("csv", "parquet"):
+        with patch("subprocess.run", return_value=subprocess.CompletedProcess(args=[], returncode=0, stdout="landing_season.csv\nlanding_season.parquet\ncurated_season.csv", stderr="")), \
+             patch("dropbox_actions.config.database_snapshot_format", snapshot_format), \
+             patch("dropbox_actions.fileA.get_files_locally_from_dropbox") as mock_get_files:
+
+            dropbox_actions.download_folder(folder_name, df_paths, local_folder)
+            mock_get_files.assert_called_once_with(["landing_season", "curated_season"], local_folder, df_paths,
+                                                   {"landing_season": "." + snapshot_format, "curated_season": ".csv"})
+
 def test_download_folder_listing_error():
     
     # this test the function download_folder with a rclone command failing for listing files. Ñust exit the program
@@ -114,6 +131,76 @@ def test_download_folder_listing_error():
 
         assertExit(lambda: dropbox_actions.download_folder(folder_name, df_paths, local_folder))
         
+def test_download_files_missing_file():
+    
+    # this test the function download_files with rclone succeeding but a file not found on DropBox. Must exit the program
+    lst_dropbox_files = [("current/inputs/missing.txt", 0)]
+
+    with tempfile.TemporaryDirectory() as local_folder, \
+         patch('dropbox_actions.subprocess.run', return_value=subprocess.CompletedProcess(args=[], returncode=0, stderr="", stdout="")):
+
+        assertExit(lambda: dropbox_actions.download_files(lst_dropbox_files, local_folder))
+
+def test_download_files_missing_optional_file():
+    
+    # this test the function download_files with an optional file not found on DropBox. Must be left out of the data dictionary
+    lst_dropbox_files = [("current/inputs/a.txt", 0), ("current/inputs/calculated/optional.csv", 0)]
+
+    def mock_rclone(command, **kwargs):
+        if command[1] == 'lsjson':
+            return subprocess.CompletedProcess(args=[], returncode=0, stderr="", stdout="[]")
+        staging_download_folder = command[3]
+        os.makedirs(os.path.join(staging_download_folder, "current/inputs"), exist_ok=True)
+        with open(os.path.join(staging_download_folder, "current/inputs/a.txt"), 'w', encoding='utf-8') as f:
+            f.write("a")
+        return subprocess.CompletedProcess(args=[], returncode=0, stderr="", stdout="")
+
+    with tempfile.TemporaryDirectory() as local_folder, \
+         tempfile.TemporaryDirectory() as cache_folder, \
+         patch("dropbox_actions.config.dropbox_cache_folder", cache_folder), \
+         patch("dropbox_actions.config.dropbox_cache_manifest", os.path.join(cache_folder, "manifest.json")), \
+         patch('dropbox_actions.subprocess.run', side_effect=mock_rclone):
+
+        result = dropbox_actions.download_files(lst_dropbox_files, local_folder, ["current/inputs/calculated/optional.csv"])
+        assert result == {"str_a": "a"}
+
+def test_upload_files_fail():
+   
+    # this test the function upload_files with a rclone command failing. Must exit the program
+    with tempfile.TemporaryDirectory() as local_folder, \
+         patch('dropbox_actions.subprocess.run', return_value=subprocess.CompletedProcess(args=[], returncode=1, stderr="upload fail", stdout="")):
+
+        local_file_path = os.path.join(local_folder, "game.csv")
+        with open(local_file_path, 'w', encoding='utf-8') as f:
+            f.write("content")
+        assertExit(lambda: dropbox_actions.upload_files([(local_file_path, "current/outputs/python/game.csv")]))
+        
+def test_download_files_metadata_listing_error():
+    
+    # this test the function download_files with rclone failing to list the remote metadata. Files must be downloaded anyway, without cache
+    lst_dropbox_files = [("current/inputs/a.txt", 0)]
+    with open("materials/paths.csv", encoding='utf-8') as f:
+        content = f.read()
+
+    def mock_rclone(command, **kwargs):
+        if command[1] == 'lsjson':
+            return subprocess.CompletedProcess(args=[], returncode=1, stderr="lsjson error", stdout="")
+        staging_download_folder = command[3]
+        os.makedirs(os.path.join(staging_download_folder, "current/inputs"), exist_ok=True)
+        with open(os.path.join(staging_download_folder, "current/inputs/a.txt"), 'w', encoding='utf-8') as f:
+            f.write(content)
+        return subprocess.CompletedProcess(args=[], returncode=0, stderr="", stdout="")
+
+    with tempfile.TemporaryDirectory() as local_folder, \
+         tempfile.TemporaryDirectory() as cache_folder, \
+         patch("dropbox_actions.config.dropbox_cache_folder", cache_folder), \
+         patch("dropbox_actions.config.dropbox_cache_manifest", os.path.join(cache_folder, "manifest.json")), \
+         patch('dropbox_actions.subprocess.run', side_effect=mock_rclone):
+
+        result = dropbox_actions.download_files(lst_dropbox_files, local_folder)
+        assert result == {"str_a": content}
+        assert dropbox_actions.read_dropbox_cache_manifest() == {}
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_copy_folder_empty_source_or_target))
@@ -123,7 +210,12 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_upload_file_folder_path_edge))
     test_suite.addTest(unittest.FunctionTestCase(test_upload_file_fail))
     test_suite.addTest(unittest.FunctionTestCase(test_download_folder_empty_listing))
+    test_suite.addTest(unittest.FunctionTestCase(test_download_folder_csv_and_parquet_snapshots))
     test_suite.addTest(unittest.FunctionTestCase(test_download_folder_listing_error))
+    test_suite.addTest(unittest.FunctionTestCase(test_download_files_missing_file))
+    test_suite.addTest(unittest.FunctionTestCase(test_download_files_missing_optional_file))
+    test_suite.addTest(unittest.FunctionTestCase(test_upload_files_fail))
+    test_suite.addTest(unittest.FunctionTestCase(test_download_files_metadata_listing_error))
     
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
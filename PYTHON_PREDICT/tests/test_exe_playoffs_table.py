@@ -5,12 +5,14 @@ It units test the happy path for each function
 import unittest
 from unittest.mock import patch, mock_open
 import matplotlib.pyplot as plt
+import pandas as pd
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import exe_playoffs_table
+import imgbb_actions
 from testutils import read_txt
 
 def test_get_matchups_strings():
@@ -85,9 +87,12 @@ def test_draw_playoffs_image():
     
     # this test the draw_playoffs_image function
     mock_str_playoffs_table = read_txt("materials/playoffs_table.txt")
+    mock_df_imgbb_cache = pd.DataFrame(columns=["CAPTURE_HASH","IMAGE_URL"])
 
     with patch("exe_playoffs_table.config.create_local_folder"), \
          patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {"df_imgbb_cache": mock_df_imgbb_cache}), \
+         patch("exe_playoffs_table.upload_file"), \
          patch("exe_playoffs_table.create_jpg"), \
          patch("exe_playoffs_table.push_capture_online", return_value="https://fakeimage.url/test.jpg"), \
          patch("builtins.open", new_callable=mock_open, read_data=b"fake image data"), \
@@ -95,6 +100,31 @@ def test_draw_playoffs_image():
 
         exe_playoffs_table.draw_playoffs_image()
 
+def test_draw_playoffs_image_cached():
+    
+    # this test the draw_playoffs_image function when the playoffs table has already been pushed: must not draw nor push it again
+    mock_str_playoffs_table = read_txt("materials/playoffs_table.txt")
+    capture_hash = exe_playoffs_table.get_capture_hash(mock_str_playoffs_table, 'playoffs_table')
+    mock_df_imgbb_cache = pd.DataFrame({"CAPTURE_HASH": [capture_hash], "IMAGE_URL": ["https://fakeimage.url/cached.jpg"]})
+
+    with patch("exe_playoffs_table.config.create_local_folder"), \
+         patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {"df_imgbb_cache": mock_df_imgbb_cache}), \
+         patch("exe_playoffs_table.upload_file") as mock_upload, \
+         patch("exe_playoffs_table.create_jpg") as mock_create_jpg, \
+         patch("exe_playoffs_table.push_capture_online") as mock_push, \
+         patch("builtins.open", new_callable=mock_open) as mock_file, \
+         patch("exe_playoffs_table.config.destroy_local_folder"), \
+         patch.dict(imgbb_actions.imgbb_cache, clear=True):
+
+        exe_playoffs_table.draw_playoffs_image()
+
+    mock_create_jpg.assert_not_called()
+    mock_push.assert_not_called()
+    mock_upload.assert_not_called()
+    written = "".join(call.args[0] for call in mock_file().write.call_args_list)
+    unittest.TestCase().assertIn("https://fakeimage.url/cached.jpg", written)
+
 if __name__ == "__main__":
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_get_matchups_strings))
@@ -105,5 +135,6 @@ if __name__ == "__main__":
     test_suite.addTest(unittest.FunctionTestCase(test_draw_line))
     test_suite.addTest(unittest.FunctionTestCase(test_display_pass))
     test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image))
+    test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_cached))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
@@ -5,12 +5,14 @@ It units test unexpected path for each function
 import unittest
 from unittest.mock import patch,mock_open
 import matplotlib.pyplot as plt
+import pandas as pd
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import exe_playoffs_table
+import imgbb_actions
 from testutils import assertExit
 from testutils import read_txt
 
@@ -96,9 +98,12 @@ def test_draw_playoffs_image_exec_fails():
 
     # this test the draw_playoffs_image function, with an invalid code read in exe. Must exit the program
     mock_str_playoffs_table = "invalid_code"
+    mock_df_imgbb_cache = pd.DataFrame(columns=["CAPTURE_HASH","IMAGE_URL"])
 
     with patch("exe_playoffs_table.config.create_local_folder"), \
          patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {"df_imgbb_cache": mock_df_imgbb_cache}), \
+         patch("exe_playoffs_table.upload_file"), \
          patch("exe_playoffs_table.create_jpg"), \
          patch("exe_playoffs_table.push_capture_online", return_value="https://fakeimage.url/test.jpg"), \
          patch("builtins.open", new_callable=mock_open, read_data=b"fake image data"), \
@@ -106,13 +111,35 @@ def test_draw_playoffs_image_exec_fails():
 
          assertExit(lambda: exe_playoffs_table.draw_playoffs_image())
 
+def test_draw_playoffs_image_imgbb_cache_missing():
+
+    # this test the draw_playoffs_image function, with the imgbb cache file not on DropBox yet. Must draw and push the image
+    mock_str_playoffs_table = read_txt("materials/playoffs_table.txt")
+
+    with patch("exe_playoffs_table.config.create_local_folder"), \
+         patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {}), \
+         patch("exe_playoffs_table.upload_file"), \
+         patch("exe_playoffs_table.create_jpg") as mock_create_jpg, \
+         patch("exe_playoffs_table.push_capture_online", return_value="https://fakeimage.url/test.jpg") as mock_push, \
+         patch("builtins.open", new_callable=mock_open, read_data=b"fake image data"), \
+         patch("exe_playoffs_table.config.destroy_local_folder"), \
+         patch.dict(imgbb_actions.imgbb_cache, clear=True):
+
+        exe_playoffs_table.draw_playoffs_image()
+        mock_create_jpg.assert_called_once()
+        mock_push.assert_called_once()
+
 def test_draw_playoffs_image_create_jpg_fails():
     
     # this test the draw_playoffs_image function, with create_jpg failing. Must exit the program
     mock_str_playoffs_table = read_txt("materials/playoffs_table.txt")
+    mock_df_imgbb_cache = pd.DataFrame(columns=["CAPTURE_HASH","IMAGE_URL"])
 
     with patch("exe_playoffs_table.config.create_local_folder"), \
          patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {"df_imgbb_cache": mock_df_imgbb_cache}), \
+         patch("exe_playoffs_table.upload_file"), \
          patch("exe_playoffs_table.create_jpg", side_effect=Exception("create_jpg failed")):
 
         assertExit(lambda: exe_playoffs_table.draw_playoffs_image())
@@ -121,12 +148,15 @@ def test_draw_playoffs_image_imgbb_bad_json():
     
     # this test the draw_playoffs_image function, with bad json for pushing image online. Must exit the program
     mock_str_playoffs_table = read_txt("materials/playoffs_table.txt")
+    mock_df_imgbb_cache = pd.DataFrame(columns=["CAPTURE_HASH","IMAGE_URL"])
 
     with patch("exe_playoffs_table.config.create_local_folder"), \
          patch("exe_playoffs_table.download_file", return_value = {"str_playoffs_table": mock_str_playoffs_table}), \
+         patch("exe_playoffs_table.download_files", return_value = {"df_imgbb_cache": mock_df_imgbb_cache}), \
+         patch("exe_playoffs_table.upload_file"), \
          patch("exe_playoffs_table.create_jpg"), \
          patch("builtins.open", new_callable=mock_open, read_data=b"fake image data"), \
-         patch("requests.post") as mock_post, \
+         patch("requests.Session.post") as mock_post, \
          patch("exe_playoffs_table.config.destroy_local_folder"):
 
         mock_post.return_value.json = lambda: {"bad": "json"}
@@ -144,6 +174,7 @@ if __name__ == "__main__":
     test_suite.addTest(unittest.FunctionTestCase(test_draw_line_and_display_pass))
     test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_download_fails))
     test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_exec_fails))
+    test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_imgbb_cache_missing))
     test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_create_jpg_fails))
     test_suite.addTest(unittest.FunctionTestCase(test_draw_playoffs_image_imgbb_bad_json))
 
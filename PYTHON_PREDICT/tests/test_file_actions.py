@@ -11,6 +11,8 @@ import sys
 import os
 import tempfile
 import matplotlib.pyplot as plt
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -32,10 +34,23 @@ def test_read_and_check_csv():
     mock_schema = read_json("materials/read_csv_schema.json")
     expected_df = pd.DataFrame({"col1": [1, 2], "col2": ["a", "b"]})
     
-    with patch.object(file_actions, "read_json", return_value=mock_schema):
+    with patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)):
         df_result = file_actions.read_and_check_csv(local_file_path)
         assert_frame_equal(df_result.reset_index(drop=True), expected_df.reset_index(drop=True))
 
+def test_get_csv_schemas():
+    
+    # this test the function get_csv_schemas. Must read the file_check json only once and compile the reader dtypes
+    mock_schema = read_json("materials/read_csv_schema.json")
+    file_actions.get_csv_schemas.cache_clear()
+
+    with patch.object(file_actions, "read_json", return_value=mock_schema) as mock_read_json:
+        file_actions.get_csv_schemas()
+        csv_schemas = file_actions.get_csv_schemas()
+        mock_read_json.assert_called_once_with("file_check.json")
+        assert csv_schemas == {"read_csv.csv": {"columns": ["col1", "col2"], "dtype": {"col1": "int64", "col2": object}}}
+    file_actions.get_csv_schemas.cache_clear()
+
 def test_read_yml():
     
     # this test the function read_yml
@@ -65,6 +80,41 @@ def test_create_csv():
         file_actions.create_csv(local_file_path, df)
         unittest.TestCase().assertTrue(m.called)
 
+def test_create_csv_from_batches():
+    
+    # this test the function create_csv_from_batches: the file must be the same as create_csv with all batches concatenated
+    df = pd.read_csv("materials/read_csv.csv")
+    batches = [df.iloc[:1], df.iloc[1:]]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for is_to_encapsulate in (0, 1):
+            batches_file_path = os.path.join(tmpdir, "batches.csv")
+            full_file_path = os.path.join(tmpdir, "full.csv")
+            file_actions.create_csv_from_batches(batches_file_path, iter(batches), df.columns.tolist(), is_to_encapsulate)
+            file_actions.create_csv(full_file_path, df, is_to_encapsulate)
+            with open(batches_file_path, 'rb') as batches_file, open(full_file_path, 'rb') as full_file:
+                assert batches_file.read() == full_file.read()
+
+        # without batches, only the header is written
+        file_actions.create_csv_from_batches(batches_file_path, iter([]), df.columns.tolist(), 0)
+        assert_frame_equal(pd.read_csv(batches_file_path), df.iloc[:0], check_dtype=False)
+
+def test_create_parquet_from_batches():
+    
+    # this test the function create_parquet_from_batches: the file must contain all batches, with string columns dictionary-encoded
+    batches = [pa.table({"SEASON_ID": pa.array([1], type=pa.int8()), "SEASON_NAME": ["2024-2025"]}),
+               pa.table({"SEASON_ID": pa.array([300], type=pa.int64()), "SEASON_NAME": ["2025-2026"]})]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "batches.parquet")
+        file_actions.create_parquet_from_batches(file_path, iter(batches), ["SEASON_ID", "SEASON_NAME"])
+
+        expected_df = pd.DataFrame({"SEASON_ID": [1, 300], "SEASON_NAME": ["2024-2025", "2025-2026"]})
+        assert_frame_equal(pd.read_parquet(file_path), expected_df, check_dtype=False)
+        column_chunk = pq.ParquetFile(file_path).metadata.row_group(0).column(1)
+        assert "RLE_DICTIONARY" in column_chunk.encodings
+        assert column_chunk.compression == "ZSTD"
+
 def test_create_yml():
     
     # this test the function create_yml
@@ -159,6 +209,23 @@ def test_get_locally_from_dropbox():
         result = file_actions.get_locally_from_dropbox(file_name, local_folder, df_paths)
         unittest.TestCase().assertIn("df_game", result)
 
+def test_get_files_locally_from_dropbox():
+    
+    # this test the function get_files_locally_from_dropbox
+    files_names = ['game', 'message_check', 'topic_cursor']
+    local_folder = 'local_folder'
+    df_paths = pd.read_csv('materials/paths.csv')
+    mock_df_game = pd.read_csv("materials/game.csv")
+    
+    with patch("file_actions.dropboxA.download_files", return_value={"df_game": mock_df_game}) as mock_download_files:
+        result = file_actions.get_files_locally_from_dropbox(files_names, local_folder, df_paths)
+        unittest.TestCase().assertIn("df_game", result)
+        lst_dropbox_files = mock_download_files.call_args.kwargs['lst_dropbox_files']
+        assert [path for path, _ in lst_dropbox_files] == [
+            df_paths[df_paths["NAME"] == file_name].iloc[0]["PATH"] for file_name in files_names]
+        # files calculated by a previous run can be missing
+        assert mock_download_files.call_args.kwargs['lst_optional_files'] == ["current/inputs/calculated/topic_cursor.csv"]
+
 def test_modify_run_file():
     
     # this test the function modify_run_file
@@ -208,7 +275,7 @@ def test_initiate_local_environment():
 
     with patch("file_actions.config.create_local_folder"), \
          patch("file_actions.download_paths_file", return_value=mock_df_paths_dict), \
-         patch("file_actions.config.multithreading_run", return_value=[mock_data_dict]), \
+         patch("file_actions.get_files_locally_from_dropbox", return_value=mock_data_dict), \
          patch("file_actions.modify_run_file", return_value=mock_df_RUN_TYPE), \
          patch("file_actions.dropboxA.upload_file"), \
          patch("file_actions.personalize_yml_dbt_file"):
@@ -233,7 +300,7 @@ def test_terminate_local_environment():
         with patch("file_actions.parametrize_yml_dbt_file"), \
             patch("file_actions.modify_run_file", return_value=mock_df_RUN_TYPE), \
             patch("file_actions.config.UPLOAD_FOLDER_MAP_PER_CALLER", {"main": [tmpdir]}), \
-            patch("file_actions.config.multithreading_run"), \
+            patch("file_actions.dropboxA.upload_files"), \
             patch("file_actions.config.destroy_local_folder"):
 
             file_actions.terminate_local_environment(called_by,context_dict)
@@ -244,16 +311,21 @@ def test_download_needed_files():
     df_paths = pd.read_csv("materials/paths.csv")
     sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
 
-    with patch("file_actions.config.multithreading_run"):
+    with patch("file_actions.dropboxA.download_files", return_value={}) as mock_download_files:
         file_actions.download_needed_files(df_paths, sr_output_need)
+        # all files are downloaded with one call
+        mock_download_files.assert_called_once()
 
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_read_json))
     test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_csv_schemas))
     test_suite.addTest(unittest.FunctionTestCase(test_read_yml))
     test_suite.addTest(unittest.FunctionTestCase(test_read_txt))
     test_suite.addTest(unittest.FunctionTestCase(test_create_csv))
+    test_suite.addTest(unittest.FunctionTestCase(test_create_csv_from_batches))
+    test_suite.addTest(unittest.FunctionTestCase(test_create_parquet_from_batches))
     test_suite.addTest(unittest.FunctionTestCase(test_create_yml))
     test_suite.addTest(unittest.FunctionTestCase(test_create_txt))
     test_suite.addTest(unittest.FunctionTestCase(test_create_jpg))
@@ -261,6 +333,7 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_parametrize_yml_dbt_file))
     test_suite.addTest(unittest.FunctionTestCase(test_filter_data))
     test_suite.addTest(unittest.FunctionTestCase(test_get_locally_from_dropbox))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_files_locally_from_dropbox))
     test_suite.addTest(unittest.FunctionTestCase(test_modify_run_file))
     test_suite.addTest(unittest.FunctionTestCase(test_download_paths_file))
     test_suite.addTest(unittest.FunctionTestCase(test_initiate_local_environment))
@@ -37,7 +37,7 @@ def test_read_and_check_csv_missing_columns():
     local_file_path = "materials/read_csv.csv"
     mock_schema = read_json("materials/edgecases/read_csv_schema_with_fake_column.json")
 
-    with patch.object(file_actions, "read_json", return_value=mock_schema):
+    with patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)):
         assertExit(lambda: file_actions.read_and_check_csv(local_file_path))
 
 def test_read_and_check_csv_type_mismatch():
@@ -46,9 +46,46 @@ def test_read_and_check_csv_type_mismatch():
     local_file_path = pd.read_csv("materials/edgecases/read_csv_type_mismatch.csv")
     mock_schema = read_json("materials/read_csv_schema.json")
 
-    with patch.object(file_actions, "read_json", return_value=mock_schema):
+    with patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)):
         assertExit(lambda: file_actions.read_and_check_csv(local_file_path))
 
+def test_read_and_check_csv_missing_columns_header_only():
+    
+    # this test the function read_and_check_csv with a file having a missing column. Must exit the program without reading the body of the file
+    local_file_path = "materials/read_csv.csv"
+    mock_schema = read_json("materials/edgecases/read_csv_schema_with_fake_column.json")
+
+    with patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)), \
+         patch.object(file_actions.pd, "read_csv") as mock_read_csv:
+        assertExit(lambda: file_actions.read_and_check_csv(local_file_path))
+        mock_read_csv.assert_not_called()
+
+def test_read_and_check_csv_value_not_matching_type():
+    
+    # this test the function read_and_check_csv with a value which can't be read with the expected type. Must exit the program
+    mock_schema = read_json("materials/read_csv_schema.json")
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)):
+        local_file_path = os.path.join(tmpdir, "read_csv.csv")
+        with open(local_file_path, "w", encoding="utf-8") as f:
+            f.write("col1,col2\n1,a\nb,b\n")
+        assertExit(lambda: file_actions.read_and_check_csv(local_file_path))
+
+def test_read_and_check_csv_with_bom():
+    
+    # this test the function read_and_check_csv with a file starting with a UTF-8 BOM (saved as "CSV UTF-8" by Excel). Must read it with its first column found
+    mock_schema = read_json("materials/read_csv_schema.json")
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch.object(file_actions, "get_csv_schemas", return_value=file_actions.compile_csv_schemas(mock_schema)):
+        local_file_path = os.path.join(tmpdir, "read_csv.csv")
+        with open(local_file_path, "w", encoding="utf-8-sig") as f:
+            f.write("col1,col2\n1,a\n2,b\n")
+        df = file_actions.read_and_check_csv(local_file_path)
+        assert df.columns.tolist() == ["col1", "col2"]
+        assert df["col1"].tolist() == [1, 2]
+
 def test_read_yml_file_not_found():
     
     # this test the function read_yml with a file non existant. Must exit the program
@@ -70,6 +107,17 @@ def test_create_csv_write_failure():
     with patch("pandas.DataFrame.to_csv", side_effect=OSError("disk full")):
         assertExit(lambda: file_actions.create_csv(local_file_path, df))
 
+def test_create_parquet_from_batches_no_batches():
+
+    # this test the function create_parquet_from_batches without batches. Must create an empty file with the columns
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "empty.parquet")
+        file_actions.create_parquet_from_batches(file_path, iter([]), ["SEASON_ID", "SEASON_NAME"])
+
+        df = pd.read_parquet(file_path)
+        assert df.columns.tolist() == ["SEASON_ID", "SEASON_NAME"]
+        assert len(df) == 0
+
 def test_create_yml_failure():
     
     # this test the function create_yml forcing a write failure. Must exit the program.
@@ -159,7 +207,7 @@ def test_initiate_local_environment_missing_flag():
 
     with patch("file_actions.config.create_local_folder"), \
          patch("file_actions.download_paths_file", return_value=mock_df_paths_dict), \
-         patch("file_actions.config.multithreading_run", return_value=[mock_data_dict]), \
+         patch("file_actions.get_files_locally_from_dropbox", return_value=mock_data_dict), \
          patch("file_actions.modify_run_file", return_value=mock_df_RUN_TYPE), \
          patch("file_actions.dropboxA.upload_file"), \
          patch("file_actions.personalize_yml_dbt_file"):
@@ -184,22 +232,48 @@ def test_initiate_local_environment_empty_df_paths():
 
     with patch("file_actions.config.create_local_folder"), \
          patch("file_actions.download_paths_file", return_value=mock_df_paths_dict), \
-         patch("file_actions.config.multithreading_run", return_value=[mock_data_dict]), \
+         patch("file_actions.get_files_locally_from_dropbox", return_value=mock_data_dict), \
          patch("file_actions.modify_run_file", return_value=mock_df_RUN_TYPE), \
          patch("file_actions.dropboxA.upload_file"), \
          patch("file_actions.personalize_yml_dbt_file"):
         
         assertExit(lambda: file_actions.initiate_local_environment(called_by))
 
+def test_terminate_local_environment_parquet_snapshot():
+
+    # this test the function terminate_local_environment with a parquet table file. Must be uploaded next to the csv path of the paths file
+    with tempfile.TemporaryDirectory() as tmpdir:
+        called_by = "main"
+        mock_df_RUN_TYPE = pd.read_csv("materials/RUN_TYPE_after_initiate.csv")
+        context_dict = {
+            "df_RUN_TYPE" : mock_df_RUN_TYPE,
+            "df_paths": pd.read_csv("materials/paths.csv")
+        }
+        open(os.path.join(tmpdir, "landing_season.parquet"), 'w').close()
+
+        with patch("file_actions.parametrize_yml_dbt_file"), \
+            patch("file_actions.modify_run_file", return_value=mock_df_RUN_TYPE), \
+            patch("file_actions.config.UPLOAD_FOLDER_MAP_PER_CALLER", {"main": [tmpdir]}), \
+            patch("file_actions.dropboxA.upload_files") as mock_upload_files, \
+            patch("file_actions.config.destroy_local_folder"):
+
+            file_actions.terminate_local_environment(called_by,context_dict)
+            mock_upload_files.assert_called_once_with(
+                [(os.path.join(tmpdir, "landing_season.parquet"), "current/outputs/database/landing_season.parquet")])
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_read_json_file_not_found))
     test_suite.addTest(unittest.FunctionTestCase(test_read_json_invalid_json))
     test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv_missing_columns))
     test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv_type_mismatch))
+    test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv_missing_columns_header_only))
+    test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv_value_not_matching_type))
+    test_suite.addTest(unittest.FunctionTestCase(test_read_and_check_csv_with_bom))
     test_suite.addTest(unittest.FunctionTestCase(test_read_yml_file_not_found))
     test_suite.addTest(unittest.FunctionTestCase(test_read_txt_file_not_found))
     test_suite.addTest(unittest.FunctionTestCase(test_create_csv_write_failure))
+    test_suite.addTest(unittest.FunctionTestCase(test_create_parquet_from_batches_no_batches))
     test_suite.addTest(unittest.FunctionTestCase(test_create_yml_failure))
     test_suite.addTest(unittest.FunctionTestCase(test_create_txt_failure))
     test_suite.addTest(unittest.FunctionTestCase(test_create_jpg_save_failure))
@@ -210,5 +284,6 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_download_paths_file_invalid_literal))
     test_suite.addTest(unittest.FunctionTestCase(test_initiate_local_environment_missing_flag))
     test_suite.addTest(unittest.FunctionTestCase(test_initiate_local_environment_empty_df_paths))
+    test_suite.addTest(unittest.FunctionTestCase(test_terminate_local_environment_parquet_snapshot))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
\ No newline at end of file
@@ -5,7 +5,7 @@ It units test the happy path for each function
 
 import unittest
 import pandas as pd
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from pandas.testing import assert_frame_equal
 import sys
 import os
@@ -21,11 +21,45 @@ def test_extract_games_from_competition():
     mock_df_game = pd.read_csv("materials/game.csv")
     with patch.dict(game_actions.game_info_functions, {"LNB": lambda row: mock_df_game}), \
          patch.object(game_actions, "create_csv"), \
-         patch.object(game_actions, "config"):
+         patch.object(game_actions, "config") as mock_config:
 
+        mock_config.game_max_workers = 4
         result = game_actions.extract_games_from_competition(df_competition)
         assert_frame_equal(result.reset_index(drop=True), mock_df_game.reset_index(drop=True),check_dtype=False)
 
+def test_extract_games_from_competition_several():
+
+    # this test the function extract_games_from_competition with several competitions extracted in parallel. Must keep the competitions order
+    df_competition = pd.read_csv("materials/competition.csv")
+    mock_df_game = pd.read_csv("materials/game.csv")
+    def get_game_details(row):
+        df = mock_df_game.copy()
+        df['COMPETITION_ID'] = row.COMPETITION_ID
+        return df
+
+    with patch.dict(game_actions.game_info_functions, {"LNB": get_game_details}), \
+         patch.object(game_actions, "create_csv"), \
+         patch.object(game_actions, "config") as mock_config:
+
+        mock_config.game_max_workers = 4
+        result = game_actions.extract_games_from_competition(df_competition)
+        expected_compet = [compet for compet in df_competition['COMPETITION_ID'] for _ in range(len(mock_df_game))]
+        assert result['COMPETITION_ID'].tolist() == expected_compet
+
+def test_get_gameday_date_range():
+
+    # this test the function get_gameday_date_range
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
+    df_gameday_dates = pd.DataFrame({'BEGIN_DATE_LOCAL': ['2025-01-03'], 'END_DATE_UTC': ['2025-01-05'], 'NB_GAME': [8]})
+
+    with patch.object(game_actions.snowflakeA, "snowflake_execute_best_effort", return_value=df_gameday_dates) as mock_execute, \
+         patch.object(game_actions.config, "game_extraction_margin_days", 30):
+
+        result = game_actions.get_gameday_date_range(sr_snowflake_account, sr_output_need)
+        assert result == (('2024-12-04', '2025-02-04'), 8)
+        mock_execute.assert_called_once_with(sr_snowflake_account, game_actions.sqlQ.game_actions_qGameDayDates, ('S1', '1ere journée'))
+
 def test_extract_games_from_need():
     
     # this test the function extract_games_from_need
@@ -39,10 +73,31 @@ def test_extract_games_from_need():
         result = game_actions.extract_games_from_need(sr_output_need,df_competition)
         assert_frame_equal(result.reset_index(drop=True), mock_df_game.reset_index(drop=True),check_dtype=False)
 
+def test_extract_games_from_need_with_date_range():
+    
+    # this test the function extract_games_from_need with a snowflake account. Must request games around the gameday dates only
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
+    df_competition = pd.read_csv("materials/competition_unique.csv")
+    mock_df_game = pd.read_csv("materials/game.csv")
+    mock_get_game_details = MagicMock(return_value=mock_df_game)
+
+    with patch.dict(game_actions.game_info_functions, {"LNB": mock_get_game_details}), \
+        patch.object(game_actions, "get_gameday_date_range", return_value=(('2024-12-04', '2025-02-04'), len(mock_df_game))), \
+        patch.object(game_actions, "create_csv"):
+
+        result = game_actions.extract_games_from_need(sr_output_need,df_competition,sr_snowflake_account)
+        assert_frame_equal(result.reset_index(drop=True), mock_df_game.reset_index(drop=True),check_dtype=False)
+        mock_get_game_details.assert_called_once()
+        assert mock_get_game_details.call_args.args[1:] == ('1ere journée', ('2024-12-04', '2025-02-04'))
+
 
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_competition))
+    test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_competition_several))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_gameday_date_range))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_need))
+    test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_need_with_date_range))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
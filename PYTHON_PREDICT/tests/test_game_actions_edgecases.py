@@ -4,7 +4,7 @@ It units test the unexpected path for each function, which return exception
 '''
 
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 import pandas as pd
 from pandas.testing import assert_frame_equal
 import sys
@@ -22,8 +22,9 @@ def test_extract_games_from_competition_empty_df():
     mock_df_game = pd.read_csv("materials/edgecases/game_empty.csv")
     with patch.dict(game_actions.game_info_functions, {"LNB": lambda row: mock_df_game}), \
          patch.object(game_actions, "create_csv"), \
-         patch.object(game_actions, "config"):
+         patch.object(game_actions, "config") as mock_config:
 
+        mock_config.game_max_workers = 4
         result = game_actions.extract_games_from_competition(df_competition_empty)
         assert_frame_equal(result.reset_index(drop=True), mock_df_game.reset_index(drop=True),check_dtype=False)
 
@@ -34,8 +35,9 @@ def test_extract_games_from_competition_unknown_source():
     mock_df_game = pd.read_csv("materials/game.csv")
     with patch.dict(game_actions.game_info_functions, {"LNB": lambda row: mock_df_game}), \
          patch.object(game_actions, "create_csv"), \
-         patch.object(game_actions, "config"):
+         patch.object(game_actions, "config") as mock_config:
 
+        mock_config.game_max_workers = 4
         assertExit(lambda: game_actions.extract_games_from_competition(df_competition))
 
 def test_extract_games_from_need_no_matching_competition():
@@ -56,7 +58,7 @@ def test_extract_games_from_need_function_raises():
     sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
     df_competition = pd.read_csv("materials/competition_unique.csv")
 
-    def raise_error(_, __):
+    def raise_error(*_):
         raise ValueError("Boom!")
 
     with patch.dict(game_actions.game_info_functions, {'LNB': raise_error}), \
@@ -64,11 +66,52 @@ def test_extract_games_from_need_function_raises():
 
         assertExit(lambda: game_actions.extract_games_from_need(sr_output_need,df_competition))
 
+def test_get_gameday_date_range_unknown_gameday():
+    
+    # this test the function get_gameday_date_range when the gameday is not in the database yet. Must return None to request the whole calendar
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
+    df_gameday_dates = pd.DataFrame(columns=['BEGIN_DATE_LOCAL', 'END_DATE_UTC', 'NB_GAME'])
+
+    with patch.object(game_actions.snowflakeA, "snowflake_execute_best_effort", return_value=df_gameday_dates):
+        assert game_actions.get_gameday_date_range(sr_snowflake_account, sr_output_need) is None
+
+def test_get_gameday_date_range_query_fails():
+    
+    # this test the function get_gameday_date_range when the query fails. Must return None to request the whole calendar, without exiting the program
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
+
+    with patch.object(game_actions.snowflakeA, "snowflake_execute_best_effort", return_value=None):
+        assert game_actions.get_gameday_date_range(sr_snowflake_account, sr_output_need) is None
+
+def test_extract_games_from_need_game_out_of_date_range():
+    
+    # this test the function extract_games_from_need when a game known in the database is rescheduled outside the date range. Must request the whole calendar
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    sr_output_need = pd.read_csv("materials/output_need_calculate.csv").iloc[0]
+    df_competition = pd.read_csv("materials/competition_unique.csv")
+    mock_df_game = pd.read_csv("materials/game.csv")
+    mock_get_game_details = MagicMock(side_effect=[mock_df_game.iloc[1:], mock_df_game])
+
+    with patch.dict(game_actions.game_info_functions, {"LNB": mock_get_game_details}), \
+        patch.object(game_actions, "get_gameday_date_range", return_value=(('2024-12-04', '2025-02-04'), len(mock_df_game))), \
+        patch.object(game_actions, "create_csv"):
+
+        result = game_actions.extract_games_from_need(sr_output_need,df_competition,sr_snowflake_account)
+        assert_frame_equal(result.reset_index(drop=True), mock_df_game.reset_index(drop=True),check_dtype=False)
+        assert mock_get_game_details.call_count == 2
+        assert mock_get_game_details.call_args_list[0].args[1:] == ('1ere journée', ('2024-12-04', '2025-02-04'))
+        assert mock_get_game_details.call_args_list[1].args[1:] == ('1ere journée',)
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_competition_empty_df))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_competition_unknown_source))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_need_no_matching_competition))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_need_function_raises))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_gameday_date_range_unknown_gameday))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_gameday_date_range_query_fails))
+    test_suite.addTest(unittest.FunctionTestCase(test_extract_games_from_need_game_out_of_date_range))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
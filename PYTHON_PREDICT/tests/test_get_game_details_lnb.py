@@ -8,7 +8,10 @@ from unittest.mock import patch, MagicMock
 import pandas as pd
 from pandas.testing import assert_frame_equal
 import sys
+import tempfile
 import os
+import copy
+from zoneinfo import ZoneInfo
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -22,10 +25,14 @@ def test_get_game_details_lnb_with_gameday():
     gameday = '1ere journee'
     fake_json = read_json("materials/lnb_game_response.json")
     mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
     mock_lnb_response.json.return_value = fake_json
     expected_df = pd.read_csv("materials/game.csv")
 
-    with patch("get_game_details_lnb.requests.post", return_value = mock_lnb_response):
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", return_value = mock_lnb_response):
         result_df = get_game_details_lnb.get_game_details_lnb(competition_row,gameday)
         assert_frame_equal(result_df[1:].astype(str).reset_index(drop=True), expected_df[1:].astype(str).reset_index(drop=True),check_dtype=False)
 
@@ -35,16 +42,127 @@ def test_get_game_details_lnb_without_gameday():
     competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
     fake_json = read_json("materials/lnb_game_response.json")
     mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
     mock_lnb_response.json.return_value = fake_json
     expected_df = pd.read_csv("materials/game.csv")
 
-    with patch("get_game_details_lnb.requests.post", return_value = mock_lnb_response):
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", return_value = mock_lnb_response):
         result_df = get_game_details_lnb.get_game_details_lnb(competition_row)
         assert_frame_equal(result_df[1:].astype(str).reset_index(drop=True), expected_df[1:].astype(str).reset_index(drop=True),check_dtype=False)
         
+def test_get_game_details_lnb_with_date_range():
+
+    # this test the get_game_details_lnb function with a date range. Must request the calendar on this range only
+    competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
+    gameday = '1ere journee'
+    fake_json = read_json("materials/lnb_game_response.json")
+    mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
+    mock_lnb_response.json.return_value = fake_json
+    expected_df = pd.read_csv("materials/game.csv")
+
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", return_value = mock_lnb_response) as mock_post:
+        result_df = get_game_details_lnb.get_game_details_lnb(competition_row,gameday,('2024-12-04','2025-02-04'))
+        assert_frame_equal(result_df[1:].astype(str).reset_index(drop=True), expected_df[1:].astype(str).reset_index(drop=True),check_dtype=False)
+        payload = mock_post.call_args.kwargs['json']
+        assert (payload['start_date'], payload['end_date']) == ('2024-12-04', '2025-02-04')
+    get_game_details_lnb.close_lnb_session()
+        
+def test_normalize_game_details_lnb_timezones():
+
+    # this test the normalize_game_details_lnb function on a few thousand games over several timezones, against a row-wise normalization
+    fake_game = read_json("materials/lnb_game_response.json")["data"][0]["data"]
+    timezones = ["Europe/Paris", "America/Martinique", "Indian/Reunion"]
+    games = []
+    for i in range(3000):
+        game = copy.deepcopy(fake_game[i % len(fake_game)])
+        game["timezone"] = timezones[i % len(timezones)]
+        game["match_time_utc"] = (pd.Timestamp("2024-09-01T18:00:00Z") + pd.Timedelta(hours=7 * i)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        games.append(game)
+    games[5]["match_time_utc"] = None
+    df_game = pd.json_normalize(games, errors="ignore")
+
+    result_df = get_game_details_lnb.normalize_game_details_lnb(df_game)
+
+    datetime_utc = pd.to_datetime(df_game["match_time_utc"], utc=True, errors="coerce")
+    datetime_local = pd.DataFrame({"DATETIME_UTC": datetime_utc, "timezone": df_game["timezone"]}).apply(
+        lambda r: r["DATETIME_UTC"].astimezone(ZoneInfo(r["timezone"])) if pd.notna(r["DATETIME_UTC"]) else None,
+        axis=1
+    )
+    expected_df = pd.DataFrame({
+        "DATE_GAME_UTC": datetime_utc.dt.date.astype(str),
+        "TIME_GAME_UTC": datetime_utc.dt.time.astype(str),
+        "DATE_GAME_LOCAL": [str(d.date()) if d is not None else "NaT" for d in datetime_local],
+        "TIME_GAME_LOCAL": [str(d.time()) if d is not None else "NaT" for d in datetime_local],
+        "TEAM_HOME": df_game["teams"].apply(lambda t: t[0].get("team_name")),
+        "SCORE_HOME": df_game["teams"].apply(lambda t: t[0].get("score_string")),
+        "TEAM_AWAY": df_game["teams"].apply(lambda t: t[1].get("team_name")),
+        "SCORE_AWAY": df_game["teams"].apply(lambda t: t[1].get("score_string"))
+    })
+
+    assert_frame_equal(result_df[expected_df.columns], expected_df, check_dtype=False)
+
+def test_fetch_lnb_calendar_cache():
+
+    # this test the fetch_lnb_calendar function: cached response reused within its time to live, then revalidated with its ETag
+    payload = {"competition_external_id": 288, "start_date": "2024-12-04", "end_date": "2025-02-04"}
+    fake_json = read_json("materials/lnb_game_response.json")
+    mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {"ETag": '"v1"'}
+    mock_lnb_response.json.return_value = fake_json
+    mock_not_modified = MagicMock()
+    mock_not_modified.status_code = 304
+
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.config.game_cache_replay", False), \
+         patch("get_game_details_lnb.requests.Session.post", side_effect = [mock_lnb_response, mock_not_modified]) as mock_post:
+
+        # first call requests the API, second one within the time to live uses the cache
+        assert get_game_details_lnb.fetch_lnb_calendar("url", payload) == fake_json
+        assert get_game_details_lnb.fetch_lnb_calendar("url", payload) == fake_json
+        assert mock_post.call_count == 1
+
+        # once expired, the cached response is revalidated and reused as the API answers not modified
+        get_game_details_lnb.expire_lnb_cache_entry(get_game_details_lnb.get_lnb_cache_file_path(payload))
+        assert get_game_details_lnb.fetch_lnb_calendar("url", payload) == fake_json
+        assert mock_post.call_count == 2
+        assert mock_post.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    get_game_details_lnb.close_lnb_session()
+
+def test_get_game_details_lnb_replay():
+
+    # this test the get_game_details_lnb function in replay mode. Must rebuild games from the cached response without network
+    competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
+    fake_json = read_json("materials/lnb_game_response.json")
+    expected_df = pd.read_csv("materials/game.csv")
+    payload = {"competition_external_id": 288, "start_date": "2000-01-01", "end_date": "2999-12-31"}
+
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.config.game_cache_replay", True), \
+         patch("get_game_details_lnb.requests.Session.post") as mock_post:
+
+        get_game_details_lnb.write_lnb_cache_entry(get_game_details_lnb.get_lnb_cache_file_path(payload),
+                                                   {"etag": None, "last_modified": None, "fetched_at": 0, "response": fake_json})
+        result_df = get_game_details_lnb.get_game_details_lnb(competition_row)
+        assert_frame_equal(result_df[1:].astype(str).reset_index(drop=True), expected_df[1:].astype(str).reset_index(drop=True),check_dtype=False)
+        mock_post.assert_not_called()
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_with_gameday))
     test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_without_gameday))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_with_date_range))
+    test_suite.addTest(unittest.FunctionTestCase(test_normalize_game_details_lnb_timezones))
+    test_suite.addTest(unittest.FunctionTestCase(test_fetch_lnb_calendar_cache))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_replay))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
@@ -5,6 +5,7 @@ It units test the enexpected path for each function, which return exception
 import unittest
 from unittest.mock import patch, MagicMock
 import sys
+import tempfile
 import os
 import pandas as pd
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
@@ -21,9 +22,13 @@ def test_get_game_details_lnb_network_failure():
     gameday = '1ere journee'
     fake_json = read_json("materials/lnb_game_response.json")
     mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
     mock_lnb_response.json.return_value = fake_json
 
-    with patch("get_game_details_lnb.requests.post", side_effect = Exception("Network error")):
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", side_effect = Exception("Network error")):
         assertExit(lambda: get_game_details_lnb.get_game_details_lnb(competition_row,gameday))
 
 def test_get_game_details_lnb_invalid_json_response():
@@ -32,9 +37,13 @@ def test_get_game_details_lnb_invalid_json_response():
     competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
     fake_json = read_json("materials/lnb_game_response.json")
     mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
     mock_lnb_response.json.return_value = fake_json
 
-    with patch("get_game_details_lnb.requests.post", side_effect = ValueError("Invalid JSON")):
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", side_effect = ValueError("Invalid JSON")):
         assertExit(lambda: get_game_details_lnb.get_game_details_lnb(competition_row))
 
 def test_missing_data_key():
@@ -43,15 +52,66 @@ def test_missing_data_key():
     competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
     gameday = '1ere journee'
     mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
     mock_lnb_response.json.return_value = {"wrong_key": []}
     
-    with patch("get_game_details_lnb.requests.post", return_value = mock_lnb_response):
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.requests.Session.post", return_value = mock_lnb_response):
         assertExit(lambda: get_game_details_lnb.get_game_details_lnb(competition_row,gameday))
 
+def test_normalize_game_details_lnb_missing_team():
+    
+    # this test the normalize_game_details_lnb function with a game having only one team. Must raise a ValueError
+    fake_game = read_json("materials/lnb_game_response.json")["data"][0]["data"]
+    df_game = pd.json_normalize(fake_game, errors="ignore")
+    df_game.at[0, "teams"] = df_game.at[0, "teams"][:1]
+
+    with unittest.TestCase().assertRaises(ValueError):
+        get_game_details_lnb.normalize_game_details_lnb(df_game)
+
+def test_fetch_lnb_calendar_replay_not_cached():
+    
+    # this test the fetch_lnb_calendar function in replay mode without cached response. Must raise a FileNotFoundError without network
+    payload = {"competition_external_id": 288, "start_date": "2000-01-01", "end_date": "2999-12-31"}
+
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.config.game_cache_replay", True), \
+         patch("get_game_details_lnb.requests.Session.post") as mock_post:
+
+        with unittest.TestCase().assertRaises(FileNotFoundError):
+            get_game_details_lnb.fetch_lnb_calendar("url", payload)
+        mock_post.assert_not_called()
+
+def test_get_game_details_lnb_game_in_progress():
+    
+    # this test the get_game_details_lnb function with a game in progress. Must expire the cached response, so each retry requests the API again, and exit the program
+    competition_row = next(pd.read_csv("materials/competition_unique.csv").itertuples(index=False))
+    fake_json = read_json("materials/lnb_game_response.json")
+    fake_json["data"][0]["data"][0]["match_status"] = "LIVE"
+    mock_lnb_response = MagicMock()
+    mock_lnb_response.status_code = 200
+    mock_lnb_response.headers = {}
+    mock_lnb_response.json.return_value = fake_json
+
+    with tempfile.TemporaryDirectory() as cache_folder, \
+         patch("get_game_details_lnb.config.game_cache_folder", cache_folder), \
+         patch("get_game_details_lnb.config.game_cache_replay", False), \
+         patch("config.time_sleep"), \
+         patch("get_game_details_lnb.requests.Session.post", return_value = mock_lnb_response) as mock_post:
+        assertExit(lambda: get_game_details_lnb.get_game_details_lnb(competition_row))
+        assert mock_post.call_count == 3
+    get_game_details_lnb.close_lnb_session()
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_network_failure))
     test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_invalid_json_response))
     test_suite.addTest(unittest.FunctionTestCase(test_missing_data_key))
+    test_suite.addTest(unittest.FunctionTestCase(test_normalize_game_details_lnb_missing_team))
+    test_suite.addTest(unittest.FunctionTestCase(test_fetch_lnb_calendar_replay_not_cached))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_game_details_lnb_game_in_progress))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
@@ -78,6 +78,21 @@ def test_get_editiontimes_bi():
     edition_times =  messages_details.get_editiontimes_bi(message)
     assert edition_times == expected
 
+def test_get_messages_columns_bi():
+
+    # this test the function get_messages_columns_bi, parsing all columns at once
+    message = read_txt("materials/bi_message_html.txt")
+    expected = {
+        'USER': ast.literal_eval('[' + read_txt("materials/bi_get_users.txt") + ']'),
+        'MESSAGE_FORUM_ID': ast.literal_eval('[' + read_txt("materials/bi_get_ids.txt") + ']'),
+        'CREATION_TIME_LOCAL': eval('[' + read_txt("materials/bi_get_creation_times.txt") + ']', {"datetime": datetime}),
+        'EDITION_TIME_LOCAL': eval('[' + read_txt("materials/bi_get_edition_times.txt") + ']', {"datetime": datetime}),
+        'MESSAGE_CONTENT': ast.literal_eval('[' + read_txt("materials/bi_message_content.txt") + ']')
+    }
+
+    columns = messages_details.get_messages_columns_bi(message)
+    assert columns == expected
+
 def test_get_messages_details_bi():
 
     # this test the function get_messages_details_bi
@@ -91,11 +106,15 @@ def test_get_messages_details_bi():
     mock_edition_times = eval('[' + read_txt("materials/bi_get_edition_times.txt") + ']', {"datetime": datetime})
     expected = pd.read_csv("materials/bi_get_messages_details.csv",quotechar='"')
 
-    with patch("get_messages_details_bi.get_users_bi", return_value = mock_users), \
-         patch("get_messages_details_bi.get_ids_bi", return_value = mock_ids), \
-         patch("get_messages_details_bi.get_creationtimes_bi", return_value = mock_creation_times), \
-         patch("get_messages_details_bi.get_contents_outerblockquote_bi", return_value = mock_contents), \
-         patch("get_messages_details_bi.get_editiontimes_bi", return_value = mock_edition_times):
+    mock_columns = {
+        'USER': mock_users,
+        'MESSAGE_FORUM_ID': mock_ids,
+        'CREATION_TIME_LOCAL': mock_creation_times,
+        'EDITION_TIME_LOCAL': mock_edition_times,
+        'MESSAGE_CONTENT': mock_contents
+    }
+
+    with patch("get_messages_details_bi.get_messages_columns_bi", return_value = mock_columns):
     
         df_messages_infos = messages_details.get_messages_details_bi(messagetext, topic_row, start)
         df_messages_infos['CREATION_TIME_LOCAL'] = pd.to_datetime(df_messages_infos['CREATION_TIME_LOCAL'])
@@ -118,6 +137,7 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_get_creationtimes_bi))
     test_suite.addTest(unittest.FunctionTestCase(test_get_contents_outerblockquote_bi))
     test_suite.addTest(unittest.FunctionTestCase(test_get_editiontimes_bi))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_messages_columns_bi))
     test_suite.addTest(unittest.FunctionTestCase(test_get_messages_details_bi))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
@@ -95,14 +95,29 @@ def test_get_messages_details_inconsistent_lengths():
 
     mock_creation_times = mock_creation_times[:-1] # we remove the last element from creation times so that the length is inconsistent with otherd
 
-    with patch("get_messages_details_bi.get_users_bi", return_value = mock_users), \
-         patch("get_messages_details_bi.get_ids_bi", return_value = mock_ids), \
-         patch("get_messages_details_bi.get_creationtimes_bi", return_value = mock_creation_times), \
-         patch("get_messages_details_bi.get_contents_outerblockquote_bi", return_value = mock_contents), \
-         patch("get_messages_details_bi.get_editiontimes_bi", return_value = mock_edition_times):
+    mock_columns = {
+        'USER': mock_users,
+        'MESSAGE_FORUM_ID': mock_ids,
+        'CREATION_TIME_LOCAL': mock_creation_times,
+        'EDITION_TIME_LOCAL': mock_edition_times,
+        'MESSAGE_CONTENT': mock_contents
+    }
+
+    with patch("get_messages_details_bi.get_messages_columns_bi", return_value = mock_columns):
     
         unittest.TestCase().assertRaises(ValueError, messages_details.get_messages_details_bi, messagetext, topic_row, start)
 
+def test_get_messages_columns_missing_user():
+
+    # this test the function get_messages_columns_bi with a message without user. Must return lists of different lengths
+    message = ("<dl class='postprofile' id='profile1'></dl>"
+               "<div class='postbody'><p class='author'><time>mar. 07 janv. 2025 9:54</time></p>"
+               "<div class='content'>blabla</div></div>")
+    columns = messages_details.get_messages_columns_bi(message)
+    assert columns['USER'] == []
+    assert columns['MESSAGE_FORUM_ID'] == [1]
+    assert columns['MESSAGE_CONTENT'] == ['blabla']
+
 def test_get_messages_details_empty_html():
     
     # this test the function get_messages_details_bi with an empty text
@@ -125,6 +140,7 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_editiontime_malformed_notice))
     test_suite.addTest(unittest.FunctionTestCase(test_editiontime_no_notice))
     test_suite.addTest(unittest.FunctionTestCase(test_get_messages_details_inconsistent_lengths))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_messages_columns_missing_user))
     test_suite.addTest(unittest.FunctionTestCase(test_get_messages_details_empty_html))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
@@ -5,6 +5,7 @@ It units test the happy path for each function
 
 import unittest
 from unittest.mock import patch, mock_open
+import pandas as pd
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
@@ -20,14 +21,70 @@ def test_push_capture_online():
     mock_response = type("MockResponse", (), {"json": lambda self: {'data': {'url': expected_url}}})()
 
     with patch("builtins.open", mock_open(read_data=b"fake image data")), \
-         patch("requests.post", return_value=mock_response), \
+         patch("requests.Session.post", return_value=mock_response), \
          patch("os.getenv", return_value="fake_api_key"):
             
             result = imgbb_actions.push_capture_online(image_path)
             assert result == expected_url
 
+def test_push_capture_online_cached():
+
+    # this test the push_capture_online function with a capture hash: the url is cached and the capture is not pushed again
+    image_path = "image.png" 
+    expected_url = "https://fakeurl.com/image.png"
+    mock_response = type("MockResponse", (), {"json": lambda self: {'data': {'url': expected_url}}})()
+
+    with patch("builtins.open", mock_open(read_data=b"fake image data")), \
+         patch("requests.Session.post", return_value=mock_response) as mock_post, \
+         patch("os.getenv", return_value="fake_api_key"), \
+         patch("imgbb_actions.create_csv") as mock_create_csv, \
+         patch.dict(imgbb_actions.imgbb_cache, clear=True):
+            
+            result = imgbb_actions.push_capture_online(image_path, "hash1")
+            result_again = imgbb_actions.push_capture_online(image_path, "hash1")
+            assert result == expected_url
+            assert result_again == expected_url
+            mock_post.assert_called_once()
+            mock_create_csv.assert_called_once()
+            df_imgbb_cache = mock_create_csv.call_args.args[1]
+            assert df_imgbb_cache.to_dict('records') == [{'CAPTURE_HASH': 'hash1', 'IMAGE_URL': expected_url}]
+
+def test_get_imgbb_session():
+
+    # this test the get_imgbb_session function: the same session is shared until closed
+    imgbb_actions.close_imgbb_session()
+    session = imgbb_actions.get_imgbb_session()
+    assert imgbb_actions.get_imgbb_session() is session
+    imgbb_actions.close_imgbb_session()
+    assert imgbb_actions.imgbb_session is None
+
+def test_get_capture_hash():
+
+    # this test the get_capture_hash function: same content and kind give the same hash, else it differs
+    df = pd.DataFrame({'USER': ['A', 'B'], 'POINTS': [10, 8]})
+    capture_hash = imgbb_actions.get_capture_hash(df, 'capture_df_oneheader')
+    assert capture_hash == imgbb_actions.get_capture_hash(df.copy(), 'capture_df_oneheader')
+    assert capture_hash != imgbb_actions.get_capture_hash(df, 'capture_scores_detailed')
+    assert capture_hash != imgbb_actions.get_capture_hash(df.assign(POINTS=[10, 9]), 'capture_df_oneheader')
+    assert capture_hash != imgbb_actions.get_capture_hash(df.rename(columns={'POINTS': 'SCORE'}), 'capture_df_oneheader')
+    assert imgbb_actions.get_capture_hash("text", 'playoffs_table') == imgbb_actions.get_capture_hash("text", 'playoffs_table')
+
+def test_load_imgbb_cache():
+
+    # this test the load_imgbb_cache function
+    df_imgbb_cache = pd.DataFrame({'CAPTURE_HASH': ['hash1'], 'IMAGE_URL': ['https://fakeurl.com/image.png']})
+    with patch.dict(imgbb_actions.imgbb_cache, clear=True):
+        imgbb_actions.load_imgbb_cache(df_imgbb_cache)
+        imgbb_actions.load_imgbb_cache(None)
+        assert imgbb_actions.get_cached_capture_url('hash1') == 'https://fakeurl.com/image.png'
+        assert imgbb_actions.get_cached_capture_url('hash2') is None
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_push_capture_online))
+    test_suite.addTest(unittest.FunctionTestCase(test_push_capture_online_cached))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_imgbb_session))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_capture_hash))
+    test_suite.addTest(unittest.FunctionTestCase(test_load_imgbb_cache))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
\ No newline at end of file
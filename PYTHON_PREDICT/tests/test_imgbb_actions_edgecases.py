@@ -33,7 +33,7 @@ def test_push_capture_invalid_json_response():
     mock_response = type("MockResponse", (), {"json": lambda self: {'data': {"unexpected": "structure"}}})()
 
     with patch("builtins.open", mock_open(read_data=b"fake image data")), \
-         patch("requests.post", return_value=mock_response), \
+         patch("requests.Session.post", return_value=mock_response), \
          patch("os.getenv", return_value="fake_api_key"):
             
             assertExit(lambda: imgbb_actions.push_capture_online(image_path))
@@ -44,16 +44,41 @@ def test_response_not_json():
     image_path = "image.png" 
     
     with patch("builtins.open", mock_open(read_data=b"fake image data")), \
-         patch("requests.post", side_effect = ValueError("Invalid JSON")), \
+         patch("requests.Session.post", side_effect = ValueError("Invalid JSON")), \
          patch("os.getenv", return_value="fake_api_key"):
             
             assertExit(lambda: imgbb_actions.push_capture_online(image_path))  
     
 
+def test_push_capture_online_failure_not_cached():
+
+    # this test the push_capture_online function with a capture hash and a failing push. Must exit the program without caching an url
+    image_path = "image.png" 
+    mock_response = type("MockResponse", (), {"json": lambda self: {'data': {"unexpected": "structure"}}})()
+
+    with patch("builtins.open", mock_open(read_data=b"fake image data")), \
+         patch("requests.Session.post", return_value=mock_response), \
+         patch("os.getenv", return_value="fake_api_key"), \
+         patch("imgbb_actions.create_csv") as mock_create_csv, \
+         patch.dict(imgbb_actions.imgbb_cache, clear=True):
+            
+            assertExit(lambda: imgbb_actions.push_capture_online(image_path, "hash1"))
+            assert imgbb_actions.get_cached_capture_url("hash1") is None
+            mock_create_csv.assert_not_called()
+
+def test_load_imgbb_cache_missing_column():
+
+    # this test the load_imgbb_cache function with a file missing a column. Must raise an error
+    df_imgbb_cache = pd.DataFrame({'CAPTURE_HASH': ['hash1']})
+    with patch.dict(imgbb_actions.imgbb_cache, clear=True):
+        unittest.TestCase().assertRaises(KeyError, imgbb_actions.load_imgbb_cache, df_imgbb_cache)
+
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_push_capture_online_missing_key))
     test_suite.addTest(unittest.FunctionTestCase(test_push_capture_invalid_json_response))
     test_suite.addTest(unittest.FunctionTestCase(test_response_not_json))
+    test_suite.addTest(unittest.FunctionTestCase(test_push_capture_online_failure_not_cached))
+    test_suite.addTest(unittest.FunctionTestCase(test_load_imgbb_cache_missing_column))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
\ No newline at end of file
@@ -21,17 +21,81 @@ def test_extract_messages_from_topic():
     ts_message_extract_min_utc = pd.Timestamp('2025-02-04 21:00:00')
     ts_message_extract_max_utc = pd.Timestamp('2025-02-04 22:30:00')
 
-    mock_response = MagicMock()
-    mock_response.read.return_value = b"<html></html>"
     mock_df = pd.read_csv("materials/message_check.csv")
-    with patch('message_actions.urllib.urlopen') as mock_urlopen, \
+    with patch('message_actions.fetch_topic_page', return_value="<html></html>"), \
          patch.dict('message_actions.messages_info_functions', {'BI': MagicMock()}):
         
-        mock_urlopen.return_value = mock_response
         message_actions.messages_info_functions['BI'].return_value = mock_df
 
-        result = message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc)
+        result, topic_cursor = message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc)
         assert_frame_equal(result.reset_index(drop=True), mock_df.iloc[[1]].reset_index(drop=True))
+        assert topic_cursor['PAGE_SIZE'] == len(mock_df)
+        assert topic_cursor['LAST_PAGE_START'] == 0
+        assert topic_cursor['LAST_MESSAGE_FORUM_ID'] == mock_df['MESSAGE_FORUM_ID'].max()
+
+def test_fetch_topic_page():
+
+    # this test the function fetch_topic_page: the page is fetched with the pooled session of the forum
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    mock_session = MagicMock()
+    mock_session.get.return_value.content = "<html>é</html>".encode('utf-8')
+
+    with patch.dict(os.environ, {'BI_URL': 'https://forum.test'}), \
+         patch('message_actions.requests.Session', return_value=mock_session), \
+         patch('message_actions.config.forum_politeness_delay', 0):
+
+        message_actions.close_forum_crawl_sessions()
+        messagetext = message_actions.fetch_topic_page(topic_row, 30)
+        message_actions.fetch_topic_page(topic_row, 45)
+
+        assert messagetext == "<html>é</html>"
+        # the session is created once and reused for each page of the forum
+        assert message_actions.forum_crawl_sessions['BI'] is mock_session
+        assert mock_session.get.call_count == 2
+        assert mock_session.get.call_args_list[0].args[0] == "https://forum.test/viewtopic.php?t=1&start=30"
+        message_actions.close_forum_crawl_sessions()
+        mock_session.close.assert_called_once()
+        assert message_actions.forum_crawl_sessions == {}
+
+def test_extract_messages_from_topic_with_cursor():
+
+    # this test the function extract_messages_from_topic starting from a cursor: 
+    # it crawls forward from the cursor page, then backward until messages are too old
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    ts_message_extract_min_utc = pd.Timestamp('2025-02-04 21:00:00')
+    ts_message_extract_max_utc = pd.Timestamp('2025-02-04 22:30:00')
+    sr_topic_cursor = pd.Series({'FORUM_SOURCE': 'BI', 'TOPIC_NUMBER': 1, 'PAGE_SIZE': 2, 'LAST_PAGE_START': 4, 'LAST_MESSAGE_FORUM_ID': 6})
+
+    def mock_page(id_first, creation_times):
+        return pd.DataFrame({
+            'FORUM_SOURCE': 'BI',
+            'TOPIC_NUMBER': 1,
+            'USER': 'user',
+            'MESSAGE_FORUM_ID': [id_first + i for i in range(len(creation_times))],
+            'CREATION_TIME_LOCAL': pd.to_datetime(creation_times),
+            'EDITION_TIME_LOCAL': pd.NaT,
+            'MESSAGE_CONTENT': 'abc'
+        })
+    pages = {
+        0: mock_page(1, ['2024-01-01 10:00:00', '2024-01-01 11:00:00']),
+        2: mock_page(3, ['2024-12-01 10:00:00', '2025-02-04 22:10:00']),
+        4: mock_page(5, ['2025-02-04 22:15:00', '2025-02-04 22:20:00']),
+        6: mock_page(7, ['2025-02-04 22:25:00']),
+        7: mock_page(7, ['2025-02-04 22:25:00'])
+    }
+
+    with patch('message_actions.fetch_topic_page', return_value="<html></html>"), \
+         patch.dict('message_actions.messages_info_functions', {'BI': MagicMock()}):
+
+        message_actions.messages_info_functions['BI'].side_effect = lambda messagetext, topic_row, start: pages[start]
+
+        result, topic_cursor = message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc,sr_topic_cursor)
+        assert result['MESSAGE_FORUM_ID'].tolist() == [4, 5, 6, 7]
+        # the first page is never crawled
+        starts = [c.args[2] for c in message_actions.messages_info_functions['BI'].call_args_list]
+        assert 0 not in starts
+        assert topic_cursor['LAST_PAGE_START'] == 6
+        assert topic_cursor['LAST_MESSAGE_FORUM_ID'] == 7
 
 def test_extract_messages():
 
@@ -46,12 +110,39 @@ def test_extract_messages():
 
     with patch('message_actions.get_list_topics_from_need', return_value=mock_topics_scope_id), \
          patch('message_actions.get_extraction_time_range', return_value=(mock_ts_message_extract_min_utc,mock_ts_message_extract_max_utc)), \
-         patch('message_actions.config.multithreading_run', return_value=[mock_results]), \
+         patch('message_actions.config.multithreading_run', return_value=[(mock_results, {})]), \
+         patch('message_actions.update_topic_cursor') as mock_update_topic_cursor, \
          patch('message_actions.create_csv'):
 
         df_messages, ts_message_extract_max_utc = message_actions.extract_messages(sr_snowflake_account, sr_output_need)
         assert_frame_equal(df_messages.reset_index(drop=True), mock_results.reset_index(drop=True))
         assert ts_message_extract_max_utc == mock_ts_message_extract_max_utc
+        mock_update_topic_cursor.assert_called_once_with(None, [{}])
+
+def test_get_topic_cursor():
+
+    # this test the function get_topic_cursor
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    df_topic_cursor = pd.DataFrame({'FORUM_SOURCE': ['BI', 'II'], 'TOPIC_NUMBER': [1, 1], 'PAGE_SIZE': [15, 15],
+                                    'LAST_PAGE_START': [30, 45], 'LAST_MESSAGE_FORUM_ID': [100, 200]})
+
+    sr_topic_cursor = message_actions.get_topic_cursor(df_topic_cursor, topic_row)
+    assert sr_topic_cursor['LAST_PAGE_START'] == 30
+    assert message_actions.get_topic_cursor(None, topic_row) is None
+
+def test_update_topic_cursor():
+
+    # this test the function update_topic_cursor: crawled topics cursors replace the previous ones
+    df_topic_cursor = pd.DataFrame({'FORUM_SOURCE': ['BI', 'II'], 'TOPIC_NUMBER': [1, 1], 'PAGE_SIZE': [15, 15],
+                                    'LAST_PAGE_START': [30, 45], 'LAST_MESSAGE_FORUM_ID': [100, 200]})
+    lst_topic_cursor = [{'FORUM_SOURCE': 'BI', 'TOPIC_NUMBER': 1, 'PAGE_SIZE': 15, 'LAST_PAGE_START': 45, 'LAST_MESSAGE_FORUM_ID': 120}]
+
+    with patch('message_actions.create_csv') as mock_create_csv:
+        df_result = message_actions.update_topic_cursor(df_topic_cursor, lst_topic_cursor)
+        mock_create_csv.assert_called_once()
+        assert len(df_result) == 2
+        sr_bi = df_result[df_result['FORUM_SOURCE'] == 'BI'].iloc[0]
+        assert sr_bi['LAST_PAGE_START'] == 45 and sr_bi['LAST_MESSAGE_FORUM_ID'] == 120
 
 def test_get_list_topics_from_need():
     
@@ -80,7 +171,7 @@ def test_get_extraction_time_range():
 
 def test_post_message_bi():
     
-    # this test the function post_message_bi
+    # this test the function post_message_bi: posting on several topics of the forum needs only one login
     topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
     message_content = "Test message"
     forum_source = topic_row['FORUM_SOURCE']
@@ -92,7 +183,7 @@ def test_post_message_bi():
         f"{forum_source}_PASSWORD": "fake_pass"
     }),patch("message_actions.requests.Session") as mock_session:
         mock_sess_instance = MagicMock()
-        mock_session.return_value.__enter__.return_value = mock_sess_instance
+        mock_session.return_value = mock_sess_instance
 
         # Mock login page GET
         login_html = '''
@@ -108,7 +199,17 @@ def test_post_message_bi():
         mock_sess_instance.post.return_value.text = "Déconnexion"
 
         # Should not raise SystemExit
+        message_actions.close_forum_post_sessions()
         message_actions.post_message(topic_row, message_content)
+        message_actions.post_message(topic_row, message_content)
+
+        mock_session.assert_called_once()
+        # one login page and one reply page per post
+        assert mock_sess_instance.get.call_count == 3
+        # one login and one message per post
+        assert mock_sess_instance.post.call_count == 3
+        assert mock_sess_instance.post.call_args.kwargs['data']['sid'] == "sid123"
+        message_actions.close_forum_post_sessions()
 
 def test_post_message():
 
@@ -122,7 +223,11 @@ def test_post_message():
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_extract_messages_from_topic))
+    test_suite.addTest(unittest.FunctionTestCase(test_fetch_topic_page))
+    test_suite.addTest(unittest.FunctionTestCase(test_extract_messages_from_topic_with_cursor))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_messages))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_topic_cursor))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_topic_cursor))
     test_suite.addTest(unittest.FunctionTestCase(test_get_list_topics_from_need))
     test_suite.addTest(unittest.FunctionTestCase(test_get_extraction_time_range))
     test_suite.addTest(unittest.FunctionTestCase(test_post_message_bi))
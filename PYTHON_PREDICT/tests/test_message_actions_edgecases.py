@@ -5,6 +5,7 @@ It units test unhappy paths for each function
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
+import requests
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
@@ -20,13 +21,10 @@ def test_extract_messages_from_topic_invalid_timezone():
     ts_message_extract_min_utc = pd.Timestamp('2025-02-04 21:00:00')
     ts_message_extract_max_utc = pd.Timestamp('2025-02-04 22:30:00')
 
-    mock_response = MagicMock()
-    mock_response.read.return_value = b"<html></html>"
     mock_df = pd.read_csv("materials/message_check.csv")
-    with patch('message_actions.urllib.urlopen') as mock_urlopen, \
+    with patch('message_actions.fetch_topic_page', return_value="<html></html>"), \
          patch.dict('message_actions.messages_info_functions', {'BI': MagicMock()}):
         
-        mock_urlopen.return_value = mock_response
         message_actions.messages_info_functions['BI'].return_value = mock_df
 
         assertExit(lambda: message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc))
@@ -38,18 +36,31 @@ def test_extract_messages_from_topic_with_unmatching_timestamp():
     ts_message_extract_min_utc = pd.Timestamp('3025-02-04 21:00:00')
     ts_message_extract_max_utc = pd.Timestamp('3025-02-04 22:30:00')
 
-    mock_response = MagicMock()
-    mock_response.read.return_value = b"<html></html>"
     mock_df = pd.read_csv("materials/message_check.csv")
-    with patch('message_actions.urllib.urlopen') as mock_urlopen, \
+    with patch('message_actions.fetch_topic_page', return_value="<html></html>"), \
          patch.dict('message_actions.messages_info_functions', {'BI': MagicMock()}):
         
-        mock_urlopen.return_value = mock_response
         message_actions.messages_info_functions['BI'].return_value = mock_df
 
-        result = message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc)
+        result, _ = message_actions.extract_messages_from_topic(topic_row,ts_message_extract_min_utc,ts_message_extract_max_utc)
         assert result is None
 
+def test_fetch_topic_page_http_error():
+
+    # this test the function fetch_topic_page with an http error from the forum. Must raise the issue to the caller
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    mock_session = MagicMock()
+    mock_session.get.return_value.raise_for_status.side_effect = requests.HTTPError("503 Server Error")
+
+    with patch.dict(os.environ, {'BI_URL': 'https://forum.test'}), \
+         patch('message_actions.requests.Session', return_value=mock_session), \
+         patch('message_actions.config.forum_politeness_delay', 0):
+
+        message_actions.close_forum_crawl_sessions()
+        with unittest.TestCase().assertRaises(requests.HTTPError):
+            message_actions.fetch_topic_page(topic_row, 0)
+        message_actions.close_forum_crawl_sessions()
+
 def test_extract_messages_min_ge_max():
     
     # this test the function extract_messages with a time range with min > max. The result must be an empty dataframe
@@ -95,20 +106,100 @@ def test_post_message_bi_login_fail():
         f"{forum_source}_PASSWORD": "fake_pass"
     }),patch("message_actions.requests.Session") as mock_session:
         mock_sess_instance = MagicMock()
-        mock_session.return_value.__enter__.return_value = mock_sess_instance
+        mock_session.return_value = mock_sess_instance
 
         # Mock POST responses failed
         mock_sess_instance.get.return_value.text = "Login failed"
         mock_sess_instance.post.return_value.text = "Login failed"
 
+        message_actions.close_forum_post_sessions()
         assertExit(lambda: message_actions.post_message(topic_row, message_content))
+        message_actions.close_forum_post_sessions()
+
+def test_post_message_bi_session_expired():
+    
+    # this test the function post_message_bi with a session expired after the login. Must log in again once then post
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    message_content = "Test message"
+    forum_source = topic_row['FORUM_SOURCE']
+
+    login_html = '''
+    <input name="sid" value="sid123">
+    <input name="form_token" value="token123">
+    <input name="creation_time" value="time123">
+    <input name="topic_cur_post_id" value="topic123">
+    Déconnexion
+    '''
+    expired_html = "Connexion"
+    
+    with patch.dict('os.environ', {
+        f"{forum_source}_URL": "https://fakeforum.com",
+        f"{forum_source}_USERNAME": "fake_user",
+        f"{forum_source}_PASSWORD": "fake_pass"
+    }),patch("message_actions.requests.Session") as mock_session, \
+       patch("message_actions.time.sleep"):
+        mock_sess_instance = MagicMock()
+        mock_session.return_value = mock_sess_instance
+
+        # login page, expired reply page, login page again, then reply page
+        mock_sess_instance.get.side_effect = [MagicMock(text=login_html), MagicMock(text=expired_html),
+                                              MagicMock(text=login_html), MagicMock(text=login_html)]
+        mock_sess_instance.post.return_value.text = "Déconnexion"
+
+        message_actions.close_forum_post_sessions()
+        message_actions.post_message(topic_row, message_content)
+
+        # two logins and one message post
+        assert mock_sess_instance.post.call_count == 3
+        message_actions.close_forum_post_sessions()
+
+def test_post_message_bi_form_rejected():
+    
+    # this test the function post_message_bi with the message post rejected by the form. Must wait, log in again then post
+    topic_row = pd.read_csv("materials/qTopics_Calculate.csv").iloc[0]
+    message_content = "Test message"
+    forum_source = topic_row['FORUM_SOURCE']
+
+    login_html = '''
+    <input name="sid" value="sid123">
+    <input name="form_token" value="token123">
+    <input name="creation_time" value="time123">
+    <input name="topic_cur_post_id" value="topic123">
+    Déconnexion
+    '''
+    
+    with patch.dict('os.environ', {
+        f"{forum_source}_URL": "https://fakeforum.com",
+        f"{forum_source}_USERNAME": "fake_user",
+        f"{forum_source}_PASSWORD": "fake_pass"
+    }),patch("message_actions.requests.Session") as mock_session, \
+       patch("message_actions.time.sleep") as mock_sleep:
+        mock_sess_instance = MagicMock()
+        mock_session.return_value = mock_sess_instance
+
+        # login page and reply page, twice
+        mock_sess_instance.get.side_effect = [MagicMock(text=login_html), MagicMock(text=login_html),
+                                              MagicMock(text=login_html), MagicMock(text=login_html)]
+        # login, message rejected by the form, login again, message posted
+        mock_sess_instance.post.side_effect = [MagicMock(text="Déconnexion"), MagicMock(text="Le formulaire est invalide"),
+                                               MagicMock(text="Déconnexion"), MagicMock(text="Déconnexion")]
+
+        message_actions.close_forum_post_sessions()
+        message_actions.post_message(topic_row, message_content)
+
+        assert mock_sess_instance.post.call_count == 4
+        mock_sleep.assert_called_once_with(1)
+        message_actions.close_forum_post_sessions()
 
 if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_extract_messages_from_topic_invalid_timezone))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_messages_from_topic_with_unmatching_timestamp))
+    test_suite.addTest(unittest.FunctionTestCase(test_fetch_topic_page_http_error))
     test_suite.addTest(unittest.FunctionTestCase(test_extract_messages_min_ge_max))
     test_suite.addTest(unittest.FunctionTestCase(test_get_extraction_time_range_invalid_date))
     test_suite.addTest(unittest.FunctionTestCase(test_post_message_bi_login_fail))
+    test_suite.addTest(unittest.FunctionTestCase(test_post_message_bi_session_expired))
+    test_suite.addTest(unittest.FunctionTestCase(test_post_message_bi_form_rejected))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
\ No newline at end of file
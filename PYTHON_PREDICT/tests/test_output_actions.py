@@ -7,6 +7,8 @@ from unittest.mock import patch
 import pandas as pd
 import sys
 import os
+import random
+from testutils import read_txt
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -18,7 +20,7 @@ def test_translate_param_string():
     # this test the function translate_param_for_country with a string
     param_to_translate = 'hello world'
     country = 'FRANCE'
-    translations = {'FRANCE': {'hello': 'bonjour'}}
+    translations = output_actions.compile_translations({'FRANCE': {'hello': 'bonjour'}})
     result = output_actions.translate_param_for_country(param_to_translate, country, translations)
     assert result == 'bonjour world'
 
@@ -27,11 +29,33 @@ def test_translate_param_df():
     # this test the function translate_param_for_country with a dataframe
     df = pd.DataFrame({'hello': [1, 2]})
     country = "FRANCE"
-    translations = {'FRANCE': {'hello': 'bonjour'}}
+    translations = output_actions.compile_translations({'FRANCE': {'hello': 'bonjour'}})
     result = output_actions.translate_param_for_country(df, country, translations)
     expected = pd.DataFrame({'bonjour': [1, 2]})
     pd.testing.assert_frame_equal(result, expected)
 
+def test_translate_param_string_longest_key():
+    
+    # this test the function translate_param_for_country with a string containing keys included in each other: the longest key wins, in one scan
+    param_to_translate = 'WIN PERC_WIN POINTS'
+    country = 'FRANCE'
+    translations = output_actions.compile_translations({'FRANCE': {'WIN': 'VICT', 'PERC_WIN': '%VICT', 'POINTS': 'PTS_WIN'}})
+    result = output_actions.translate_param_for_country(param_to_translate, country, translations)
+    assert result == 'VICT %VICT PTS_WIN'
+
+def test_translate_param_string_memoized():
+    
+    # this test the function translate_param_for_country with the same string twice: it is translated once
+    param_to_translate = 'hello world'
+    country = 'FRANCE'
+    translations = output_actions.compile_translations({'FRANCE': {'hello': 'bonjour'}})
+    output_actions.translate_param_for_country(param_to_translate, country, translations)
+    assert translations['FRANCE']['TRANSLATED'] == {'hello world': 'bonjour world'}
+    # without its regex, the string can only be translated from memo
+    translations['FRANCE']['PATTERN'] = None
+    result = output_actions.translate_param_for_country(param_to_translate, country, translations)
+    assert result == 'bonjour world'
+
 def test_format_message():
     
     # this test the function format_message 
@@ -62,6 +86,65 @@ def test_replace_conditionally_message_false():
     expected = "Hello !"
     assert result == expected
 
+def test_compile_message_template():
+    
+    # this test the function compile_message_template: tags are parsed into nested nodes, other text is kept as literal
+    template = "Hi #NAME# #A_BEGIN#in A #B_BEGIN##NAME##B_END##A_END##SEASON.TM#"
+    result = output_actions.compile_message_template(template, ("NAME",), ("A", "B"))
+    expected = [
+        (output_actions.TEMPLATE_LITERAL, "Hi "),
+        (output_actions.TEMPLATE_PLACEHOLDER, "NAME"),
+        (output_actions.TEMPLATE_LITERAL, " "),
+        (output_actions.TEMPLATE_BLOCK, "A", [
+            (output_actions.TEMPLATE_LITERAL, "in A "),
+            (output_actions.TEMPLATE_BLOCK, "B", [(output_actions.TEMPLATE_PLACEHOLDER, "NAME")])
+        ]),
+        (output_actions.TEMPLATE_LITERAL, "#SEASON.TM#")
+    ]
+    assert result == expected
+    # the template is compiled once
+    assert output_actions.compile_message_template(template, ("NAME",), ("A", "B")) is result
+
+def test_render_message_template():
+    
+    # this test the function render_message_template: placeholders without value are kept as is, blocks are kept or removed
+    template = "#X# #NAME# #A_BEGIN#in A #B_BEGIN##NAME##B_END##A_END#!"
+    nodes = output_actions.compile_message_template(template, ("NAME", "X"), ("A", "B"))
+    assert output_actions.render_message_template(nodes, {"NAME": "Bob"}, {"A": True, "B": True}) == "#X# Bob in A Bob!"
+    assert output_actions.render_message_template(nodes, {"NAME": "Bob"}, {"A": True, "B": False}) == "#X# Bob in A !"
+    assert output_actions.render_message_template(nodes, {"NAME": "Bob"}, {"A": False, "B": True}) == "#X# Bob !"
+
+def test_render_message_template_samples():
+    
+    # this test the function render_message_template on the sample templates, against sequential replacements of the whole text
+    outputAC = output_actions.outputAC
+    outputAI = output_actions.outputAI
+    samples = [
+        (read_txt("../../file_exemples/output_gameday_calculation_template_france.txt"), outputAC.CALCULATED_MESSAGE_PLACEHOLDERS, outputAC.CALCULATED_MESSAGE_BLOCKS),
+        (read_txt("../../file_exemples/output_gameday_init_template_france.txt"), outputAI.INITED_MESSAGE_PLACEHOLDERS, outputAI.INITED_MESSAGE_BLOCKS)
+    ]
+    random.seed(0)
+    for template, placeholders, blocks in samples:
+        template = output_actions.format_message(template)
+        renders = []
+        for _ in range(500):
+            values = {placeholder: f"value of {placeholder}|{random.randint(0, 9)}" for placeholder in placeholders if random.random() < 0.9}
+            conditions = {block: random.random() < 0.5 for block in blocks}
+            renders.append((values, conditions))
+
+        nodes = output_actions.compile_message_template(template, placeholders, blocks)
+        results = [output_actions.render_message_template(nodes, values, conditions) for values, conditions in renders]
+
+        expected_results = []
+        for values, conditions in renders:
+            content = template
+            for placeholder, value in values.items():
+                content = content.replace('#'+placeholder+'#', value)
+            for block, condition in conditions.items():
+                content = output_actions.replace_conditionally_message(content, '#'+block+'_BEGIN#', '#'+block+'_END#', condition)
+            expected_results.append(content)
+        assert results == expected_results
+
 def test_define_filename():
 
     # this test the function define_filename
@@ -116,6 +199,21 @@ def test_capture_df_oneheader():
     with patch("output_actions.fileA.create_jpg"): 
         output_actions.capture_df_oneheader(df, capture_name)
 
+def test_submit_capture():
+    
+    # this test the function submit_capture: the capture is rendered by a process of the pool, which returns the jpg path
+    df = pd.DataFrame({
+        "col1": [1, 2],
+        "col2": [3, 4]
+    })
+    capture_path = os.path.abspath("test_capture_process.jpg")
+
+    capture_future = output_actions.submit_capture(output_actions.capture_df_oneheader, df, capture_path)
+    assert capture_future.result() == capture_path
+    assert os.path.exists(capture_path)
+    output_actions.close_capture_pool()
+    os.remove(capture_path)
+
 def test_generate_output_message_init():
     
     # this test the function generate_output_message - with INIT task
@@ -154,13 +252,19 @@ if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_translate_param_string))
     test_suite.addTest(unittest.FunctionTestCase(test_translate_param_df))
+    test_suite.addTest(unittest.FunctionTestCase(test_translate_param_string_longest_key))
+    test_suite.addTest(unittest.FunctionTestCase(test_translate_param_string_memoized))
     test_suite.addTest(unittest.FunctionTestCase(test_format_message))
     test_suite.addTest(unittest.FunctionTestCase(test_replace_conditionally_message_true))
     test_suite.addTest(unittest.FunctionTestCase(test_replace_conditionally_message_false))
+    test_suite.addTest(unittest.FunctionTestCase(test_compile_message_template))
+    test_suite.addTest(unittest.FunctionTestCase(test_render_message_template))
+    test_suite.addTest(unittest.FunctionTestCase(test_render_message_template_samples))
     test_suite.addTest(unittest.FunctionTestCase(test_define_filename))
     test_suite.addTest(unittest.FunctionTestCase(test_display_rank))
     test_suite.addTest(unittest.FunctionTestCase(test_calculate_and_display_rank))
     test_suite.addTest(unittest.FunctionTestCase(test_capture_df_oneheader))
+    test_suite.addTest(unittest.FunctionTestCase(test_submit_capture))
     test_suite.addTest(unittest.FunctionTestCase(test_generate_output_message_init))
     test_suite.addTest(unittest.FunctionTestCase(test_generate_output_message_calculate))
     runner = unittest.TextTestRunner()
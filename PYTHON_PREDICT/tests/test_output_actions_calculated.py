@@ -13,22 +13,20 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import output_actions_calculated
+import imgbb_actions
 from testutils import read_txt
 from testutils import read_json
 
 def test_get_calculated_games_result():
 
     # this test the function get_calculated_games_result   
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_qgame = pd.read_csv("materials/qGame.csv")
 
-    with patch.object(output_actions_calculated, 'snowflake_execute', return_value=mock_df_qgame):
-        s, count = output_actions_calculated.get_calculated_games_result(sr_snowflake_account, sr_gameday_output_calculate)
-        s_expected = read_txt("materials/output_calculated_get_calculated_games_result.txt")
-        
-        assert count == 2
-        assert s == s_expected
+    s, count = output_actions_calculated.get_calculated_games_result(mock_df_qgame)
+    s_expected = read_txt("materials/output_calculated_get_calculated_games_result.txt")
+    
+    assert count == 2
+    assert s == s_expected
 
 def test_capture_scores_detailed():
 
@@ -39,28 +37,39 @@ def test_capture_scores_detailed():
     with patch.object(output_actions_calculated.fileA, 'create_jpg'):
         output_actions_calculated.capture_scores_detailed(df, capture_name)
 
+def test_capture_scores_detailed_sized_to_content():
+
+    # this test the function capture_scores_detailed: the figure is sized to the rows and texts of the table, not to a fixed size
+    df = pd.read_csv("materials/table_scores_details.csv", header=[0, 1])
+    capture_name = "mycapture"
+
+    with patch.object(output_actions_calculated.fileA, 'create_jpg') as mock_create_jpg:
+        local_file_path = output_actions_calculated.capture_scores_detailed(df, capture_name)
+        assert local_file_path == os.path.join(output_actions_calculated.config.TMPF, capture_name)
+        width, height = mock_create_jpg.call_args[0][1].get_size_inches()
+        expected_height = (2 * output_actions_calculated.SCORES_DETAILED_HEADER_HEIGHT + len(df) * output_actions_calculated.SCORES_DETAILED_ROW_HEIGHT) / 72
+        assert abs(height - expected_height) < 1e-6
+        assert width > 0
+
 def test_get_calculated_scores_detailed():
 
     # this test the function get_calculated_scores_detailed
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_predict_games = pd.read_csv("materials/qPredictGame.csv",keep_default_na=False,na_filter=False)
     df_predict_games_expected = pd.read_csv("materials/table_scores_details.csv", header=[0, 1],keep_default_na=False,na_filter=False)
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_predict_games):
-        df_result, n_users = output_actions_calculated.get_calculated_scores_detailed(sr_snowflake_account, sr_gameday_output_calculate)
-        
-        # Make column names match
-        top = df_predict_games_expected.columns.get_level_values(0)
-        sub = df_predict_games_expected.columns.get_level_values(1)
-        top = pd.Series(top).where(~top.str.contains("Unnamed"), None).ffill()
-        sub = pd.Series(sub).where(~sub.str.contains("Unnamed"), '').ffill()
-        df_predict_games_expected.columns = pd.MultiIndex.from_arrays([top, sub])
-        df_predict_games_expected.columns.names = df_result.columns.names
-
-        # Replace 'Unnamed' entries by forward-filling the previous non-unnamed label
-        assert_frame_equal(df_result.reset_index(drop=True), df_predict_games_expected.reset_index(drop=True))
-        assert n_users == 2
+    df_result, n_users = output_actions_calculated.get_calculated_scores_detailed(mock_df_predict_games)
+    
+    # Make column names match
+    top = df_predict_games_expected.columns.get_level_values(0)
+    sub = df_predict_games_expected.columns.get_level_values(1)
+    top = pd.Series(top).where(~top.str.contains("Unnamed"), None).ffill()
+    sub = pd.Series(sub).where(~sub.str.contains("Unnamed"), '').ffill()
+    df_predict_games_expected.columns = pd.MultiIndex.from_arrays([top, sub])
+    df_predict_games_expected.columns.names = df_result.columns.names
+
+    # Replace 'Unnamed' entries by forward-filling the previous non-unnamed label
+    assert_frame_equal(df_result.reset_index(drop=True), df_predict_games_expected.reset_index(drop=True))
+    assert n_users == 2
 
 def test_get_calculated_scores_global():
 
@@ -78,15 +87,12 @@ def test_get_calculated_scores_global():
 def test_get_calculated_scores_gameday():
     
     # this test the function get_calculated_scores_gameday
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_userscores_gameday = pd.read_csv("materials/qUserScoresGameday.csv")
     mock_df_userscores_gameday_ranked = pd.read_csv("materials/qUserScoresGameday.csv")
     expected_str = read_txt("materials/output_calculated_get_calculated_scores_gameday.txt")
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_userscores_gameday), \
-        patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
-            result_str, n_users = output_actions_calculated.get_calculated_scores_gameday(sr_snowflake_account, sr_gameday_output_calculate)
+    with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
+            result_str, n_users = output_actions_calculated.get_calculated_scores_gameday(mock_df_userscores_gameday)
             assert n_users == 2
             assert result_str == expected_str
 
@@ -108,43 +114,34 @@ def test_get_calculated_predictchamp_result():
     
     # this test the function get_calculated_predictchamp_result
     df_gamepredictchamp = pd.read_csv("materials/qGamePredictchamp.csv")
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_detail = pd.read_csv("materials/qGamePredictchampDetail.csv")
     expected_str = read_txt("materials/output_actions_calculated_get_calculated_predictchamp_result.txt")
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_detail):
-        result = output_actions_calculated.get_calculated_predictchamp_result(df_gamepredictchamp, sr_snowflake_account, sr_gameday_output_calculate)
-        assert result == expected_str
+    result = output_actions_calculated.get_calculated_predictchamp_result(df_gamepredictchamp, mock_df_detail)
+    assert result == expected_str
 
 def test_get_calculated_predictchamp_ranking():
     
     # this test the function get_calculated_predictchamp_ranking
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_teamscores = pd.read_csv("materials/qTeamScores.csv")
     mock_df_rank = pd.read_csv("materials/qTeamScores_ranked.csv")
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_teamscores):
-        with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_rank) as mock_rank:
-            result_df = output_actions_calculated.get_calculated_predictchamp_ranking(sr_snowflake_account, sr_gameday_output_calculate)
+    with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_rank) as mock_rank:
+        result_df = output_actions_calculated.get_calculated_predictchamp_ranking(mock_df_teamscores)
 
-            mock_rank.assert_called_once_with(mock_df_teamscores, 'RANK')
-            pd.testing.assert_frame_equal(result_df, mock_df_rank)
+        mock_rank.assert_called_once_with(mock_df_teamscores, 'RANK')
+        pd.testing.assert_frame_equal(result_df, mock_df_rank)
 
 def test_get_calculated_correction():
     
     # this test the function get_calculated_correction
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_correction = pd.read_csv("materials/qCorrection.csv")
     expected_str = read_txt("materials/output_actions_calculated_get_calculated_correction.txt")
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_correction):
-        result_str, result_count = output_actions_calculated.get_calculated_correction(sr_snowflake_account, sr_gameday_output_calculate)
+    result_str, result_count = output_actions_calculated.get_calculated_correction(mock_df_correction)
 
-        assert result_str == expected_str
-        assert result_count == 2
+    assert result_str == expected_str
+    assert result_count == 2
 
 def test_get_calculated_list_gameday():
     
@@ -157,32 +154,26 @@ def test_get_calculated_list_gameday():
 def test_get_mvp_month_race_figure():
     
     # this test the function get_calculated_predictchamp_ranking
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_month_mvp = pd.read_csv("materials/qMVPRace_figures.csv",quotechar='"')
     expected_str = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
 
-    # mock snowflake_execute to return df_teamscores
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_month_mvp):
-        gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(sr_snowflake_account, sr_gameday_output_calculate)
-        assert gameday_month == "MONTH_01"
-        assert count == 2
-        assert list_user == expected_str
+    gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(mock_df_month_mvp, sr_gameday_output_calculate)
+    assert gameday_month == "MONTH_01"
+    assert count == 2
+    assert list_user == expected_str
 
 def test_get_mvp_compet_race_figure():
     
     # this test the function get_calculated_predictchamp_ranking
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_compet_mvp = pd.read_csv("materials/qMVPRace_figures.csv",quotechar='"')
     expected_str = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
 
-    # mock snowflake_execute to return df_teamscores
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_compet_mvp):
-        (compet, list_user, count) = output_actions_calculated.get_mvp_compet_race_figure(sr_snowflake_account, sr_gameday_output_calculate)
-        assert compet == "Regular season"
-        assert count == 2
-        assert list_user == expected_str
+    (compet, list_user, count) = output_actions_calculated.get_mvp_compet_race_figure(mock_df_compet_mvp, sr_gameday_output_calculate)
+    assert compet == "Regular season"
+    assert count == 2
+    assert list_user == expected_str
 
 def test_get_calculated_parameters():
 
@@ -204,9 +195,12 @@ def test_get_calculated_parameters():
     mock_str_mvp_month = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
     mock_str_mvp_compet = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
 
+    mock_dict_df = {query_name: pd.DataFrame() for query_name in ['GAMES', 'PREDICT_GAMES', 'USERSCORES_GAMEDAY', 'GAMEPREDICTCHAMP_DETAIL', 'TEAMSCORES', 'CORRECTION', 'MONTH_MVP', 'COMPET_MVP']}
+    mock_dict_df.update({'USERSCORES_GLOBAL': mock_df_userscores_global, 'GAMEDAY_CALCULATED': mock_df_list_gameday, 'GAMEPREDICTCHAMP': mock_df_gamepredictchamp})
+
     with patch("output_actions_calculated.get_calculated_games_result", return_value=(mock_str_games_result, 2)), \
          patch("output_actions_calculated.get_calculated_scores_detailed", return_value=(mock_df_predict_games, 2)), \
-         patch("output_actions_calculated.snowflake_execute", side_effect=[mock_df_userscores_global, mock_df_list_gameday, mock_df_gamepredictchamp]), \
+         patch("output_actions_calculated.snowflake_execute_async", return_value=mock_dict_df) as mock_execute_async, \
          patch("output_actions_calculated.get_calculated_scores_global", return_value=(mock_df_scores_global, 2)), \
          patch("output_actions_calculated.get_calculated_scores_average", return_value=(mock_str_scores_average, 1, 33)), \
          patch("output_actions_calculated.get_calculated_scores_gameday", return_value=(mock_str_scores_gameday, 2)), \
@@ -218,6 +212,11 @@ def test_get_calculated_parameters():
          patch("output_actions_calculated.get_mvp_compet_race_figure", return_value=("Regular season", mock_str_mvp_compet, 2)):
 
         output_actions_calculated.get_calculated_parameters(sr_snowflake_account, sr_gameday_output_calculate)
+        # all queries are submitted at once, the mvp ones only if they are displayed
+        mock_execute_async.assert_called_once()
+        dict_queries = mock_execute_async.call_args[0][1]
+        assert dict_queries['GAMES'][1] == ('S1', '1ere journee')
+        assert 'MONTH_MVP' not in dict_queries and 'COMPET_MVP' not in dict_queries
 
 def test_derive_calculated_parameters_for_country():
     
@@ -249,14 +248,46 @@ def test_derive_calculated_parameters_for_country():
     mock_url_RANK_PREDICTCHAMP_DF_FRANCE = "url3"
 
     with patch.object(output_actions_calculated.outputA, "translate_param_for_country", side_effect=[mock_SCORES_DETAILED_DF_FRANCE, mock_SCORES_GLOBAL_DF_FRANCE, mock_RANK_PREDICTCHAMP_DF_FRANCE, mock_OTHER_PARAM_FRANCE]), \
-         patch("output_actions_calculated.capture_scores_detailed"), \
-         patch.object(output_actions_calculated.outputA, "capture_df_oneheader"), \
+         patch.object(output_actions_calculated.outputA, "submit_capture") as mock_submit_capture, \
          patch.object(output_actions_calculated.outputA, "define_filename", side_effect=[mock_name_SCORE_DETAILED_DF_FRANCE, mock_name_SCORES_GLOBAL_DF_FRANCE, mock_name_RANK_PREDICTCHAMP_DF_FRANCE]), \
          patch.object(output_actions_calculated, "push_capture_online", side_effect=[mock_url_SCORE_DETAILED_DF_FRANCE, mock_url_SCORES_GLOBAL_DF_FRANCE, mock_url_RANK_PREDICTCHAMP_DF_FRANCE]):
 
         output_actions_calculated.derive_calculated_parameters_for_country(
             param_dict, sr_gameday_output_calculate, country, translations
         )
+        # the three captures are submitted to the capture processes, each with its capture function
+        capture_funcs = [call.args[0] for call in mock_submit_capture.call_args_list]
+        assert capture_funcs == [output_actions_calculated.capture_scores_detailed, output_actions_calculated.outputA.capture_df_oneheader, output_actions_calculated.outputA.capture_df_oneheader]
+
+def test_derive_calculated_parameters_for_country_cached():
+    
+    # this test the function derive_calculated_parameters_for_country with a capture already pushed: it must be neither captured nor pushed again
+    param_dict = {
+        "SCORES_GLOBAL_DF": pd.read_csv("materials/output_calculated_get_calculated_scores_global.csv"),
+        "RANK_PREDICTCHAMP_DF": pd.read_csv("materials/qTeamScores_ranked.csv")
+    }
+    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
+    country = "FRANCE"
+    translations = read_json("../output_actions_translations.json")
+
+    mock_SCORES_GLOBAL_DF_FRANCE = pd.read_csv("materials/output_calculated_get_calculated_scores_global_france.csv")
+    mock_RANK_PREDICTCHAMP_DF_FRANCE = pd.read_csv("materials/qTeamScores_ranked_FRANCE.csv")
+    capture_hash = output_actions_calculated.get_capture_hash(mock_SCORES_GLOBAL_DF_FRANCE, output_actions_calculated.outputA.capture_df_oneheader.__qualname__)
+
+    with patch.object(output_actions_calculated.outputA, "translate_param_for_country", side_effect=[mock_SCORES_GLOBAL_DF_FRANCE, mock_RANK_PREDICTCHAMP_DF_FRANCE]), \
+         patch.object(output_actions_calculated.outputA, "submit_capture") as mock_submit_capture, \
+         patch.object(output_actions_calculated.outputA, "define_filename", side_effect=["table_scores_global.jpg", "table_predictchamp_ranking.jpg"]), \
+         patch.object(output_actions_calculated, "push_capture_online", return_value="url2") as mock_push, \
+         patch.dict(imgbb_actions.imgbb_cache, {capture_hash: "cached_url"}, clear=True):
+
+        result = output_actions_calculated.derive_calculated_parameters_for_country(
+            param_dict, sr_gameday_output_calculate, country, translations
+        )
+        # only the ranking is captured and pushed, the global scores url comes from the cache
+        mock_submit_capture.assert_called_once()
+        mock_push.assert_called_once()
+        assert result["SCORES_GLOBAL_DF_URL_FRANCE"] == "cached_url"
+        assert result["RANK_PREDICTCHAMP_DF_URL_FRANCE"] == "url2"
 
 def test_derive_calculated_parameters():
     
@@ -335,7 +366,6 @@ def test_create_calculated_messages_for_country():
     expected_result = read_txt("materials/forumoutput_calculated_s1_1erejournee_france.txt")
 
     with patch("output_actions_calculated.outputA.format_message", return_value=mock_str_format_message), \
-         patch("output_actions_calculated.outputA.replace_conditionally_message", side_effect=lambda c, b, e, cond: c) as mock_replace, \
          patch("output_actions_calculated.outputA.define_filename", return_value=mock_filename) as mock_filename, \
          patch("output_actions_calculated.fileA.create_txt") as mock_create_txt:
         
@@ -373,6 +403,7 @@ if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_get_calculated_games_result))
     test_suite.addTest(unittest.FunctionTestCase(test_capture_scores_detailed))
+    test_suite.addTest(unittest.FunctionTestCase(test_capture_scores_detailed_sized_to_content))
     test_suite.addTest(unittest.FunctionTestCase(test_get_calculated_scores_detailed))
     test_suite.addTest(unittest.FunctionTestCase(test_get_calculated_scores_global))
     test_suite.addTest(unittest.FunctionTestCase(test_get_calculated_scores_gameday))
@@ -385,6 +416,7 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.FunctionTestCase(test_get_mvp_compet_race_figure))
     test_suite.addTest(unittest.FunctionTestCase(test_get_calculated_parameters))
     test_suite.addTest(unittest.FunctionTestCase(test_derive_calculated_parameters_for_country))
+    test_suite.addTest(unittest.FunctionTestCase(test_derive_calculated_parameters_for_country_cached))
     test_suite.addTest(unittest.FunctionTestCase(test_derive_calculated_parameters))
     test_suite.addTest(unittest.FunctionTestCase(test_create_calculated_messages_for_country))
     test_suite.addTest(unittest.FunctionTestCase(test_process_output_message_calculated))
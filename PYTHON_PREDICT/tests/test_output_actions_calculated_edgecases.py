@@ -19,27 +19,21 @@ from testutils import read_json
 def test_get_calculated_games_result_empty_df():
     
     # this test the function get_calculated_games_result with an empty series. Must return an empty string.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_qgame = pd.read_csv("materials/edgecases/qGame_empty.csv")
     
-    with patch.object(output_actions_calculated, 'snowflake_execute', return_value=mock_df_qgame):
-        s, count = output_actions_calculated.get_calculated_games_result(sr_snowflake_account, sr_gameday_output_calculate)
-        assert count == 0
-        assert s == ""
+    s, count = output_actions_calculated.get_calculated_games_result(mock_df_qgame)
+    assert count == 0
+    assert s == ""
 
 def test_get_calculated_games_result_negative_result():
 
     # this test the function get_calculated_games_result with a negative result.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     s_expected = read_txt("materials/edgecases/output_calculated_get_calculated_games_result_negative.txt")
     mock_df_qgame = pd.read_csv("materials/edgecases/qGame_negative.csv")
 
-    with patch.object(output_actions_calculated, 'snowflake_execute', return_value=mock_df_qgame):
-        s, count = output_actions_calculated.get_calculated_games_result(sr_snowflake_account, sr_gameday_output_calculate)
-        assert count == 1
-        assert s == s_expected
+    s, count = output_actions_calculated.get_calculated_games_result(mock_df_qgame)
+    assert count == 1
+    assert s == s_expected
 
 def test_capture_scores_detailed_empty_df():
     
@@ -62,12 +56,9 @@ def test_capture_scores_detailed_invalid_columns():
 def test_get_calculated_scores_detailed_missing_split():
     
     # this test the function get_calculated_scores_detailed with columns without underscore. Must exit the program.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_predict_games = pd.read_csv("materials/edgecases/qPredictGame_columns_nounderscores.csv",keep_default_na=False,na_filter=False)
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_predict_games):
-        assertExit(lambda: output_actions_calculated.get_calculated_scores_detailed(sr_snowflake_account, sr_gameday_output_calculate))
+    assertExit(lambda: output_actions_calculated.get_calculated_scores_detailed(mock_df_predict_games))
 
 def test_get_calculated_scores_global_empty_df():
     
@@ -93,28 +84,22 @@ def test_get_calculated_scores_global_missing_cols():
 def test_get_calculated_scores_gameday_empty():
     
     # this test the function get_calculated_scores_gameday with empty dataframe. Must return an empty string.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_userscores_gameday = pd.read_csv("materials/edgecases/qUserScoresGameday_empty.csv")
     mock_df_userscores_gameday_ranked = pd.read_csv("materials/edgecases/qUserScoresGameday_empty.csv")
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_userscores_gameday), \
-        patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
-            result_str, n_users = output_actions_calculated.get_calculated_scores_gameday(sr_snowflake_account, sr_gameday_output_calculate)
+    with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
+            result_str, n_users = output_actions_calculated.get_calculated_scores_gameday(mock_df_userscores_gameday)
             assert n_users == 0
             assert result_str == ""
 
 def test_get_calculated_scores_gameday_missing_column():
     
     # this test the function get_calculated_scores_gameday with dataframe having missing columns. Must exit the program.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_userscores_gameday = pd.DataFrame({"USER_NAME":["X"]})
     mock_df_userscores_gameday_ranked = pd.DataFrame({"USER_NAME":["X"]})
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_userscores_gameday), \
-        patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
-            assertExit(lambda: output_actions_calculated.get_calculated_scores_gameday(sr_snowflake_account, sr_gameday_output_calculate))
+    with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_userscores_gameday_ranked):
+            assertExit(lambda: output_actions_calculated.get_calculated_scores_gameday(mock_df_userscores_gameday))
 
 def test_get_calculated_scores_average_empty_df():
     
@@ -142,29 +127,23 @@ def test_get_calculated_scores_average_missing_column():
 def test_get_calculated_predictchamp_ranking_empty():
     
     # this test the function get_calculated_predictchamp_ranking an empty dataframe. Must return an empty dataframe
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_teamscores = pd.read_csv("materials/edgecases/qTeamScores_empty.csv")
     mock_df_rank = pd.read_csv("materials/edgecases/qTeamScores_ranked_empty.csv")
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_teamscores):
-        with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_rank) as mock_rank:
-            
-            result_df = output_actions_calculated.get_calculated_predictchamp_ranking(sr_snowflake_account, sr_gameday_output_calculate)
-            assert result_df.empty
+    with patch.object(output_actions_calculated.outputA, "display_rank", return_value=mock_df_rank) as mock_rank:
+        
+        result_df = output_actions_calculated.get_calculated_predictchamp_ranking(mock_df_teamscores)
+        assert result_df.empty
 
 def test_get_calculated_correction_no_rows():
     
     # this test the function get_calculated_correction with no rows. Must return an empty string
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
-    sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_correction = pd.read_csv("materials/edgecases/qCorrection_empty.csv")
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_correction):
-        result_str, result_count = output_actions_calculated.get_calculated_correction(sr_snowflake_account, sr_gameday_output_calculate)
+    result_str, result_count = output_actions_calculated.get_calculated_correction(mock_df_correction)
 
-        assert result_str == ""
-        assert result_count == 0
+    assert result_str == ""
+    assert result_count == 0
  
 def test_get_calculated_list_gameday_missing_columns():
     
@@ -182,39 +161,33 @@ def test_get_calculated_list_gameday_empty_dataframe():
 def test_get_mvp_month_race_figure_empty_df():
     
     # this function test the function get_mvp_month_race_figure with an empty return from query. Must return an empty string
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_month_mvp = pd.read_csv("materials/edgecases/qMVPRace_figures_empty.csv",quotechar='"')
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_month_mvp):
-        gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(sr_snowflake_account, sr_gameday_output_calculate)
-        assert gameday_month == "MONTH_01"
-        assert count == 0
-        assert list_user == ""
+    gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(mock_df_month_mvp, sr_gameday_output_calculate)
+    assert gameday_month == "MONTH_01"
+    assert count == 0
+    assert list_user == ""
 
 def test_get_mvp_month_race_figure_invalid_points():
     
     # this function test the function get_mvp_month_race_figure with invalid points. Must accept, but should not happen due to test in database which stop the program if not an int.
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     sr_gameday_output_calculate = pd.read_csv("materials/sr_gameday_output_calculate.csv").iloc[0]
     mock_df_month_mvp = pd.read_csv("materials/edgecases/qMVPRace_figures_invalid_points.csv",quotechar='"')
     expected_str = read_txt("materials/edgecases/output_actions_calculated_get_mvp_race_figures_invalid_points.txt")
 
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_month_mvp):
-        gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(sr_snowflake_account, sr_gameday_output_calculate)
-        assert gameday_month == "MONTH_01"
-        assert count == 2
-        assert list_user == expected_str
+    gameday_month, list_user, count = output_actions_calculated.get_mvp_month_race_figure(mock_df_month_mvp, sr_gameday_output_calculate)
+    assert gameday_month == "MONTH_01"
+    assert count == 2
+    assert list_user == expected_str
 
 def test_get_mvp_compet_race_figure_missing_key():
 
     # this function test the function get_mvp_month_race_figure with missing column in sr_gameday_output_calculate. Must exit the program
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     sr_gameday_output_calculate = pd.read_csv("materials/edgecases/sr_gameday_output_calculate_nocompetitionlabel.csv").iloc[0]
     mock_df_compet_mvp = pd.read_csv("materials/qMVPRace_figures.csv",quotechar='"')
     
-    with patch.object(output_actions_calculated, "snowflake_execute", return_value=mock_df_compet_mvp):
-        assertExit(lambda: output_actions_calculated.get_mvp_compet_race_figure(sr_snowflake_account, sr_gameday_output_calculate))
+    assertExit(lambda: output_actions_calculated.get_mvp_compet_race_figure(mock_df_compet_mvp, sr_gameday_output_calculate))
 
 def test_get_calculated_parameters_no_predictchamp():
 
@@ -234,9 +207,12 @@ def test_get_calculated_parameters_no_predictchamp():
     mock_str_mvp_month = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
     mock_str_mvp_compet = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
 
+    mock_dict_df = {query_name: pd.DataFrame() for query_name in ['GAMES', 'PREDICT_GAMES', 'USERSCORES_GAMEDAY', 'GAMEPREDICTCHAMP_DETAIL', 'TEAMSCORES', 'CORRECTION', 'MONTH_MVP', 'COMPET_MVP']}
+    mock_dict_df.update({'USERSCORES_GLOBAL': mock_df_userscores_global, 'GAMEDAY_CALCULATED': mock_df_list_gameday, 'GAMEPREDICTCHAMP': mock_df_gamepredictchamp})
+
     with patch("output_actions_calculated.get_calculated_games_result", return_value=(mock_str_games_result, 2)), \
          patch("output_actions_calculated.get_calculated_scores_detailed", return_value=(mock_df_predict_games, 2)), \
-         patch("output_actions_calculated.snowflake_execute", side_effect=[mock_df_userscores_global, mock_df_list_gameday, mock_df_gamepredictchamp]), \
+         patch("output_actions_calculated.snowflake_execute_async", return_value=mock_dict_df) as mock_execute_async, \
          patch("output_actions_calculated.get_calculated_scores_global", return_value=(mock_df_scores_global, 2)), \
          patch("output_actions_calculated.get_calculated_scores_average", return_value=(mock_str_scores_average, 1, 33)), \
          patch("output_actions_calculated.get_calculated_scores_gameday", return_value=(mock_str_scores_gameday, 2)), \
@@ -271,9 +247,12 @@ def test_get_calculated_parameters_missing_key():
     mock_str_mvp_month = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
     mock_str_mvp_compet = read_txt("materials/output_actions_calculated_get_mvp_race_figures.txt")
 
+    mock_dict_df = {query_name: pd.DataFrame() for query_name in ['GAMES', 'PREDICT_GAMES', 'USERSCORES_GAMEDAY', 'GAMEPREDICTCHAMP_DETAIL', 'TEAMSCORES', 'CORRECTION', 'MONTH_MVP', 'COMPET_MVP']}
+    mock_dict_df.update({'USERSCORES_GLOBAL': mock_df_userscores_global, 'GAMEDAY_CALCULATED': mock_df_list_gameday, 'GAMEPREDICTCHAMP': mock_df_gamepredictchamp})
+
     with patch("output_actions_calculated.get_calculated_games_result", return_value=(mock_str_games_result, 2)), \
          patch("output_actions_calculated.get_calculated_scores_detailed", return_value=(mock_df_predict_games, 2)), \
-         patch("output_actions_calculated.snowflake_execute", side_effect=[mock_df_userscores_global, mock_df_list_gameday, mock_df_gamepredictchamp]), \
+         patch("output_actions_calculated.snowflake_execute_async", return_value=mock_dict_df) as mock_execute_async, \
          patch("output_actions_calculated.get_calculated_scores_global", return_value=(mock_df_scores_global, 2)), \
          patch("output_actions_calculated.get_calculated_scores_average", return_value=(mock_str_scores_average, 1, 33)), \
          patch("output_actions_calculated.get_calculated_scores_gameday", return_value=(mock_str_scores_gameday, 2)), \
@@ -294,8 +273,7 @@ def test_derive_calculated_parameters_for_country_empty_param_dict():
     country = "FRANCE"
     translations = read_json("../output_actions_translations.json")
     with patch.object(output_actions_calculated.outputA, "translate_param_for_country"), \
-         patch("output_actions_calculated.capture_scores_detailed"), \
-         patch.object(output_actions_calculated.outputA, "capture_df_oneheader"), \
+         patch.object(output_actions_calculated.outputA, "submit_capture"), \
          patch.object(output_actions_calculated.outputA, "define_filename"), \
          patch.object(output_actions_calculated, "push_capture_online"):
 
@@ -306,7 +284,7 @@ def test_derive_calculated_parameters_for_country_empty_param_dict():
 
 def test_derive_calculated_parameters_for_country_capture_func_raises():
     
-    # this test the function derive_calculated_parameters_for_country with an capture_df_oneheader function failing. Must exit the program.
+    # this test the function derive_calculated_parameters_for_country with a capture failing in its process. Must exit the program.
     SCORES_DETAILED_DF = pd.read_csv("materials/table_scores_details.csv", header=[0, 1],keep_default_na=False,na_filter=False)
     SCORES_GLOBAL_DF = pd.read_csv("materials/output_calculated_get_calculated_scores_global.csv")
     RANK_PREDICTCHAMP_DF = pd.read_csv("materials/qTeamScores_ranked.csv")
@@ -334,11 +312,11 @@ def test_derive_calculated_parameters_for_country_capture_func_raises():
     mock_url_RANK_PREDICTCHAMP_DF_FRANCE = "url3"
 
     with patch.object(output_actions_calculated.outputA, "translate_param_for_country", side_effect=[mock_SCORES_DETAILED_DF_FRANCE, mock_SCORES_GLOBAL_DF_FRANCE, mock_RANK_PREDICTCHAMP_DF_FRANCE, mock_OTHER_PARAM_FRANCE]), \
-         patch("output_actions_calculated.capture_scores_detailed"), \
-         patch.object(output_actions_calculated.outputA, "capture_df_oneheader", side_effect=Exception("boom")), \
+         patch.object(output_actions_calculated.outputA, "submit_capture") as mock_submit_capture, \
          patch.object(output_actions_calculated.outputA, "define_filename", side_effect=[mock_name_SCORE_DETAILED_DF_FRANCE, mock_name_SCORES_GLOBAL_DF_FRANCE, mock_name_RANK_PREDICTCHAMP_DF_FRANCE]), \
          patch.object(output_actions_calculated, "push_capture_online", side_effect=[mock_url_SCORE_DETAILED_DF_FRANCE, mock_url_SCORES_GLOBAL_DF_FRANCE, mock_url_RANK_PREDICTCHAMP_DF_FRANCE]):
 
+        mock_submit_capture.return_value.result.side_effect = Exception("boom")
         assertExit(lambda: output_actions_calculated.derive_calculated_parameters_for_country(
             param_dict, sr_gameday_output_calculate, country, translations
         ))
@@ -408,7 +386,6 @@ def test_create_calculated_messages_for_country_conditional_blocks():
     mock_filename = "result.txt"
     
     with patch("output_actions_calculated.outputA.format_message", return_value=mock_str_format_message), \
-         patch("output_actions_calculated.outputA.replace_conditionally_message", side_effect=lambda c, b, e, cond: c) as mock_replace, \
          patch("output_actions_calculated.outputA.define_filename", return_value=mock_filename) as mock_filename, \
          patch("output_actions_calculated.fileA.create_txt") as mock_create_txt:
         
@@ -17,7 +17,7 @@ def test_translate_param_for_country_missing_country_key():
     # this test the function translate_param_for_country with missing country key. Must exit the program.
     param_to_translate = 'hello world'
     country = 'ITALIA'
-    translations = {'FRANCE': {'hello': 'bonjour'}}
+    translations = output_actions.compile_translations({'FRANCE': {'hello': 'bonjour'}})
     assertExit(lambda: output_actions.translate_param_for_country(param_to_translate, country, translations))
 
 def test_translate_param_for_country_invalid_type():
@@ -25,9 +25,16 @@ def test_translate_param_for_country_invalid_type():
     # this test the function translate_param_for_country with invalid type (int instead of string). Must exit the program.
     param_to_translate = 12345
     country = 'FRANCE'
-    translations = {'FRANCE': {'hello': 'bonjour'}}
+    translations = output_actions.compile_translations({'FRANCE': {'hello': 'bonjour'}})
     assertExit(lambda: output_actions.translate_param_for_country(param_to_translate, country, translations))
 
+def test_translate_param_for_country_empty_translations():
+    
+    # this test the function translate_param_for_country with no string to translate for the country. Must return the string unchanged.
+    translations = output_actions.compile_translations({'FRANCE': {}})
+    result = output_actions.translate_param_for_country('hello world', 'FRANCE', translations)
+    assert result == 'hello world'
+
 def test_format_message_invalid_type():
     
     # this test the function format_message with invalid type (int instead of string). Must exit the program.
@@ -64,6 +71,27 @@ def test_replace_conditionally_message_tags_missing():
     expected = "Hello World!"
     assert result == expected
 
+def test_compile_message_template_block_not_closed():
+    
+    # this test the function compile_message_template with a block not closed. Must exit the program.
+    template = "Hello #A_BEGIN#World"
+    assertExit(lambda: output_actions.compile_message_template(template, (), ("A",)))
+
+def test_compile_message_template_block_closed_not_opened():
+    
+    # this test the function compile_message_template with blocks crossing each other. Must exit the program.
+    template = "#A_BEGIN#Hello #B_BEGIN#World#A_END##B_END#"
+    assertExit(lambda: output_actions.compile_message_template(template, (), ("A", "B")))
+
+def test_compile_message_template_missing_placeholder():
+    
+    # this test the function compile_message_template with a placeholder without parameter. Must log it and keep it as is.
+    template = "Hello #NAME# #UNKNOWN#"
+    with unittest.TestCase().assertLogs(level='WARNING') as logs:
+        nodes = output_actions.compile_message_template(template, ("NAME",), ())
+    assert "UNKNOWN" in logs.output[0]
+    assert output_actions.render_message_template(nodes, {"NAME": "Bob"}, {}) == "Hello Bob #UNKNOWN#"
+
 def test_define_filename_missing_columns():
     
     # this test the function define_filename with missing columns (SEASON_ID for example). It must exit the program.
@@ -111,10 +139,14 @@ if __name__ == '__main__':
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_translate_param_for_country_missing_country_key))
     test_suite.addTest(unittest.FunctionTestCase(test_translate_param_for_country_invalid_type))
+    test_suite.addTest(unittest.FunctionTestCase(test_translate_param_for_country_empty_translations))
     test_suite.addTest(unittest.FunctionTestCase(test_format_message_invalid_type))
     test_suite.addTest(unittest.FunctionTestCase(test_format_message_invalid_pattern))
     test_suite.addTest(unittest.FunctionTestCase(test_replace_conditionally_message_empty_text))
     test_suite.addTest(unittest.FunctionTestCase(test_replace_conditionally_message_tags_missing))
+    test_suite.addTest(unittest.FunctionTestCase(test_compile_message_template_block_not_closed))
+    test_suite.addTest(unittest.FunctionTestCase(test_compile_message_template_block_closed_not_opened))
+    test_suite.addTest(unittest.FunctionTestCase(test_compile_message_template_missing_placeholder))
     test_suite.addTest(unittest.FunctionTestCase(test_define_filename_missing_columns))
     test_suite.addTest(unittest.FunctionTestCase(test_define_filename_none_country))
     test_suite.addTest(unittest.FunctionTestCase(test_display_rank_empty_df))
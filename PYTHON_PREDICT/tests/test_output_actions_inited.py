@@ -114,7 +114,6 @@ def test_create_inited_messages_for_country():
     expected_result = read_txt("materials/forumoutput_inited_s1_1erejournee_france.txt")
 
     with patch("output_actions_inited.outputA.format_message", return_value=mock_str_format_message), \
-         patch("output_actions_inited.outputA.replace_conditionally_message", side_effect=lambda c, b, e, cond: c) as mock_replace, \
          patch("output_actions_inited.outputA.define_filename", return_value=mock_filename) as mock_filename, \
          patch("output_actions_inited.fileA.create_txt") as mock_create_txt:
         
@@ -118,7 +118,7 @@ def test_derive_inited_parameters_with_empty_countries():
 
 def test_create_inited_messages_for_country_no_remaining_games():
     
-    # this test the function create_inited_messages_for_country with NB_GAMES_REMAINING = 0. Must not change #REMAINING_GAMEDAYS#
+    # this test the function create_inited_messages_for_country with NB_GAMES_REMAINING = 0. Must remove the remaining games block
     param_dict = {
         'DATEGAME1_FRANCE': "Lundi 01/01 20h",
         'GAMEDAY': '1ere journee',
@@ -137,7 +137,6 @@ def test_create_inited_messages_for_country_no_remaining_games():
     expected_result = read_txt("materials/edgecases/forumoutput_inited_s1_1erejournee_france_no_gamedays.txt")
 
     with patch("output_actions_inited.outputA.format_message", return_value=mock_str_format_message), \
-         patch("output_actions_inited.outputA.replace_conditionally_message", side_effect=lambda c, b, e, cond: c) as mock_replace, \
          patch("output_actions_inited.outputA.define_filename", return_value=mock_filename) as mock_filename, \
          patch("output_actions_inited.fileA.create_txt") as mock_create_txt:
         
@@ -4,7 +4,7 @@ It units test the happy path for each function
 '''
 
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, PropertyMock
 import pandas as pd
 from pandas.testing import assert_frame_equal
 import tempfile
@@ -31,9 +31,41 @@ def test_snowflake_connect():
         assert conn == mock_conn
         mock_connect.assert_called_once()
 
+def test_snowflake_connection_pool():
+    
+    # this test the functions acquire_snowflake_connection, release_snowflake_connection and close_snowflake_connections
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+
+    conn1 = MagicMock()
+    conn1.is_closed.return_value = False
+    conn2 = MagicMock()
+    conn2.is_closed.return_value = False
+
+    with patch('snowflake_actions.snowflake_connect', side_effect=[conn1, conn2]) as mock_connect, \
+         patch('snowflake_actions.os.getenv', return_value='0'):
+
+        # two threads working at the same time get their own connection
+        first = snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+        second = snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+        assert first is conn1 and second is conn2
+
+        # a released connection is reused without reconnecting
+        snowflake_actions.release_snowflake_connection(sr_snowflake_account, second)
+        with snowflake_actions.snowflake_session(sr_snowflake_account) as conn:
+            assert conn is conn2
+        assert mock_connect.call_count == 2
+
+        snowflake_actions.release_snowflake_connection(sr_snowflake_account, first)
+        snowflake_actions.close_snowflake_connections()
+        conn1.close.assert_called_once()
+        conn2.close.assert_called_once()
+        assert snowflake_actions.snowflake_connection_pools == {}
+
 def test_snowflake_execute():
     
     # this test the function snowflake_execute
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     query = "SELECT * FROM #DATABASE#.table"
 
@@ -51,9 +83,140 @@ def test_snowflake_execute():
         result = snowflake_actions.snowflake_execute(sr_snowflake_account, query)
         assert_frame_equal(result.reset_index(drop=True), pd.DataFrame({"col": [1, 2]}).reset_index(drop=True))
 
+def test_snowflake_execute_async():
+    
+    # this test the function snowflake_execute_async: all queries are submitted before any result is fetched
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    dict_queries = {
+        "GAMES": ("SELECT * FROM #DATABASE#.CONSUMPTED.VW_GAME WHERE SEASON_ID = %s", ("S1",)),
+        "USERS": ("SELECT * FROM #DATABASE#.CONSUMPTED.VW_USER", None)
+    }
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    type(mock_cursor).sfqid = PropertyMock(side_effect=["qid_games", "qid_users"])
+    mock_cursor.fetch_pandas_all.side_effect = [pd.DataFrame({"col": [1, 2]}), pd.DataFrame({"col": [3]})]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    with patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'):
+
+        dict_df = snowflake_actions.snowflake_execute_async(sr_snowflake_account, dict_queries)
+
+        mock_cursor.execute_async.assert_any_call("SELECT * FROM PREDICT_PROD.CONSUMPTED.VW_GAME WHERE SEASON_ID = %s", ("S1",))
+        mock_cursor.execute_async.assert_any_call("SELECT * FROM PREDICT_PROD.CONSUMPTED.VW_USER", None)
+        method_names = [call[0] for call in mock_cursor.method_calls if call[0] in ('execute_async','get_results_from_sfqid')]
+        assert method_names == ['execute_async', 'execute_async', 'get_results_from_sfqid', 'get_results_from_sfqid']
+        mock_cursor.get_results_from_sfqid.assert_any_call("qid_users")
+        assert_frame_equal(dict_df["GAMES"], pd.DataFrame({"col": [1, 2]}))
+        assert_frame_equal(dict_df["USERS"], pd.DataFrame({"col": [3]}))
+
+def test_get_query_kind():
+    
+    # this test the function get_query_kind: each query is parsed only once
+    snowflake_actions.get_query_kind.cache_clear()
+    query = "WITH A AS (SELECT 1 AS X) SELECT * FROM A WHERE X = %s;"
+
+    with patch('snowflake_actions.sqlglot.parse_one', wraps=snowflake_actions.sqlglot.parse_one) as mock_parse_one:
+        assert snowflake_actions.get_query_kind(query) == "SELECT"
+        assert snowflake_actions.get_query_kind(query) == "SELECT"
+        assert snowflake_actions.get_query_kind("SHOW TABLES IN DB.LANDING;") == "SHOW"
+        assert mock_parse_one.call_count == 2
+
+def test_snowflake_execute_to_csv():
+    
+    # this test the function snowflake_execute_to_csv: the result is written batch after batch,
+    snowflake_actions.close_snowflake_connections()
+    # integer columns staying integers even in a batch with null values
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    query = "SELECT * FROM #DATABASE#.table"
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.description = [MagicMock(type_code=0, scale=0), MagicMock(type_code=2, scale=None)]
+    mock_cursor.description[0].name = "ID"
+    mock_cursor.description[1].name = "NAME"
+    mock_cursor.fetch_pandas_batches.return_value = iter([
+        pd.DataFrame({"ID": [1, 2], "NAME": ["a", "b"]}),
+        pd.DataFrame({"ID": [3.0, None], "NAME": ["c", None]})
+    ])
+    
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'):
+
+        local_file_path = os.path.join(tmpdir, "table.csv")
+        snowflake_actions.snowflake_execute_to_csv(sr_snowflake_account, query, local_file_path, 1)
+        mock_cursor.execute.assert_called_once_with("SELECT * FROM PREDICT_PROD.table")
+        with open(local_file_path, encoding='utf-8') as f:
+            assert f.read() == '"ID","NAME"\n"1","a"\n"2","b"\n"3","c"\n"",""\n'
+
+def test_snowflake_write_pandas():
+    
+    # this test the function snowflake_write_pandas: the dataframe is loaded as it would be from its csv file
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df = pd.DataFrame({"SEASON_ID": ["s1", "s2", "s3"], "TEAM": ["a", "", "NULL"], "SCORE": [1, 2, 3]})
+
+    with patch('snowflake_actions.snowflake_connect', return_value=MagicMock()), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('snowflake_actions.write_pandas', return_value=(True, 1, 3, [])) as mock_write_pandas:
+
+        snowflake_actions.snowflake_write_pandas(sr_snowflake_account, df, "landing", "landing_game", 1)
+        df_upload = mock_write_pandas.call_args.args[1]
+        assert df_upload["TEAM"].tolist() == ["a", None, None]
+        assert df_upload["SCORE"].tolist() == [1, 2, 3]
+        assert mock_write_pandas.call_args.args[2] == "landing_game"
+        assert mock_write_pandas.call_args.kwargs["database"] == "PREDICT_PROD"
+        assert mock_write_pandas.call_args.kwargs["schema"] == "landing"
+        assert df["TEAM"].tolist() == ["a", "", "NULL"]
+
+def test_get_snowflake_table_columns():
+    
+    # this test the function get_snowflake_table_columns: the information schema is queried once per table
+    snowflake_actions.snowflake_table_columns.clear()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_columns = pd.DataFrame({"COLUMN_NAME": ["SEASON_ID", "GAME_ID"]})
+
+    with patch('snowflake_actions.snowflake_execute', return_value=df_columns) as mock_execute:
+
+        assert snowflake_actions.get_snowflake_table_columns(sr_snowflake_account, "landing", "landing_game") == ["SEASON_ID", "GAME_ID"]
+        assert snowflake_actions.get_snowflake_table_columns(sr_snowflake_account, "landing", "LANDING_GAME") == ["SEASON_ID", "GAME_ID"]
+        mock_execute.assert_called_once()
+        assert mock_execute.call_args.args[2] == ("landing", "landing_game")
+        assert "INFORMATION_SCHEMA.COLUMNS" in mock_execute.call_args.args[1]
+    snowflake_actions.snowflake_table_columns.clear()
+
+def test_snowflake_execute_multi_statement():
+    
+    # this test the function snowflake_execute_multi_statement: the script is sent in one call and all results are read
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    script = "TRUNCATE TABLE #DATABASE#.landing.t1;REMOVE @#DATABASE#.landing.%t1;"
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.nextset.side_effect = [mock_cursor, None]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    with patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'):
+
+        snowflake_actions.snowflake_execute_multi_statement(sr_snowflake_account, script, 2)
+        mock_cursor.execute.assert_called_once_with(
+            "TRUNCATE TABLE PREDICT_PROD.landing.t1;REMOVE @PREDICT_PROD.landing.%t1;", num_statements=2)
+        assert mock_cursor.nextset.call_count == 2
+
 def test_snowflake_execute_script_uses_prod_db():
     
     # this test the function snowflake_execute_script with prod database
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     script = "SELECT * FROM #DATABASE#.TABLE1;"
     expected_script = "SELECT * FROM PREDICT_PROD.TABLE1;"
@@ -69,6 +232,7 @@ def test_snowflake_execute_script_uses_prod_db():
 def test_snowflake_execute_script_uses_test_db():
     
     # this test the function snowflake_execute_script with test database
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     script = "SELECT * FROM #DATABASE#.TABLE1;"
     expected_script = "SELECT * FROM PREDICT_TEST.TABLE1;"
@@ -92,43 +256,47 @@ def test_get_list_tables_to_update():
     assert result[0] == ['landing_output_need']
     assert result[1] == []
 
-def test_delete_table_data():
+def test_get_delete_table_data_queries():
     
-    # this test the function delete_table_data
-    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    # this test the function get_delete_table_data_queries
     schema = "landing"
     table_metadata = [None, "test_table"]
 
-    with patch('snowflake_actions.snowflake_execute') as mock_exec:
-        snowflake_actions.delete_table_data(sr_snowflake_account, schema, table_metadata)
-        assert mock_exec.call_count == 2
-        args1 = mock_exec.call_args_list[0][0][1]
-        assert "TRUNCATE TABLE" in args1
+    queries = snowflake_actions.get_delete_table_data_queries(schema, table_metadata)
+    assert "TRUNCATE TABLE #DATABASE#.landing.test_table;" in queries
+    assert "REMOVE @#DATABASE#.landing.%test_table;" in queries
 
 def test_delete_tables_data_from_python():
 
-    # this test the function delete_tables_data_from_python
+    # this test the function delete_tables_data_from_python: all tables are deleted with one multi-statement call
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     schema = "landing"
 
     mock_sql = MagicMock()
     mock_sql.snowflake_actions_qListTables = "SELECT * FROM #SCHEMA#.tables"
+    mock_sql.snowflake_actions_qDeleteData = "TRUNCATE TABLE #SCHEMA#.#TABLE_NAME#;"
+    mock_sql.snowflake_actions_qRemoveFromStage = "REMOVE @#SCHEMA#.%#TABLE_NAME#;"
 
     with patch("snowflake_actions.sqlQ", mock_sql), \
          patch("snowflake_actions.snowflake_execute") as mock_snowflake_execute, \
-         patch("snowflake_actions.config.multithreading_run"):
+         patch("snowflake_actions.snowflake_execute_multi_statement") as mock_multi_statement:
 
         mock_snowflake_execute.return_value = [
-            {"name": "table1"},
-            {"name": "table2"}
+            [None, "table1", None, None, None, None, None, 10],
+            [None, "table2", None, None, None, None, None, 0]
         ]
 
-        snowflake_actions.delete_tables_data_from_python(sr_snowflake_account, schema)
+        rows_deleted = snowflake_actions.delete_tables_data_from_python(sr_snowflake_account, schema)
 
-        
         mock_snowflake_execute.assert_called_once_with(
             sr_snowflake_account, "SELECT * FROM landing.tables"
         )
+        mock_multi_statement.assert_called_once_with(
+            sr_snowflake_account,
+            "TRUNCATE TABLE landing.table1;REMOVE @landing.%table1;TRUNCATE TABLE landing.table2;REMOVE @landing.%table2;",
+            4
+        )
+        assert rows_deleted == {"table1": 10, "table2": 0}
 
 def test_create_table_file():
     
@@ -136,13 +304,29 @@ def test_create_table_file():
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     table = "landing_season"
     is_encapsulated = 1
-    mock_df = pd.DataFrame({'col': [1]})
 
-    with patch('snowflake_actions.snowflake_execute', return_value=mock_df), \
-         patch('snowflake_actions.create_csv') as mock_create_csv:
+    with patch('snowflake_actions.snowflake_execute_to_csv') as mock_execute_to_csv:
 
         snowflake_actions.create_table_file(sr_snowflake_account, table, is_encapsulated)
-        mock_create_csv.assert_called_once()
+        mock_execute_to_csv.assert_called_once()
+        assert mock_execute_to_csv.call_args.args[2].endswith("landing_season.csv")
+        assert mock_execute_to_csv.call_args.args[3] == is_encapsulated
+
+def test_create_table_file_parquet():
+    
+    # this test the function create_table_file with the parquet snapshot format
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    table = "landing_season"
+    is_encapsulated = 1
+
+    with patch('snowflake_actions.config.database_snapshot_format', "parquet"), \
+         patch('snowflake_actions.snowflake_execute_to_csv') as mock_execute_to_csv, \
+         patch('snowflake_actions.snowflake_execute_to_parquet') as mock_execute_to_parquet:
+
+        snowflake_actions.create_table_file(sr_snowflake_account, table, is_encapsulated)
+        mock_execute_to_csv.assert_not_called()
+        mock_execute_to_parquet.assert_called_once()
+        assert mock_execute_to_parquet.call_args.args[2].endswith("landing_season.parquet")
 
 def test_update_snowflake_from_python():
 
@@ -167,6 +351,158 @@ def test_update_snowflake_from_python():
         assert exp_schema in qPut_call
         assert table_name in qPut_call
 
+def test_update_snowflake_from_python_dataframe():
+
+    # this test the function update_snowflake_from_python with the dataframe of the input file in memory: it is loaded directly
+    called_by = 'main'
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    table_name = "landing_game"
+    df_paths = pd.read_csv("materials/paths.csv")
+    df_game = pd.read_csv("materials/game.csv")
+
+    with patch("snowflake_actions.snowflake_execute") as mock_snowflake_execute, \
+         patch("snowflake_actions.get_snowflake_table_columns", return_value=[column.upper() for column in df_game.columns]), \
+         patch("snowflake_actions.snowflake_write_pandas") as mock_write_pandas, \
+         patch("snowflake_actions.create_table_file") as mock_create_table_file:
+
+        snowflake_actions.update_snowflake_from_python(called_by,sr_snowflake_account,table_name,df_paths,'local',df_game)
+
+        mock_snowflake_execute.assert_not_called()
+        mock_write_pandas.assert_called_once()
+        assert mock_write_pandas.call_args.args[1] is df_game
+        assert mock_write_pandas.call_args.args[2:4] == ("landing", table_name)
+        mock_create_table_file.assert_called_once()
+
+def test_update_snowflake_from_python_dataframe_columns_mismatch():
+
+    # this test the function update_snowflake_from_python with a dataframe in memory whose columns are not the table ones: its csv file is loaded instead
+    called_by = 'main'
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    table_name = "landing_message"
+    df_paths = pd.read_csv("materials/paths.csv")
+    df_message = pd.DataFrame({"MESSAGE_ID": [1], "CREATION_TIME_LOCAL": ["2024-01-01 10:00:00"], "EDITION_TIME_LOCAL": [""]})
+    lst_table_columns = ["MESSAGE_ID", "CREATION_TIME", "EDITION_TIME"]
+
+    with patch("snowflake_actions.snowflake_execute") as mock_snowflake_execute, \
+         patch("snowflake_actions.get_snowflake_table_columns", return_value=lst_table_columns), \
+         patch("snowflake_actions.snowflake_write_pandas") as mock_write_pandas, \
+         patch("snowflake_actions.create_table_file"):
+
+        snowflake_actions.update_snowflake_from_python(called_by,sr_snowflake_account,table_name,df_paths,'local',df_message)
+
+        mock_write_pandas.assert_not_called()
+        assert mock_snowflake_execute.call_count == 2
+        assert "message.csv" in mock_snowflake_execute.call_args_list[0][0][1]
+        assert "TYPE = 'CSV'" in mock_snowflake_execute.call_args_list[1][0][1]
+
+def test_update_snowflake_from_python_parquet():
+
+    # this test the function update_snowflake_from_python called by init_snowflake with a parquet table file: columns are matched by name
+    called_by = 'init_snowflake'
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    table_name = "landing_season"
+    df_paths = pd.read_csv("materials/paths.csv")
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch("snowflake_actions.snowflake_execute") as mock_snowflake_execute, \
+         patch("snowflake_actions.create_table_file") as mock_create_table_file:
+
+        open(os.path.join(tmpdir, "landing_season.parquet"), 'w').close()
+        snowflake_actions.update_snowflake_from_python(called_by,sr_snowflake_account,table_name,df_paths,tmpdir)
+
+        qPut_call = mock_snowflake_execute.call_args_list[0][0][1]
+        qInsert_call = mock_snowflake_execute.call_args_list[1][0][1]
+        assert "landing_season.parquet" in qPut_call
+        assert "TYPE = 'PARQUET'" in qInsert_call
+        assert "MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE" in qInsert_call
+        mock_create_table_file.assert_not_called()
+
+def test_unload_tables_files():
+    
+    # this test the function unload_tables_files: tables are unloaded into the same run stage folder, then downloaded at once
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_paths = pd.read_csv("materials/paths.csv")
+    lst_tables = ["curated_season", "curated_message"]
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.TMPD', tmpdir), \
+         patch('snowflake_actions.config.multithreading_run') as mock_thread, \
+         patch('snowflake_actions.snowflake_execute') as mock_execute, \
+         patch('snowflake_actions.create_csv') as mock_create_csv:
+
+        for table_name in lst_tables:
+            open(os.path.join(tmpdir, table_name + ".csv"), 'w').close()
+        snowflake_actions.unload_tables_files(sr_snowflake_account, lst_tables, df_paths)
+
+        unload_queries = [args[1] for args in mock_thread.call_args.args[1]]
+        assert len(unload_queries) == 2
+        assert all("COPY INTO @~/export/" in query for query in unload_queries)
+        assert "curated_message.csv" in unload_queries[1] and "FIELD_OPTIONALLY_ENCLOSED_BY='\"'" in unload_queries[1]
+        stage_path = unload_queries[0].split("COPY INTO ")[1].split("/curated_season.csv")[0]
+        executed_queries = [c.args[1] for c in mock_execute.call_args_list]
+        assert f"GET {stage_path}/ file://" in executed_queries[0]
+        assert f"REMOVE {stage_path}/" in executed_queries[1]
+        mock_create_csv.assert_not_called()
+
+def test_run_dbt():
+    
+    # this test the function run_dbt: dbt runs in-process, its partial parsing is restored and cached, nodes timing is returned
+    mock_result = MagicMock(success=True, exception=None)
+    mock_result.result.results = [
+        MagicMock(node=MagicMock(unique_id="model.DBT_PRONO.curated_season"), status="success", execution_time=0.5, message="SUCCESS 1"),
+        MagicMock(node=MagicMock(unique_id="model.DBT_PRONO.curated_game"), status="success", execution_time=2.0, message="SUCCESS 10")
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.dbt_directory', os.path.join(tmpdir, "dbt")), \
+         patch('snowflake_actions.config.dbt_parse_cache_folder', os.path.join(tmpdir, "cache")), \
+         patch('dbt.cli.main.dbtRunner') as mock_runner:
+
+        os.makedirs(os.path.join(tmpdir, "cache"))
+        with open(os.path.join(tmpdir, "cache", "partial_parse.msgpack"), 'w') as f:
+            f.write("cached parsing")
+        def invoke(dbt_args):
+            # dbt finds the cached parsing and writes the new one
+            with open(os.path.join(tmpdir, "dbt", "target", "partial_parse.msgpack"), 'r+') as f:
+                assert f.read() == "cached parsing"
+                f.write(" updated")
+            return mock_result
+        mock_runner.return_value.invoke.side_effect = invoke
+
+        df_dbt_timing = snowflake_actions.run_dbt(["build", "--select", "curated_season", "curated_game"])
+
+        dbt_args = mock_runner.return_value.invoke.call_args.args[0]
+        assert dbt_args[:4] == ["build", "--select", "curated_season", "curated_game"]
+        assert dbt_args[4:] == ["--project-dir", os.path.join(tmpdir, "dbt"), "--profiles-dir", os.path.join(tmpdir, "dbt")]
+        assert df_dbt_timing["NODE"].tolist() == ["model.DBT_PRONO.curated_game", "model.DBT_PRONO.curated_season"]
+        assert df_dbt_timing["EXECUTION_TIME"].tolist() == [2.0, 0.5]
+        with open(os.path.join(tmpdir, "cache", "partial_parse.msgpack")) as f:
+            assert f.read() == "cached parsing updated"
+
+def test_get_dbt_selection():
+    
+    # this test the function get_dbt_selection: loaded sources, and tables to update descending from them
+    lst_python_tables = ["landing_message_check", "landing_output_need"]
+    lst_dbt_tables = ["curated_message_check", "consumpted_message"]
+
+    selection = snowflake_actions.get_dbt_selection(lst_python_tables, lst_dbt_tables)
+    assert selection.split(" ") == [
+        "path:models/sources/landing_message_check.yml",
+        "path:models/sources/landing_output_need.yml",
+        "path:models/sources/landing_message_check.yml+,consumpted_message",
+        "path:models/sources/landing_message_check.yml+,curated_message_check",
+        "path:models/sources/landing_output_need.yml+,consumpted_message",
+        "path:models/sources/landing_output_need.yml+,curated_message_check"
+    ]
+
+    # with the manifest of the last run, modified tables are selected too
+    selection = snowflake_actions.get_dbt_selection(["landing_game"], ["curated_game"], True)
+    assert selection.split(" ") == [
+        "path:models/sources/landing_game.yml",
+        "path:models/sources/landing_game.yml+,curated_game",
+        "state:modified+,curated_game"
+    ]
+
 def test_update_snowflake_from_dbt():
     
     # this test the function update_snowflake_from_dbt
@@ -175,18 +511,80 @@ def test_update_snowflake_from_dbt():
     df_paths = pd.read_csv("materials/paths.csv")
     lst_dbt_tables=["curated_season"]
 
-    with patch('snowflake_actions.subprocess.run') as mock_run, \
-         patch('snowflake_actions.create_table_file'):
+    df_dbt_timing = pd.DataFrame([("model.DBT_PRONO.curated_season", "success", 1.5, "SUCCESS 1")],
+                                 columns=["NODE", "STATUS", "EXECUTION_TIME", "MESSAGE"])
+    with patch('snowflake_actions.run_dbt', return_value=df_dbt_timing) as mock_run, \
+         patch('snowflake_actions.unload_tables_files') as mock_unload:
 
-        mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "Success"
-        mock_run.return_value.stderr = ""
-
-        snowflake_actions.update_snowflake_from_dbt(
+        result = snowflake_actions.update_snowflake_from_dbt(
             called_by,sr_snowflake_account,df_paths,lst_dbt_tables
         )
 
         mock_run.assert_called_once()
+        assert mock_run.call_args.args[0][:3] == ["build", "--select", "curated_season"]
+        mock_unload.assert_called_once_with(sr_snowflake_account, lst_dbt_tables, df_paths)
+        assert_frame_equal(result, df_dbt_timing)
+
+def test_update_snowflake_from_dbt_state_modified():
+    
+    # this test the function update_snowflake_from_dbt comparing the project with the manifest of the last successful run
+    called_by = "main"
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_paths = pd.read_csv("materials/paths.csv")
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.dbt_state_modified', True), \
+         patch('snowflake_actions.config.dbt_state_folder', os.path.join(tmpdir, "state")), \
+         patch('snowflake_actions.config.dbt_directory', tmpdir), \
+         patch('snowflake_actions.run_dbt', return_value=pd.DataFrame(columns=["NODE", "STATUS", "EXECUTION_TIME", "MESSAGE"])) as mock_run, \
+         patch('snowflake_actions.unload_tables_files'):
+
+        os.makedirs(os.path.join(tmpdir, "target"))
+        with open(os.path.join(tmpdir, "target", "manifest.json"), 'w') as f:
+            f.write("{}")
+
+        # first run: no manifest to compare with, it is kept for the next run
+        snowflake_actions.update_snowflake_from_dbt(called_by,sr_snowflake_account,df_paths,["curated_game"],["landing_game"])
+        assert not any("state:modified" in arg for arg in mock_run.call_args.args[0])
+        assert os.path.exists(os.path.join(tmpdir, "state", "manifest.json"))
+
+        # next run: modified tables are selected too
+        snowflake_actions.update_snowflake_from_dbt(called_by,sr_snowflake_account,df_paths,["curated_game"],["landing_game"])
+        dbt_args = mock_run.call_args.args[0]
+        assert "state:modified+,curated_game" in dbt_args
+        assert dbt_args[-2:] == ["--state", os.path.join(tmpdir, "state")]
+
+def test_update_snowflake_from_dbt_state_manifest_present():
+    
+    # this test the function update_snowflake_from_dbt with the manifest of the last successful run restored in the DropBox files cache
+    called_by = "main"
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_paths = pd.read_csv("materials/paths.csv")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dropbox_cache_folder = os.path.join(tmpdir, "dropbox")
+        dbt_state_folder = os.path.join(dropbox_cache_folder, "dbt_state")
+        with patch('snowflake_actions.config.dbt_state_modified', True), \
+             patch('snowflake_actions.config.dbt_state_folder', dbt_state_folder), \
+             patch('snowflake_actions.config.dbt_directory', tmpdir), \
+             patch('snowflake_actions.run_dbt', return_value=pd.DataFrame(columns=["NODE", "STATUS", "EXECUTION_TIME", "MESSAGE"])) as mock_run, \
+             patch('snowflake_actions.unload_tables_files'):
+
+            os.makedirs(dbt_state_folder)
+            with open(os.path.join(dbt_state_folder, "manifest.json"), 'w') as f:
+                f.write('{"previous": true}')
+            os.makedirs(os.path.join(tmpdir, "target"))
+            with open(os.path.join(tmpdir, "target", "manifest.json"), 'w') as f:
+                f.write('{"current": true}')
+
+            snowflake_actions.update_snowflake_from_dbt(called_by,sr_snowflake_account,df_paths,["curated_game"],["landing_game"])
+
+            # the restored manifest is compared with from the first run, then replaced by the one of this run
+            dbt_args = mock_run.call_args.args[0]
+            assert "state:modified+,curated_game" in dbt_args
+            assert dbt_args[-2:] == ["--state", dbt_state_folder]
+            with open(os.path.join(dbt_state_folder, "manifest.json")) as f:
+                assert f.read() == '{"current": true}'
 
 def test_update_snowflake_main():
 
@@ -211,7 +609,8 @@ def test_update_snowflake_main():
             called_by,
             context_dict['sr_snowflake_account_connect'],
             context_dict['df_paths'],
-            ["dbt_table_1"]
+            ["dbt_table_1"],
+            ["python_table_1"]
         )
 
 def test_update_snowflake_initsnowflake():
@@ -238,15 +637,31 @@ def test_update_snowflake_initsnowflake():
 if __name__ == "__main__":
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_connect))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_connection_pool))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_async))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_script_uses_prod_db))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_script_uses_test_db))
     test_suite.addTest(unittest.FunctionTestCase(test_get_list_tables_to_update))
-    test_suite.addTest(unittest.FunctionTestCase(test_delete_table_data))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_delete_table_data_queries))
     test_suite.addTest(unittest.FunctionTestCase(test_delete_tables_data_from_python))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_query_kind))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_to_csv))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_write_pandas))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_snowflake_table_columns))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_multi_statement))
     test_suite.addTest(unittest.FunctionTestCase(test_create_table_file))
+    test_suite.addTest(unittest.FunctionTestCase(test_create_table_file_parquet))
+    test_suite.addTest(unittest.FunctionTestCase(test_unload_tables_files))
+    test_suite.addTest(unittest.FunctionTestCase(test_run_dbt))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_dbt_selection))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_python))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_python_dataframe))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_python_dataframe_columns_mismatch))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_python_parquet))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_dbt))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_dbt_state_modified))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_dbt_state_manifest_present))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_main))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_initsnowflake))
     runner = unittest.TextTestRunner()
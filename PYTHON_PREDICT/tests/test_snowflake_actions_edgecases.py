@@ -5,6 +5,7 @@ It units test unexpected paths for each function
 import unittest
 from unittest.mock import patch, MagicMock,call
 import pandas as pd
+from pandas.testing import assert_frame_equal
 import sys
 import os
 import tempfile
@@ -17,6 +18,7 @@ from testutils import assertExit
 def test_snowflake_execute_select_path():
     
     # this test the function snowflake_execute select path
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     query = "SELECT * FROM #DATABASE#.table"
 
@@ -37,6 +39,7 @@ def test_snowflake_execute_select_path():
 def test_snowflake_execute_show_path():
     
     # this test the function snowflake_execute for show command
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     query = "SHOW TABLES;"
 
@@ -57,6 +60,7 @@ def test_snowflake_execute_show_path():
 def test_snowflake_execute_invalidquery():
     
     # this test the function snowflake_execute with invalid query. Must exit the program
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     query = "INVALID QUERY;"
 
@@ -74,9 +78,33 @@ def test_snowflake_execute_invalidquery():
         mock_parse_one.return_value = object()
         assertExit(lambda: snowflake_actions.snowflake_execute(sr_snowflake_account, query))
 
+def test_snowflake_execute_best_effort_failure():
+    
+    # this test the function snowflake_execute_best_effort with a query failing. Must return None without retrying nor exiting the program
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    query = "SELECT UNKNOWN_COLUMN FROM #DATABASE#.table"
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.execute.side_effect = Exception("invalid identifier 'UNKNOWN_COLUMN'")
+    
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_closed.return_value = False
+
+    with patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('snowflake_actions.config.time_sleep') as mock_sleep:
+
+        assert snowflake_actions.snowflake_execute_best_effort(sr_snowflake_account, query) is None
+        mock_cursor.execute.assert_called_once()
+        mock_sleep.assert_not_called()
+
 def test_snowflake_execute_script_empty_script():
     
     # this test the function snowflake_execute_script with empty script. Must run but do nothing
+    snowflake_actions.close_snowflake_connections()
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     script = ""
 
@@ -86,17 +114,54 @@ def test_snowflake_execute_script_empty_script():
             snowflake_actions.snowflake_execute_script(sr_snowflake_account, script)
             mock_connection.execute_string.assert_called_once_with("")
 
-def test_delete_table_data_executes_expected_queries():
+def test_delete_tables_data_from_python_no_tables():
     
-    # this test the function delete_table_data truncate and remove queries
+    # this test the function delete_tables_data_from_python with an empty schema. Must not send any deletion
     sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
     schema = "landing"
-    table_metadata = [None, "test_table"]
 
-    with patch('snowflake_actions.snowflake_execute') as mock_exec:
-        snowflake_actions.delete_table_data(sr_snowflake_account, schema, table_metadata)
-        calls = [call(sr_snowflake_account, unittest.mock.ANY), call(sr_snowflake_account, unittest.mock.ANY)]
-        mock_exec.assert_has_calls(calls, any_order=False)
+    with patch('snowflake_actions.snowflake_execute', return_value=[]), \
+         patch('snowflake_actions.snowflake_execute_multi_statement') as mock_multi_statement:
+        rows_deleted = snowflake_actions.delete_tables_data_from_python(sr_snowflake_account, schema)
+        mock_multi_statement.assert_not_called()
+        assert rows_deleted == {}
+
+def test_snowflake_execute_multi_statement_failure():
+    
+    # this test the function snowflake_execute_multi_statement with a failing query of the script. Must exit the program
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.execute.side_effect = Exception("Table does not exist")
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    with patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('config.time_sleep'):
+
+        assertExit(lambda: snowflake_actions.snowflake_execute_multi_statement(sr_snowflake_account, "TRUNCATE TABLE t1;REMOVE @%t1;", 2))
+
+def test_snowflake_execute_async_failure():
+    
+    # this test the function snowflake_execute_async with a failing query. Must exit the program
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    dict_queries = {"GAMES": ("SELECT * FROM #DATABASE#.CONSUMPTED.VW_GAME", None)}
+
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.get_results_from_sfqid.side_effect = Exception("Object does not exist")
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    with patch('snowflake_actions.snowflake_connect', return_value=mock_conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('config.time_sleep'):
+
+        assertExit(lambda: snowflake_actions.snowflake_execute_async(sr_snowflake_account, dict_queries))
 
 def test_update_snowflake_from_python_encapsulated():
     
@@ -130,15 +195,74 @@ def test_update_snowflake_from_dbt_failure():
     df_paths = pd.read_csv("materials/paths.csv")
     lst_dbt_tables=["curated_season"]
 
-    with patch('snowflake_actions.subprocess.run') as mock_run, \
-         patch('snowflake_actions.create_table_file'):
-
-        mock_run.return_value.returncode = 1
-        mock_run.return_value.stdout = "bad"
-        mock_run.return_value.stderr = "error"
+    with patch('snowflake_actions.run_dbt', side_effect=RuntimeError("DBT command failed")), \
+         patch('snowflake_actions.unload_tables_files'):
 
         assertExit(lambda: snowflake_actions.update_snowflake_from_dbt(called_by,sr_snowflake_account,df_paths,lst_dbt_tables))
 
+def test_run_dbt_failing_node():
+    
+    # this test the function run_dbt with a failing node. Must raise an error with the message of the failing node
+    mock_result = MagicMock(success=False, exception=None)
+    mock_result.result.results = [
+        MagicMock(node=MagicMock(unique_id="model.DBT_PRONO.curated_season"), status="success", execution_time=0.5, message="SUCCESS 1"),
+        MagicMock(node=MagicMock(unique_id="test.DBT_PRONO.not_null_curated_season_SEASON_ID"), status="fail", execution_time=0.1, message="Got 2 results")
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.dbt_directory', tmpdir), \
+         patch('snowflake_actions.config.dbt_parse_cache_folder', os.path.join(tmpdir, "cache")), \
+         patch('dbt.cli.main.dbtRunner') as mock_runner:
+
+        mock_runner.return_value.invoke.return_value = mock_result
+        with unittest.TestCase().assertRaises(RuntimeError) as context:
+            snowflake_actions.run_dbt(["build"])
+        assert "test.DBT_PRONO.not_null_curated_season_SEASON_ID: Got 2 results" in str(context.exception)
+        assert "curated_season: SUCCESS" not in str(context.exception)
+
+def test_unload_tables_files_empty_table():
+    
+    # this test the function unload_tables_files with an empty table: snowflake doesn't unload it, its file must be created with the header only
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_paths = pd.read_csv("materials/paths.csv")
+    mock_df_empty = pd.DataFrame(columns=["SEASON_ID", "SEASON_NAME"])
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.TMPD', tmpdir), \
+         patch('snowflake_actions.config.multithreading_run'), \
+         patch('snowflake_actions.snowflake_execute', return_value=mock_df_empty) as mock_execute:
+
+        snowflake_actions.unload_tables_files(sr_snowflake_account, ["curated_season"], df_paths)
+
+        assert "LIMIT 0" in mock_execute.call_args.args[1]
+        assert_frame_equal(pd.read_csv(os.path.join(tmpdir, "curated_season.csv")), mock_df_empty, check_dtype=False, check_index_type=False)
+
+def test_unload_tables_files_empty_table_parquet():
+    
+    # this test the function unload_tables_files with an empty table in parquet snapshot format. Its file must be created with the columns only
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df_paths = pd.read_csv("materials/paths.csv")
+    mock_df_empty = pd.DataFrame(columns=["SEASON_ID", "SEASON_NAME"])
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+         patch('snowflake_actions.config.TMPD', tmpdir), \
+         patch('snowflake_actions.config.database_snapshot_format', "parquet"), \
+         patch('snowflake_actions.config.multithreading_run') as mock_thread, \
+         patch('snowflake_actions.snowflake_execute', return_value=mock_df_empty):
+
+        snowflake_actions.unload_tables_files(sr_snowflake_account, ["curated_season"], df_paths)
+
+        unload_query = mock_thread.call_args.args[1][0][1]
+        assert "curated_season.parquet" in unload_query and "TYPE = 'PARQUET'" in unload_query
+        df = pd.read_parquet(os.path.join(tmpdir, "curated_season.parquet"))
+        assert df.columns.tolist() == ["SEASON_ID", "SEASON_NAME"] and len(df) == 0
+
+def test_get_dbt_selection_no_source_loaded():
+    
+    # this test the function get_dbt_selection without landing table loaded in the run. Must select all tables to update
+    selection = snowflake_actions.get_dbt_selection([], ["curated_season", "consumpted_season"])
+    assert selection == "consumpted_season curated_season"
+
 def test_update_snowflake_initsnowflake_runs_python_and_dbt():
     
     # this test the function update_snowflake called by initsnowflake for python and dbt
@@ -181,16 +305,108 @@ def test_update_snowflake_main_with_empty_lists():
             assert not mock_update_snowflake.called
             assert not mock_update_dbt.called
 
+def test_update_snowflake_main_dataframes_in_memory():
+    
+    # this test the function update_snowflake with a python table having its dataframe in memory and another one without. 
+    # Only the first must be given its dataframe
+    called_by = "main"
+    df_game = pd.read_csv("materials/game.csv")
+    context_dict = {
+        'df_paths': pd.read_csv("materials/paths.csv"),
+        'sr_snowflake_account_connect': pd.read_csv("materials/snowflake_account_connect.csv").iloc[0],
+        'sr_output_need': pd.read_csv("materials/output_need_calculate.csv").iloc[0],
+        'df_game': df_game
+    }
+
+    with patch("snowflake_actions.get_list_tables_to_update", return_value=(["landing_game", "landing_output_need"], [])), \
+         patch("snowflake_actions.config.multithreading_run") as mock_thread:
+
+        snowflake_actions.update_snowflake(called_by, context_dict, "local")
+        table_args = mock_thread.call_args.args[1]
+        assert table_args[0][2] == "landing_game" and table_args[0][5] is df_game
+        assert table_args[1][2] == "landing_output_need" and table_args[1][5] is None
+
+def test_snowflake_write_pandas_failure():
+    
+    # this test the function snowflake_write_pandas with a loading not succeeding. Must exit the program
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+    df = pd.read_csv("materials/game.csv")
+
+    with patch('snowflake_actions.snowflake_connect', return_value=MagicMock()), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('config.time_sleep'), \
+         patch('snowflake_actions.write_pandas', return_value=(False, 1, 0, [])):
+
+        assertExit(lambda: snowflake_actions.snowflake_write_pandas(sr_snowflake_account, df, "landing", "landing_game"))
+
+def test_snowflake_connection_pool_unhealthy_connection():
+    
+    # this test the function acquire_snowflake_connection with an idle connection which expired. Must be discarded and replaced
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+
+    expired_conn = MagicMock()
+    expired_conn.is_closed.return_value = False
+    expired_conn.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("Session expired")
+    new_conn = MagicMock()
+    new_conn.is_closed.return_value = False
+
+    with patch('snowflake_actions.snowflake_connect', side_effect=[expired_conn, new_conn]) as mock_connect, \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('snowflake_actions.config.snowflake_pool_size', 1), \
+         patch('snowflake_actions.config.snowflake_pool_healthcheck_idle_time', 0):
+
+        conn = snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+        snowflake_actions.release_snowflake_connection(sr_snowflake_account, conn)
+        conn = snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+
+        assert conn is new_conn
+        assert mock_connect.call_count == 2
+        expired_conn.close.assert_called_once()
+        snowflake_actions.release_snowflake_connection(sr_snowflake_account, conn)
+    snowflake_actions.close_snowflake_connections()
+
+def test_snowflake_connection_pool_full():
+    
+    # this test the function acquire_snowflake_connection when all connections of the pool are used. Must raise a TimeoutError
+    snowflake_actions.close_snowflake_connections()
+    sr_snowflake_account = pd.read_csv("materials/snowflake_account_connect.csv").iloc[0]
+
+    conn = MagicMock()
+    conn.is_closed.return_value = False
+
+    with patch('snowflake_actions.snowflake_connect', return_value=conn), \
+         patch('snowflake_actions.os.getenv', return_value='0'), \
+         patch('snowflake_actions.config.snowflake_pool_size', 1), \
+         patch('snowflake_actions.config.snowflake_pool_wait_time', 0.1):
+
+        snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+        with unittest.TestCase().assertRaises(TimeoutError):
+            snowflake_actions.acquire_snowflake_connection(sr_snowflake_account)
+    snowflake_actions.close_snowflake_connections()
+
 if __name__ == "__main__":
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_select_path))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_show_path))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_invalidquery))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_best_effort_failure))
     test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_script_empty_script))
-    test_suite.addTest(unittest.FunctionTestCase(test_delete_table_data_executes_expected_queries))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_connection_pool_unhealthy_connection))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_connection_pool_full))
+    test_suite.addTest(unittest.FunctionTestCase(test_delete_tables_data_from_python_no_tables))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_multi_statement_failure))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_execute_async_failure))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_python_encapsulated))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_from_dbt_failure))
+    test_suite.addTest(unittest.FunctionTestCase(test_run_dbt_failing_node))
+    test_suite.addTest(unittest.FunctionTestCase(test_get_dbt_selection_no_source_loaded))
+    test_suite.addTest(unittest.FunctionTestCase(test_unload_tables_files_empty_table))
+    test_suite.addTest(unittest.FunctionTestCase(test_unload_tables_files_empty_table_parquet))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_initsnowflake_runs_python_and_dbt))
     test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_main_with_empty_lists))
+    test_suite.addTest(unittest.FunctionTestCase(test_update_snowflake_main_dataframes_in_memory))
+    test_suite.addTest(unittest.FunctionTestCase(test_snowflake_write_pandas_failure))
     runner = unittest.TextTestRunner()
     runner.run(test_suite)
\ No newline at end of file